@@ -0,0 +1,422 @@
+# admin.py
+#
+# Rotas do back office (/admin/...): só para técnicos com admin = true.
+#
+import csv
+import io
+import logging
+import os
+from datetime import date, datetime, timedelta
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from pydantic import TypeAdapter
+from sqlalchemy import and_, select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import schemas
+from app.auth import UsuarioAutenticado
+from app.database import AsyncSessionLocal
+from app.db.models import (
+    OS,
+    Atendimento,
+    Despacho,
+    EtapaHistorico,
+    Etapa,
+    Tecnico,
+    MetricaEtapaDiaria,
+    MetricaTecnicoDiaria,
+    StatusOS
+)
+from app.despacho import replanejar
+from app.importacao import ArquivoInvalido, formato_pelo_nome, importar
+from app.metricas import METRICAS_SLA_HORAS
+from app.routes import get_admin, get_db
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/admin")
+
+
+# =================================================
+# EXPORTAÇÃO DO HISTÓRICO
+# =================================================
+#
+# Atendimentos + etapas de todos os técnicos, uma linha por etapa, em
+# NDJSON ou CSV. As linhas saem do banco em lotes (cursor no servidor,
+# yield_per) e vão direto para a resposta: a memória não cresce com o
+# período exportado.
+
+EXPORTACAO_LOTE = int(os.getenv("EXPORTACAO_LOTE", "2000"))
+# Cada exportação segura uma conexão do pool até terminar
+EXPORTACAO_MAX_SIMULTANEAS = int(os.getenv("EXPORTACAO_MAX_SIMULTANEAS", "2"))
+
+_exportacoes = 0
+_linha = TypeAdapter(schemas.LinhaExportacao)
+COLUNAS_EXPORTACAO = list(schemas.LinhaExportacao.model_fields)
+
+
+def consulta_exportacao(
+    inicio: Optional[datetime],
+    fim: Optional[datetime],
+    tecnico_id: Optional[int]
+):
+    condicao_etapas = [EtapaHistorico.atendimento_id == Atendimento.id]
+    if inicio:
+        # Etapa nunca é anterior ao início do atendimento: só as partições
+        # mensais a partir de `inicio` entram no plano
+        condicao_etapas.append(EtapaHistorico.criado_em >= inicio)
+
+    query = (
+        select(
+            Atendimento.id.label("atendimento_id"),
+            Atendimento.os_id,
+            OS.cliente,
+            OS.endereco,
+            Atendimento.tecnico_id,
+            Tecnico.nome.label("tecnico_nome"),
+            Atendimento.hora_inicio,
+            Atendimento.hora_fim,
+            Atendimento.etapa.label("etapa_atual"),
+            EtapaHistorico.id.label("etapa_id"),
+            EtapaHistorico.etapa,
+            EtapaHistorico.descricao,
+            EtapaHistorico.foto,
+            EtapaHistorico.criado_em.label("etapa_em"),
+        )
+        .outerjoin(OS, OS.id == Atendimento.os_id)
+        .outerjoin(Tecnico, Tecnico.id == Atendimento.tecnico_id)
+        .outerjoin(EtapaHistorico, and_(*condicao_etapas))
+        .order_by(Atendimento.id, EtapaHistorico.criado_em, EtapaHistorico.id)
+        .execution_options(yield_per=EXPORTACAO_LOTE)
+    )
+
+    if inicio:
+        query = query.where(Atendimento.hora_inicio >= inicio)
+    if fim:
+        query = query.where(Atendimento.hora_inicio < fim)
+    if tecnico_id is not None:
+        query = query.where(Atendimento.tecnico_id == tecnico_id)
+
+    return query
+
+
+def _ndjson(linhas) -> bytes:
+    return b"".join(
+        _linha.dump_json(_linha.validate_python(linha, from_attributes=True)) + b"\n"
+        for linha in linhas
+    )
+
+
+def _csv(linhas) -> bytes:
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    for linha in linhas:
+        dados = _linha.dump_python(_linha.validate_python(linha, from_attributes=True), mode="json")
+        escritor.writerow(dados.values())
+    return buffer.getvalue().encode()
+
+
+def reservar_exportacao():
+    """
+    Ocupa uma vaga de exportação e devolve a função que a libera.
+
+    A reserva é na rota, sem await entre conferir e somar: N pedidos
+    chegando juntos não passam todos pelo limite. Liberar é idempotente:
+    quem chamar primeiro (fim do gerador ou a BackgroundTask da resposta,
+    para o gerador que nem chegou a começar) devolve a vaga.
+    """
+    global _exportacoes
+    if _exportacoes >= EXPORTACAO_MAX_SIMULTANEAS:
+        raise HTTPException(503, "Muitas exportações em andamento, tente em instantes")
+    _exportacoes += 1
+
+    liberada = False
+
+    def liberar():
+        global _exportacoes
+        nonlocal liberada
+        if not liberada:
+            liberada = True
+            _exportacoes -= 1
+
+    return liberar
+
+
+async def fluxo_exportacao(query, formato: str, liberar):
+    try:
+        # Sessão própria: vive enquanto a resposta estiver sendo enviada
+        async with AsyncSessionLocal() as db:
+            if formato == "csv":
+                yield (",".join(COLUNAS_EXPORTACAO) + "\r\n").encode()
+
+            total = 0
+            result = await db.stream(query)
+            async for lote in result.partitions():
+                total += len(lote)
+                yield _csv(lote) if formato == "csv" else _ndjson(lote)
+
+            logger.info(f"📤 Exportação concluída: {total} linhas ({formato})")
+    finally:
+        liberar()
+
+
+@router.get("/exportacao/atendimentos")
+async def exportar_atendimentos(
+    formato: Literal["ndjson", "csv"] = "ndjson",
+    inicio: Optional[datetime] = None,
+    fim: Optional[datetime] = None,
+    tecnico_id: Optional[int] = None,
+    admin: UsuarioAutenticado = Depends(get_admin)
+):
+    query = consulta_exportacao(inicio, fim, tecnico_id)
+    liberar = reservar_exportacao()
+
+    logger.info(
+        f"📤 Exportação ({formato}) por {admin.email}: "
+        f"inicio={inicio} fim={fim} tecnico={tecnico_id}"
+    )
+
+    nome = f"atendimentos-{datetime.utcnow():%Y%m%d-%H%M%S}.{formato}"
+    return StreamingResponse(
+        fluxo_exportacao(query, formato, liberar),
+        media_type="text/csv; charset=utf-8" if formato == "csv" else "application/x-ndjson",
+        headers={
+            "Content-Disposition": f'attachment; filename="{nome}"',
+            "Cache-Control": "no-store",
+        },
+        background=BackgroundTask(liberar)
+    )
+
+
+# =================================================
+# MÉTRICAS OPERACIONAIS
+# =================================================
+#
+# Lê só os agregados diários (app/metricas.py): o custo depende de dias x
+# técnicos no período, não do tamanho do histórico.
+
+METRICAS_PERIODO_PADRAO = 30
+
+
+def _media(total: float, quantidade: int) -> Optional[float]:
+    return round(total / quantidade, 1) if quantidade else None
+
+
+@router.get("/metricas", response_model=schemas.MetricasOperacionais)
+async def metricas_operacionais(
+    inicio: Optional[date] = None,
+    fim: Optional[date] = None,
+    tecnico_id: Optional[int] = None,
+    admin: UsuarioAutenticado = Depends(get_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    # Período em dias inteiros, fim incluído (padrão: últimos 30 dias)
+    fim = fim or datetime.utcnow().date()
+    inicio = inicio or fim - timedelta(days=METRICAS_PERIODO_PADRAO - 1)
+    if inicio > fim:
+        raise HTTPException(400, "inicio deve ser anterior a fim")
+
+    filtro_etapa = [MetricaEtapaDiaria.dia.between(inicio, fim)]
+    filtro_tecnico = [MetricaTecnicoDiaria.dia.between(inicio, fim)]
+    if tecnico_id is not None:
+        filtro_etapa.append(MetricaEtapaDiaria.tecnico_id == tecnico_id)
+        filtro_tecnico.append(MetricaTecnicoDiaria.tecnico_id == tecnico_id)
+
+    etapas = (await db.execute(
+        select(
+            MetricaEtapaDiaria.etapa,
+            func.sum(MetricaEtapaDiaria.quantidade),
+            func.sum(MetricaEtapaDiaria.duracao_total_s),
+            func.max(MetricaEtapaDiaria.duracao_max_s),
+        )
+        .where(*filtro_etapa)
+        .group_by(MetricaEtapaDiaria.etapa)
+    )).all()
+
+    tecnicos = (await db.execute(
+        select(
+            MetricaTecnicoDiaria.tecnico_id,
+            Tecnico.nome,
+            func.sum(MetricaTecnicoDiaria.iniciados),
+            func.sum(MetricaTecnicoDiaria.concluidos),
+            func.sum(MetricaTecnicoDiaria.dentro_sla),
+            func.sum(MetricaTecnicoDiaria.duracao_total_s),
+            func.max(MetricaTecnicoDiaria.duracao_max_s),
+        )
+        .join(Tecnico, Tecnico.id == MetricaTecnicoDiaria.tecnico_id)
+        .where(*filtro_tecnico)
+        .group_by(MetricaTecnicoDiaria.tecnico_id, Tecnico.nome)
+        .order_by(MetricaTecnicoDiaria.tecnico_id)
+    )).all()
+
+    ordem = list(Etapa)
+    por_etapa = [
+        {
+            "etapa": etapa,
+            "quantidade": quantidade,
+            "duracao_media_s": _media(total, quantidade),
+            "duracao_max_s": maximo,
+        }
+        for etapa, quantidade, total, maximo in sorted(etapas, key=lambda l: ordem.index(l[0]))
+    ]
+
+    por_tecnico = [
+        {
+            "tecnico_id": id,
+            "nome": nome,
+            "iniciados": iniciados,
+            "concluidos": concluidos,
+            "dentro_sla": sla,
+            "duracao_media_s": _media(total, concluidos),
+            "duracao_max_s": maximo if concluidos else None,
+        }
+        for id, nome, iniciados, concluidos, sla, total, maximo in tecnicos
+    ]
+
+    concluidos = sum(l[3] for l in tecnicos)
+    dentro_sla = sum(l[4] for l in tecnicos)
+    return {
+        "inicio": inicio,
+        "fim": fim,
+        "sla_horas": METRICAS_SLA_HORAS,
+        "por_etapa": por_etapa,
+        "por_tecnico": por_tecnico,
+        "total": {
+            "iniciados": sum(l[2] for l in tecnicos),
+            "concluidos": concluidos,
+            "dentro_sla": dentro_sla,
+            "percentual_sla": round(100 * dentro_sla / concluidos, 1) if concluidos else None,
+            "duracao_media_s": _media(sum(l[5] for l in tecnicos), concluidos),
+        },
+    }
+
+
+# =================================================
+# DESPACHO
+# =================================================
+#
+# Plano de despacho (app/despacho.py). POST recalcula na hora (e grava,
+# com aplicar=true); GET lê o último plano gravado.
+
+def _rotas(paradas_por_tecnico) -> list:
+    return [
+        {
+            "tecnico_id": tecnico_id,
+            "distancia_km": sum(km for _, _, km in paradas),
+            "paradas": [
+                {"os_id": os_id, "ordem": ordem, "distancia_km": km}
+                for os_id, ordem, km in paradas
+            ],
+        }
+        for tecnico_id, paradas in paradas_por_tecnico.items()
+    ]
+
+
+@router.post("/despacho", response_model=schemas.PlanoDespacho)
+async def replanejar_despacho(
+    aplicar: bool = True,
+    admin: UsuarioAutenticado = Depends(get_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    plano = await replanejar(db, aplicar=aplicar)
+    if plano is None:
+        raise HTTPException(409, "Replanejamento em andamento, tente em instantes")
+
+    rotas = {
+        tecnico_id: [(os_id, ordem, km) for ordem, (os_id, km) in enumerate(paradas, start=1)]
+        for tecnico_id, paradas in plano["rotas"].items()
+    }
+
+    logger.info(
+        f"🧭 Despacho {'aplicado' if aplicar else 'simulado'} por {admin.email}: "
+        f"{sum(len(p) for p in rotas.values())} OS, {len(plano['sem_tecnico'])} sem técnico "
+        f"({plano['tempo_ms']:.0f} ms)"
+    )
+
+    return {
+        "planejado_em": plano["planejado_em"],
+        "aplicado": aplicar,
+        "tecnicos": len(rotas),
+        "os_planejadas": sum(len(p) for p in rotas.values()),
+        "sem_tecnico": plano["sem_tecnico"],
+        "distancia_total_km": plano["distancia_total_km"],
+        "tempo_ms": round(plano["tempo_ms"], 1),
+        "rotas": _rotas(rotas),
+    }
+
+
+@router.get("/despacho", response_model=schemas.PlanoDespacho)
+async def plano_despacho(
+    admin: UsuarioAutenticado = Depends(get_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    linhas = (await db.execute(
+        select(Despacho.tecnico_id, Despacho.os_id, Despacho.ordem, Despacho.distancia_km, Despacho.planejado_em)
+        .order_by(Despacho.tecnico_id, Despacho.ordem)
+    )).all()
+
+    # OS em aberto com posição que o plano gravado não cobre (ficaram sem
+    # técnico ou surgiram depois do último replanejamento)
+    sem_tecnico = (await db.execute(
+        select(OS.id)
+        .outerjoin(Despacho, Despacho.os_id == OS.id)
+        .where(
+            OS.status == StatusOS.EM_ABERTO,
+            OS.latitude.isnot(None),
+            Despacho.os_id.is_(None)
+        )
+        .order_by(OS.id)
+    )).scalars().all()
+
+    rotas = {}
+    for tecnico_id, os_id, ordem, km, _ in linhas:
+        rotas.setdefault(tecnico_id, []).append((os_id, ordem, km))
+
+    return {
+        "planejado_em": max((l.planejado_em for l in linhas), default=None),
+        "aplicado": True,
+        "tecnicos": len(rotas),
+        "os_planejadas": len(linhas),
+        "sem_tecnico": sem_tecnico,
+        "distancia_total_km": sum(l.distancia_km for l in linhas),
+        "rotas": _rotas(rotas),
+    }
+
+
+# =================================================
+# IMPORTAÇÃO DE OS
+# =================================================
+#
+# Arquivo do ERP em CSV ou NDJSON (app/importacao.py). O upload já chega
+# num arquivo temporário (UploadFile); a conexão com o banco só é pega
+# depois, para o COPY.
+
+@router.post("/importacao/os", response_model=schemas.ResultadoImportacao)
+async def importar_os(
+    arquivo: UploadFile = File(...),
+    formato: Optional[Literal["csv", "ndjson"]] = None,
+    simular: bool = False,
+    admin: UsuarioAutenticado = Depends(get_admin)
+):
+    formato = formato or formato_pelo_nome(arquivo.filename)
+    if formato is None:
+        raise HTTPException(400, "Informe o formato (csv ou ndjson)")
+
+    try:
+        resultado = await importar(arquivo.file, formato, simular)
+    except ArquivoInvalido as e:
+        raise HTTPException(400, str(e))
+
+    if resultado is None:
+        raise HTTPException(409, "Importação em andamento, tente em instantes")
+
+    logger.info(
+        f"📥 Importação de OS {'simulada' if simular else 'aplicada'} por {admin.email}: "
+        f"{resultado['lidas']} linhas, {resultado['inseridas']} inseridas, "
+        f"{resultado['atualizadas']} atualizadas, {resultado['com_erro']} com erro "
+        f"({resultado['tempo_ms']:.0f} ms)"
+    )
+    return resultado
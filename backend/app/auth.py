@@ -1,11 +1,49 @@
 from passlib.context import CryptContext
 from jose import jwt, JWTError
 from datetime import datetime, timedelta
+from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Tuple
+import asyncio
+import logging
+import multiprocessing
+import os
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.cache import CacheTTL
+from app.db.models import Tecnico
 
 SECRET_KEY = "segredo-super-seguro"
 ALGORITHM = "HS256"
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+logger = logging.getLogger(__name__)
+
+# Custo do bcrypt. Hashes gravados com custo menor são refeitos no próximo
+# login bem-sucedido (ver verify_and_update_password)
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS
+)
+
+# Verificação de senha no login: processos dedicados (0 = threads do servidor)
+LOGIN_WORKERS = int(os.getenv("LOGIN_WORKERS", str(os.cpu_count() or 1)))
+# Logins aguardando um processo livre; acima disso responde 503
+LOGIN_FILA_MAX = int(os.getenv("LOGIN_FILA_MAX", "100"))
+
+# Cache da identidade do técnico autenticado (evita um SELECT por requisição)
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "60"))
+AUTH_CACHE_TAMANHO = int(os.getenv("AUTH_CACHE_TAMANHO", "10000"))
+
+# Se ligado, nome/email/ativo vêm das claims assinadas do token e o banco
+# nem é consultado. Desativar um técnico só vale quando o token expirar.
+AUTH_CONFIAR_TOKEN = os.getenv("AUTH_CONFIAR_TOKEN", "false").lower() in ("1", "true", "sim", "yes")
 
 
 def hash_password(password: str):
@@ -16,17 +54,204 @@ def verify_password(plain: str, hashed: str):
     return pwd_context.verify(plain, hashed)
 
 
-def create_token(user_id: int):
+def verify_and_update_password(plain: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    """Retorna (senha_ok, novo_hash); novo_hash só vem quando o custo mudou."""
+    return pwd_context.verify_and_update(plain, hashed)
+
+
+def create_token(user_id: int, user: Optional["UsuarioAutenticado"] = None):
     payload = {
         "sub": str(user_id),
         "exp": datetime.utcnow() + timedelta(hours=8)
     }
+    if user is not None:
+        payload.update({"nome": user.nome, "email": user.email, "ativo": user.ativo, "admin": user.admin})
     return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
 
 
-def decode_token(token: str):
+def decode_claims(token: str):
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return int(payload["sub"])
-    except JWTError:
+        int(payload["sub"])
+        return payload
+    except (JWTError, KeyError, ValueError):
         return None
+
+
+def decode_token(token: str):
+    payload = decode_claims(token)
+    return int(payload["sub"]) if payload else None
+
+
+# =================================================
+# CACHE DE USUÁRIOS
+# =================================================
+
+@dataclass(frozen=True)
+class UsuarioAutenticado:
+    """Identidade do técnico usada pelas rotas (cópia imutável, sem sessão)."""
+    id: int
+    nome: str
+    email: str
+    ativo: bool
+    admin: bool = False
+
+    @classmethod
+    def de_tecnico(cls, tecnico: Tecnico):
+        return cls(
+            id=tecnico.id,
+            nome=tecnico.nome,
+            email=tecnico.email,
+            ativo=tecnico.ativo is not False,
+            admin=tecnico.admin is True
+        )
+
+    @classmethod
+    def de_claims(cls, claims: dict):
+        if "ativo" not in claims:
+            return None
+        return cls(
+            id=int(claims["sub"]),
+            nome=claims.get("nome", ""),
+            email=claims.get("email", ""),
+            ativo=bool(claims["ativo"]),
+            admin=bool(claims.get("admin", False))
+        )
+
+
+usuarios_cache = CacheTTL(tamanho_max=AUTH_CACHE_TAMANHO, ttl=AUTH_CACHE_TTL)
+
+
+def invalidar_usuario(user_id: int):
+    usuarios_cache.delete(user_id)
+
+
+# Nos outros workers (e para SQL direto/scripts) quem invalida é o
+# trigger tecnico_eventos (migração 0013), escutado em app/eventos.py.
+# Os hooks abaixo só adiantam a invalidação no processo que fez a alteração.
+
+COLUNAS_IDENTIDADE = {"nome", "email", "ativo", "admin"}
+
+
+@event.listens_for(Tecnico, "after_update")
+@event.listens_for(Tecnico, "after_delete")
+def _tecnico_alterado(mapper, connection, target):
+    invalidar_usuario(target.id)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _tecnicos_alterados_em_massa(estado):
+    # update(Tecnico)/delete(Tecnico): não dá para saber quais ids sem
+    # consultar, então limpa o cache todo (alterar posição não conta)
+    if not (estado.is_update or estado.is_delete):
+        return
+    if not any(m.class_ is Tecnico for m in estado.all_mappers):
+        return
+    if estado.is_update and not COLUNAS_IDENTIDADE & set(estado.statement.compile().params):
+        return
+    usuarios_cache.clear()
+
+
+# =================================================
+# VERIFICAÇÃO DE SENHA EM PROCESSOS
+# =================================================
+
+class LoginSobrecarregado(Exception):
+    pass
+
+
+class ControleLogin:
+    """Pool de processos para o bcrypt + fila limitada de logins.
+
+    No máximo LOGIN_WORKERS verificações rodam ao mesmo tempo; até
+    LOGIN_FILA_MAX esperam a vez e as demais são recusadas na hora, em vez
+    de acumular requisições que vão estourar o timeout do cliente.
+    """
+
+    def __init__(self, workers: int = LOGIN_WORKERS, fila_max: int = LOGIN_FILA_MAX):
+        self.workers = workers
+        self.fila_max = fila_max
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._limite = asyncio.Semaphore(workers if workers > 0 else (os.cpu_count() or 1))
+        self.em_execucao = 0
+        self.aguardando = 0
+        self.verificacoes = 0
+        self.rejeitados = 0
+        self.rehashes = 0
+
+    def _executor(self):
+        if self.workers <= 0:
+            return None
+
+        if self._pool is None:
+            # spawn: o filho não herda sockets do banco nem o event loop
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    async def iniciar(self):
+        executor = self._executor()
+        if executor is None:
+            return
+
+        # Sobe os processos agora, não no primeiro login do turno
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*[
+            loop.run_in_executor(executor, os.getpid) for _ in range(self.workers)
+        ])
+        logger.info(f"🔐 Verificação de senha em {self.workers} processo(s)")
+
+    def encerrar(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def verificar(self, plain: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        if self._limite.locked() and self.aguardando >= self.fila_max:
+            self.rejeitados += 1
+            raise LoginSobrecarregado()
+
+        self.aguardando += 1
+        try:
+            await self._limite.acquire()
+        finally:
+            self.aguardando -= 1
+
+        self.em_execucao += 1
+        try:
+            loop = asyncio.get_running_loop()
+            try:
+                resultado = await loop.run_in_executor(
+                    self._executor(), verify_and_update_password, plain, hashed
+                )
+            except BrokenProcessPool:
+                # Um worker morreu (OOM, kill): recria o pool e tenta de novo
+                logger.warning("⚠️  Pool de verificação de senha quebrado; recriando")
+                self._pool = None
+                resultado = await loop.run_in_executor(
+                    self._executor(), verify_and_update_password, plain, hashed
+                )
+        finally:
+            self.em_execucao -= 1
+            self._limite.release()
+
+        self.verificacoes += 1
+        if resultado[1]:
+            self.rehashes += 1
+        return resultado
+
+    def metricas(self):
+        return {
+            "workers": self.workers,
+            "em_execucao": self.em_execucao,
+            "aguardando": self.aguardando,
+            "fila_max": self.fila_max,
+            "verificacoes": self.verificacoes,
+            "rejeitados": self.rejeitados,
+            "rehashes": self.rehashes
+        }
+
+
+controle_login = ControleLogin()
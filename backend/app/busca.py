@@ -0,0 +1,226 @@
+# busca.py
+#
+# Busca de atendimentos por texto (GET /busca): nome do cliente, endereço
+# da OS e o que foi escrito nas etapas.
+#
+#   - full-text com a configuração 'portuguese' (por radical: "instalação"
+#     acha "instalado"), cada palavra como prefixo: "augus" acha "Augusta".
+#     Índices GIN por expressão, migração 0012
+#   - com pg_trgm no servidor, também por trecho (ILIKE '%...%' com índice
+#     de trigramas): número da casa, pedaço no meio da palavra, grafia que
+#     o dicionário não conhece
+#
+# Relevância: ts_rank com peso A para cliente, B para endereço e C para as
+# etapas (a nota do técnico conta menos que o nome do cliente); casar por
+# trecho soma BUSCA_PESO_TRECHO. Atendimento que casa pela OS e por uma
+# etapa soma as duas.
+#
+# Palavra muito comum ("rua") casa com boa parte da base: cada fonte (OS,
+# etapas) entrega no máximo BUSCA_MAX_CANDIDATOS, os mais recentes, ao
+# ranqueamento. O custo fica limitado, e o técnico (que só busca nos
+# próprios atendimentos) não chega perto disso.
+#
+import base64
+import os
+import re
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import String, bindparam, text
+
+BUSCA_MAX_CANDIDATOS = int(os.getenv("BUSCA_MAX_CANDIDATOS", "2000"))
+BUSCA_MAX_PALAVRAS = int(os.getenv("BUSCA_MAX_PALAVRAS", "8"))
+BUSCA_PESO_TRECHO = float(os.getenv("BUSCA_PESO_TRECHO", "0.1"))
+
+# Mesmas expressões dos índices da migração 0012 (o planner só usa o
+# índice se a expressão for idêntica)
+VETOR_OS = (
+    "(setweight(to_tsvector('portuguese', o.cliente), 'A') || "
+    "setweight(to_tsvector('portuguese', o.endereco), 'B'))"
+)
+VETOR_ETAPA = "setweight(to_tsvector('portuguese', coalesce(e.descricao, '')), 'C')"
+
+# Renderizada como literal (não parâmetro): vira constante no plano, e o
+# planner estima pelas estatísticas do índice quantas linhas casam (palavra
+# comum ou rara pede planos bem diferentes)
+CONSULTA = "to_tsquery('portuguese', :tsquery)"
+
+# Trecho devolvido com os termos marcados
+OPCOES_TRECHO = "MaxFragments=1, MaxWords=12, MinWords=4, StartSel=«, StopSel=»"
+
+# Preenchido no startup por detectar_trigramas()
+TRIGRAMAS = False
+
+_PALAVRA = re.compile(r"[^\W_]+")
+
+
+def detectar_trigramas(conn) -> bool:
+    """Liga a busca por trecho se houver pg_trgm e os índices da 0012."""
+    global TRIGRAMAS
+    TRIGRAMAS = bool(conn.execute(text("""
+        SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')
+           AND to_regclass('idx_os_cliente_trgm') IS NOT NULL
+    """)).scalar())
+    return TRIGRAMAS
+
+
+def montar_tsquery(texto: str) -> str:
+    """'rua augus' -> 'rua:* & augus:*'. Só letras e dígitos chegam ao to_tsquery."""
+    palavras = _PALAVRA.findall(texto.lower())[:BUSCA_MAX_PALAVRAS]
+    return " & ".join(f"{p}:*" for p in palavras)
+
+
+def padrao_trecho(texto: str) -> str:
+    return "%" + re.sub(r"([%_\\])", r"\\\1", texto.strip()) + "%"
+
+
+def codificar_cursor(deslocamento: int) -> str:
+    return base64.urlsafe_b64encode(f"busca|{deslocamento}".encode()).decode()
+
+
+def decodificar_cursor(cursor: Optional[str]) -> int:
+    if not cursor:
+        return 0
+    try:
+        prefixo, deslocamento = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        if prefixo != "busca" or int(deslocamento) < 0:
+            raise ValueError
+        return int(deslocamento)
+    except ValueError:
+        raise HTTPException(400, "Cursor inválido")
+
+
+def _candidatas(por_trecho: bool, por_tecnico: bool) -> Tuple[str, str]:
+    """Subconsultas (OS, etapas) com no máximo :max_candidatos linhas cada."""
+    trecho_os = "OR o.cliente ILIKE :trecho OR o.endereco ILIKE :trecho" if por_trecho else ""
+    trecho_etapa = "OR e.descricao ILIKE :trecho" if por_trecho else ""
+
+    if por_tecnico:
+        # Parte dos atendimentos do técnico (índice por tecnico_id): poucos
+        # o bastante para testar um a um, mesmo com palavra comum
+        os_ = f"""
+            SELECT a.id AS atendimento_id, o.cliente, o.endereco, {VETOR_OS} AS vetor
+            FROM atendimento a
+            JOIN os o ON o.id = a.os_id
+            WHERE a.tecnico_id = :tecnico_id
+              AND ({VETOR_OS} @@ {CONSULTA} {trecho_os})
+            ORDER BY a.id DESC
+            LIMIT :max_candidatos
+        """
+        etapas = f"""
+            SELECT e.atendimento_id, e.id AS etapa_id, e.criado_em AS etapa_em, e.descricao,
+                   {VETOR_ETAPA} AS vetor
+            FROM atendimento a
+            JOIN etapa_historico e ON e.atendimento_id = a.id
+            WHERE a.tecnico_id = :tecnico_id
+              AND ({VETOR_ETAPA} @@ {CONSULTA} {trecho_etapa})
+            ORDER BY e.criado_em DESC
+            LIMIT :max_candidatos
+        """
+        return os_, etapas
+
+    # Todos: pelos índices de texto, as mais recentes primeiro. Em
+    # etapa_historico a ordem é a das partições: com palavra comum, só os
+    # meses mais novos chegam a ser lidos
+    os_ = f"""
+        SELECT a.id AS atendimento_id, o.cliente, o.endereco, o.vetor
+        FROM (
+            SELECT o.id, o.cliente, o.endereco, {VETOR_OS} AS vetor
+            FROM os o
+            WHERE {VETOR_OS} @@ {CONSULTA} {trecho_os}
+            ORDER BY o.id DESC
+            LIMIT :max_candidatos
+        ) o
+        JOIN atendimento a ON a.os_id = o.id
+    """
+    etapas = f"""
+        SELECT e.atendimento_id, e.id AS etapa_id, e.criado_em AS etapa_em, e.descricao,
+               {VETOR_ETAPA} AS vetor
+        FROM etapa_historico e
+        WHERE {VETOR_ETAPA} @@ {CONSULTA} {trecho_etapa}
+        ORDER BY e.criado_em DESC
+        LIMIT :max_candidatos
+    """
+    return os_, etapas
+
+
+def _consulta(por_trecho: bool, por_tecnico: bool) -> str:
+    candidatas_os, candidatas_etapa = _candidatas(por_trecho, por_tecnico)
+    peso_os = peso_etapa = ""
+    if por_trecho:
+        peso_os = "+ CASE WHEN c.cliente ILIKE :trecho OR c.endereco ILIKE :trecho THEN :peso_trecho ELSE 0 END"
+        peso_etapa = "+ CASE WHEN c.descricao ILIKE :trecho THEN :peso_trecho ELSE 0 END"
+
+    return f"""
+        WITH por_os AS MATERIALIZED (
+            SELECT c.atendimento_id, ts_rank(c.vetor, {CONSULTA}) {peso_os} AS relevancia
+            FROM ({candidatas_os}) c
+        ),
+        por_etapa AS MATERIALIZED (
+            -- A etapa que mais casou de cada atendimento (vira o trecho)
+            SELECT DISTINCT ON (c.atendimento_id) c.atendimento_id, c.etapa_id, c.etapa_em,
+                   ts_rank(c.vetor, {CONSULTA}) {peso_etapa} AS relevancia
+            FROM ({candidatas_etapa}) c
+            ORDER BY c.atendimento_id, relevancia DESC
+        ),
+        pagina AS (
+            SELECT coalesce(po.atendimento_id, pe.atendimento_id) AS atendimento_id,
+                   coalesce(po.relevancia, 0) + coalesce(pe.relevancia, 0) AS relevancia,
+                   pe.etapa_id, pe.etapa_em
+            FROM por_os po
+            FULL JOIN por_etapa pe ON pe.atendimento_id = po.atendimento_id
+            ORDER BY relevancia DESC, atendimento_id DESC
+            LIMIT :limite OFFSET :deslocamento
+        )
+        SELECT p.atendimento_id, a.os_id, o.cliente, o.endereco, o.status AS status_os,
+               a.etapa, a.tecnico_id, a.hora_inicio, a.hora_fim, p.relevancia,
+               ts_headline('portuguese', e.descricao, {CONSULTA}, '{OPCOES_TRECHO}') AS trecho
+        FROM pagina p
+        JOIN atendimento a ON a.id = p.atendimento_id
+        JOIN os o ON o.id = a.os_id
+        LEFT JOIN etapa_historico e ON e.id = p.etapa_id AND e.criado_em = p.etapa_em
+        ORDER BY p.relevancia DESC, p.atendimento_id DESC
+    """
+
+
+async def buscar(
+    db,
+    texto: str,
+    tecnico_id: Optional[int],
+    limite: int,
+    deslocamento: int = 0
+) -> Tuple[List, Optional[str]]:
+    """
+    Atendimentos que casam com `texto`, do mais relevante ao menos (só os
+    de `tecnico_id`, se informado). Retorna (linhas, proximo_cursor).
+    """
+    tsquery = montar_tsquery(texto)
+    # Trigramas precisam de 3 caracteres para usar o índice
+    por_trecho = TRIGRAMAS and len(texto.strip()) >= 3
+    if not tsquery and not por_trecho:
+        raise HTTPException(400, "Informe ao menos uma palavra para buscar")
+
+    parametros = {
+        # Sem palavras o full-text fica vazio e não casa nada: vale o trecho
+        "tsquery": tsquery,
+        "max_candidatos": BUSCA_MAX_CANDIDATOS,
+        "limite": limite + 1,
+        "deslocamento": deslocamento,
+    }
+    if por_trecho:
+        parametros["trecho"] = padrao_trecho(texto)
+        parametros["peso_trecho"] = BUSCA_PESO_TRECHO
+    if tecnico_id is not None:
+        parametros["tecnico_id"] = tecnico_id
+
+    consulta = text(_consulta(por_trecho, tecnico_id is not None)).bindparams(
+        bindparam("tsquery", type_=String, literal_execute=True)
+    )
+    linhas = (await db.execute(consulta, parametros)).all()
+
+    proximo_cursor = None
+    if len(linhas) > limite:
+        linhas = linhas[:limite]
+        proximo_cursor = codificar_cursor(deslocamento + limite)
+
+    return linhas, proximo_cursor
@@ -0,0 +1,60 @@
+# cache.py
+#
+# Cache em memória com expiração (TTL) e limite de tamanho (LRU).
+#
+# Local a cada processo/worker: serve para dados pequenos e muito lidos,
+# em que alguns segundos de atraso entre workers são aceitáveis.
+#
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+_AUSENTE = object()
+
+
+class CacheTTL:
+    def __init__(self, tamanho_max: int = 10_000, ttl: float = 60.0):
+        self.tamanho_max = tamanho_max
+        self.ttl = ttl
+        self._itens: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+
+    def get(self, chave: Hashable, padrao: Any = None) -> Any:
+        agora = time.monotonic()
+
+        with self._lock:
+            item = self._itens.get(chave, _AUSENTE)
+
+            if item is _AUSENTE or item[0] <= agora:
+                if item is not _AUSENTE:
+                    del self._itens[chave]
+                self.falhas += 1
+                return padrao
+
+            self._itens.move_to_end(chave)
+            self.acertos += 1
+            return item[1]
+
+    def set(self, chave: Hashable, valor: Any, ttl: Optional[float] = None):
+        expira = time.monotonic() + (self.ttl if ttl is None else ttl)
+
+        with self._lock:
+            self._itens[chave] = (expira, valor)
+            self._itens.move_to_end(chave)
+
+            while len(self._itens) > self.tamanho_max:
+                self._itens.popitem(last=False)
+
+    def delete(self, chave: Hashable):
+        with self._lock:
+            self._itens.pop(chave, None)
+
+    def clear(self):
+        with self._lock:
+            self._itens.clear()
+
+    def __len__(self):
+        return len(self._itens)
@@ -0,0 +1,237 @@
+# cache_respostas.py
+#
+# Cache das respostas de leitura do app (atendimento ativo, etapas,
+# histórico, meus atendimentos) com ETag.
+#
+# As chaves são versionadas por escopo ("tecnico:7", "atendimento:42"):
+# uma escrita não apaga nada, só troca a versão do escopo, e as respostas
+# antigas deixam de ser encontradas (e saem por TTL/LRU). A versão é um
+# token aleatório, não um contador: se ela expirar, a nova nunca coincide
+# com uma antiga ainda em cache.
+#
+# Backend padrão: memória do processo (CacheTTL). Com vários workers a
+# escrita só invalida o worker que a recebeu, e os outros podem servir a
+# versão anterior por até CACHE_RESPOSTAS_TTL segundos. Para invalidar em
+# todos, use CACHE_REDIS_URL (redis ou qualquer servidor do protocolo).
+#
+import hashlib
+import logging
+import os
+import secrets
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, List, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+from pydantic import TypeAdapter
+
+from app.cache import CacheTTL
+
+logger = logging.getLogger(__name__)
+
+CACHE_RESPOSTAS_TTL = float(os.getenv("CACHE_RESPOSTAS_TTL", "30"))
+CACHE_RESPOSTAS_TAMANHO = int(os.getenv("CACHE_RESPOSTAS_TAMANHO", "20000"))
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "")
+
+# A versão vive mais que as respostas que dependem dela
+TTL_VERSAO = 24 * 3600
+
+# O cliente sempre revalida (If-None-Match); resposta de um técnico não
+# pode ficar em cache compartilhado
+CACHE_CONTROL = "private, no-cache"
+
+
+@lru_cache(maxsize=None)
+def _adaptador(modelo) -> TypeAdapter:
+    return TypeAdapter(modelo)
+
+
+def serializar(modelo: Any, dados: Any) -> bytes:
+    """JSON de `dados` (dicts, linhas ou objetos do ORM) no formato de `modelo`."""
+    adaptador = _adaptador(modelo)
+    return adaptador.dump_json(adaptador.validate_python(dados, from_attributes=True))
+
+
+def gerar_etag(corpo: bytes) -> str:
+    return '"' + hashlib.blake2b(corpo, digest_size=12).hexdigest() + '"'
+
+
+def etag_confere(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Comparação fraca (RFC 9110): ignora o prefixo W/
+    return etag in [v.strip().removeprefix("W/") for v in if_none_match.split(",")]
+
+
+# =================================================
+# BACKENDS
+# =================================================
+
+class BackendMemoria:
+    def __init__(self, tamanho_max: int, ttl: float):
+        self.ttl = ttl
+        self.respostas = CacheTTL(tamanho_max=tamanho_max, ttl=ttl)
+        self.versoes = CacheTTL(tamanho_max=tamanho_max, ttl=TTL_VERSAO)
+
+    async def versao(self, escopo: str) -> str:
+        versao = self.versoes.get(escopo)
+        if versao is None:
+            versao = secrets.token_hex(6)
+            self.versoes.set(escopo, versao)
+        return versao
+
+    async def invalidar(self, escopos: List[str]):
+        for escopo in escopos:
+            self.versoes.set(escopo, secrets.token_hex(6))
+
+    async def ler(self, chave: str):
+        return self.respostas.get(chave)
+
+    async def gravar(self, chave: str, etag: str, corpo: bytes):
+        self.respostas.set(chave, (etag, corpo))
+
+    def metricas(self):
+        return {
+            "backend": "memoria",
+            "itens": len(self.respostas),
+            "acertos": self.respostas.acertos,
+            "falhas": self.respostas.falhas,
+        }
+
+
+class BackendRedis:
+    """Qualquer cliente com get/set assíncronos no estilo do redis.asyncio."""
+
+    def __init__(self, cliente, ttl: float, prefixo: str = "fs:"):
+        self.cliente = cliente
+        self.ttl = int(ttl)
+        self.prefixo = prefixo
+        self.acertos = 0
+        self.falhas = 0
+
+    async def versao(self, escopo: str) -> str:
+        chave = f"{self.prefixo}v:{escopo}"
+        versao = await self.cliente.get(chave)
+        if versao is None:
+            # NX: dois workers criando ao mesmo tempo ficam com a mesma
+            await self.cliente.set(chave, secrets.token_hex(6), ex=TTL_VERSAO, nx=True)
+            versao = await self.cliente.get(chave)
+        return versao.decode() if isinstance(versao, bytes) else str(versao)
+
+    async def invalidar(self, escopos: List[str]):
+        for escopo in escopos:
+            await self.cliente.set(f"{self.prefixo}v:{escopo}", secrets.token_hex(6), ex=TTL_VERSAO)
+
+    async def ler(self, chave: str):
+        valor = await self.cliente.get(self.prefixo + chave)
+        if valor is None:
+            self.falhas += 1
+            return None
+        self.acertos += 1
+        etag, _, corpo = bytes(valor).partition(b"\n")
+        return etag.decode(), corpo
+
+    async def gravar(self, chave: str, etag: str, corpo: bytes):
+        await self.cliente.set(self.prefixo + chave, etag.encode() + b"\n" + corpo, ex=self.ttl)
+
+    async def fechar(self):
+        await self.cliente.aclose()
+
+    def metricas(self):
+        return {"backend": "redis", "acertos": self.acertos, "falhas": self.falhas}
+
+
+# =================================================
+# CACHE DE RESPOSTAS
+# =================================================
+
+class CacheRespostas:
+    def __init__(self, backend):
+        self.backend = backend
+        self.nao_modificadas = 0
+
+    def usar(self, backend):
+        """Troca o backend (ex.: Redis no startup, ou um fake em testes)."""
+        self.backend = backend
+
+    async def invalidar(self, *escopos: str):
+        try:
+            await self.backend.invalidar(list(escopos))
+        except Exception as e:
+            # Sem invalidar, o cache serviria dado velho: melhor desligá-lo
+            logger.error(f"❌ Falha ao invalidar cache ({e}); voltando ao cache em memória")
+            self.backend = BackendMemoria(CACHE_RESPOSTAS_TAMANHO, CACHE_RESPOSTAS_TTL)
+
+    async def responder(
+        self,
+        request: Request,
+        escopo: str,
+        modelo: Any,
+        gerar: Callable[[], Awaitable]
+    ) -> Response:
+        """
+        Resposta de `gerar()`, serializada como `modelo` (schemas.py) e
+        guardada sob a versão atual do escopo.
+
+        Hit não toca no banco; If-None-Match igual ao ETag devolve 304
+        sem corpo.
+        """
+        chave = None
+        item = None
+        try:
+            versao = await self.backend.versao(escopo)
+            chave = f"r:{escopo}:{versao}:{request.url.path}?{request.url.query}"
+            item = await self.backend.ler(chave)
+        except Exception as e:
+            logger.warning(f"⚠️  Cache de respostas indisponível: {e}")
+
+        if item is None:
+            corpo = serializar(modelo, await gerar())
+            etag = gerar_etag(corpo)
+            if chave is not None:
+                try:
+                    await self.backend.gravar(chave, etag, corpo)
+                except Exception as e:
+                    logger.warning(f"⚠️  Falha ao gravar no cache de respostas: {e}")
+        else:
+            etag, corpo = item
+
+        headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL, "Vary": "Authorization"}
+        if etag_confere(request, etag):
+            self.nao_modificadas += 1
+            return Response(status_code=304, headers=headers)
+
+        return Response(corpo, media_type="application/json", headers=headers)
+
+    async def encerrar(self):
+        if hasattr(self.backend, "fechar"):
+            await self.backend.fechar()
+
+    def metricas(self):
+        return {**self.backend.metricas(), "nao_modificadas": self.nao_modificadas}
+
+
+cache_respostas = CacheRespostas(BackendMemoria(CACHE_RESPOSTAS_TAMANHO, CACHE_RESPOSTAS_TTL))
+
+
+def conectar_redis() -> Optional[BackendRedis]:
+    """Backend Redis a partir de CACHE_REDIS_URL (chamado no startup)."""
+    if not CACHE_REDIS_URL:
+        return None
+    try:
+        import redis.asyncio as redis
+    except ImportError:
+        logger.warning("⚠️  CACHE_REDIS_URL definido mas o pacote redis não está instalado")
+        return None
+    return BackendRedis(redis.from_url(CACHE_REDIS_URL), CACHE_RESPOSTAS_TTL)
+
+
+def escopo_tecnico(user_id: int) -> str:
+    return f"tecnico:{user_id}"
+
+
+def escopo_atendimento(atendimento_id: int) -> str:
+    return f"atendimento:{atendimento_id}"
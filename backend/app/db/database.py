@@ -4,9 +4,6 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
 
-# Importa o Base do models
-from models import Base
-
 load_dotenv()
 
 DB_URL = (
@@ -18,8 +15,7 @@ DB_URL = (
 
 engine = create_engine(DB_URL, echo=False)
 
-# Cria as tabelas no banco de dados
-Base.metadata.create_all(bind=engine)
+# Tabelas: python -m app.db.migrate
 
 # Cria a fábrica de sessões
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
\ No newline at end of file
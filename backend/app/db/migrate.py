@@ -1,10 +1,141 @@
-from database import engine
-from models import Base
+# db/migrate.py
+#
+# Migrações versionadas do schema (arquivos em app/db/migrations).
+#
+# Roda uma vez por deploy, fora da API. As versões aplicadas ficam na
+# tabela schema_versao; um advisory lock garante que dois deploys
+# simultâneos não apliquem a mesma migração. A API só confere a versão
+# no startup (versao_esperada x versao_banco).
+#
+#   cd backend && python -m app.db.migrate            # aplica pendentes
+#   python -m app.db.migrate --status                 # só mostra
+#   python -m app.db.migrate --ate 3                  # aplica até a 0003
+#
+import argparse
+import importlib
+import pkgutil
+import time
+from collections import namedtuple
+from typing import List, Optional
+
+from sqlalchemy import text
+
+from app.db import migrations
+
+TABELA_VERSAO = "schema_versao"
+
+# Chave do pg_advisory_lock das migrações (qualquer inteiro fixo)
+LOCK_MIGRACAO = 720_100_001
+
+Migracao = namedtuple("Migracao", ["versao", "nome"])
+
+
+def listar_migracoes() -> List[Migracao]:
+    """Migrações disponíveis, em ordem (só lê nomes de arquivo)."""
+    lista = []
+    for info in pkgutil.iter_modules(migrations.__path__):
+        numero, _, _ = info.name.partition("_")
+        if numero.isdigit():
+            lista.append(Migracao(int(numero), info.name))
+    return sorted(lista)
+
+
+def versao_esperada() -> int:
+    lista = listar_migracoes()
+    return lista[-1].versao if lista else 0
+
+
+def versao_banco(conn) -> int:
+    existe = conn.execute(text("SELECT to_regclass(:t)"), {"t": TABELA_VERSAO}).scalar()
+    if existe is None:
+        return 0
+    return conn.execute(text(f"SELECT coalesce(max(versao), 0) FROM {TABELA_VERSAO}")).scalar()
+
+
+def _aplicadas(conn):
+    return set(conn.execute(text(f"SELECT versao FROM {TABELA_VERSAO}")).scalars())
+
+
+def _registrar(conn, migracao: Migracao, duracao: float):
+    conn.execute(
+        text(f"INSERT INTO {TABELA_VERSAO} (versao, nome, duracao_ms) VALUES (:v, :n, :d)"),
+        {"v": migracao.versao, "n": migracao.nome, "d": int(duracao * 1000)}
+    )
+
+
+def migrar(engine=None, ate: Optional[int] = None):
+    if engine is None:
+        from app.database import engine
+
+    with engine.connect() as conn:
+        # Lock de sessão: vale entre as transações de cada migração
+        conn.execute(text("SELECT pg_advisory_lock(:k)"), {"k": LOCK_MIGRACAO})
+        conn.commit()
+
+        try:
+            conn.execute(text(f"""
+                CREATE TABLE IF NOT EXISTS {TABELA_VERSAO} (
+                    versao INTEGER PRIMARY KEY,
+                    nome VARCHAR NOT NULL,
+                    aplicada_em TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT now(),
+                    duracao_ms INTEGER
+                )
+            """))
+            aplicadas = _aplicadas(conn)
+            conn.commit()
+
+            pendentes = [
+                m for m in listar_migracoes()
+                if m.versao not in aplicadas and (ate is None or m.versao <= ate)
+            ]
+
+            if not pendentes:
+                print("✅ Schema atualizado, nada a aplicar")
+
+            for migracao in pendentes:
+                modulo = importlib.import_module(f"{migrations.__name__}.{migracao.nome}")
+                print(f"📦 Aplicando {migracao.nome}...")
+                inicio = time.perf_counter()
+
+                if getattr(modulo, "TRANSACAO", True):
+                    with conn.begin():
+                        modulo.upgrade(conn)
+                        _registrar(conn, migracao, time.perf_counter() - inicio)
+                else:
+                    autocommit = conn.execution_options(isolation_level="AUTOCOMMIT")
+                    modulo.upgrade(autocommit)
+                    _registrar(autocommit, migracao, time.perf_counter() - inicio)
+                    conn.commit()
+                    conn.execution_options(isolation_level=engine.dialect.default_isolation_level)
+
+                print(f"  ✅ {migracao.nome} ({(time.perf_counter() - inicio) * 1000:.0f} ms)")
+        finally:
+            conn.rollback()
+            conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": LOCK_MIGRACAO})
+            conn.commit()
+
+
+def status(engine=None):
+    if engine is None:
+        from app.database import engine
+
+    with engine.connect() as conn:
+        atual = versao_banco(conn)
+        aplicadas = _aplicadas(conn) if atual else set()
+
+    for migracao in listar_migracoes():
+        marca = "✅" if migracao.versao in aplicadas else "⏳"
+        print(f"  {marca} {migracao.nome}")
+    print(f"📊 Banco na versão {atual}, código espera {versao_esperada()}")
 
-def run_migrations():
-    print("📦 Criando tabelas...")
-    Base.metadata.create_all(engine)
-    print("✅ Banco pronto.")
 
 if __name__ == "__main__":
-    run_migrations()
+    parser = argparse.ArgumentParser(description="Migrações do schema")
+    parser.add_argument("--status", action="store_true", help="só mostra as versões")
+    parser.add_argument("--ate", type=int, help="aplica até esta versão")
+    args = parser.parse_args()
+
+    if args.status:
+        status()
+    else:
+        migrar(ate=args.ate)
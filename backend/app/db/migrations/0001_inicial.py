@@ -0,0 +1,86 @@
+# 0001_inicial.py
+#
+# Schema inicial (tecnico, os, atendimento, etapa_historico).
+#
+# Idempotente: também "adota" bancos criados antes das migrações pelo
+# create_all/verificações antigas do startup, completando enums e índices.
+#
+from sqlalchemy import text
+
+STATUS_OS = ["EM_ABERTO", "EM_ATENDIMENTO", "AGUARDANDO", "EM_CAMPO", "CONCLUIDA"]
+ETAPAS = ["INSPECAO", "DIAGNOSTICO", "ORCAMENTO", "APROVACAO", "EXECUCAO", "FINALIZACAO"]
+
+
+def _criar_enum(conn, nome, valores):
+    lista = ", ".join(f"'{v}'" for v in valores)
+    conn.execute(text(f"""
+        DO $$ BEGIN
+            CREATE TYPE {nome} AS ENUM ({lista});
+        EXCEPTION WHEN duplicate_object THEN NULL;
+        END $$
+    """))
+
+    for valor in valores:
+        conn.execute(text(f"ALTER TYPE {nome} ADD VALUE IF NOT EXISTS '{valor}'"))
+
+
+def upgrade(conn):
+    _criar_enum(conn, "statusos", STATUS_OS)
+    _criar_enum(conn, "etapa", ETAPAS)
+
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS tecnico (
+            id SERIAL PRIMARY KEY,
+            nome VARCHAR NOT NULL,
+            email VARCHAR NOT NULL UNIQUE,
+            senha VARCHAR NOT NULL,
+            ativo BOOLEAN
+        )
+    """))
+
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS os (
+            id SERIAL PRIMARY KEY,
+            cliente VARCHAR NOT NULL,
+            endereco VARCHAR NOT NULL,
+            status statusos,
+            tecnico_id INTEGER REFERENCES tecnico(id),
+            criado_em TIMESTAMP WITHOUT TIME ZONE
+        )
+    """))
+
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS atendimento (
+            id SERIAL PRIMARY KEY,
+            os_id INTEGER REFERENCES os(id),
+            tecnico_id INTEGER REFERENCES tecnico(id),
+            hora_inicio TIMESTAMP WITHOUT TIME ZONE,
+            hora_fim TIMESTAMP WITHOUT TIME ZONE,
+            etapa etapa
+        )
+    """))
+
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS etapa_historico (
+            id SERIAL PRIMARY KEY,
+            atendimento_id INTEGER REFERENCES atendimento(id),
+            etapa etapa,
+            descricao TEXT,
+            foto TEXT,
+            criado_em TIMESTAMP WITHOUT TIME ZONE
+        )
+    """))
+
+    indices = [
+        "CREATE INDEX IF NOT EXISTS idx_os_status ON os(status)",
+        "CREATE INDEX IF NOT EXISTS idx_os_tecnico ON os(tecnico_id)",
+        "CREATE INDEX IF NOT EXISTS idx_atendimento_tecnico ON atendimento(tecnico_id)",
+        "CREATE INDEX IF NOT EXISTS idx_atendimento_os ON atendimento(os_id)",
+        "CREATE INDEX IF NOT EXISTS idx_atendimento_ativo ON atendimento(tecnico_id) WHERE hora_fim IS NULL",
+        "CREATE INDEX IF NOT EXISTS idx_atendimento_tecnico_inicio ON atendimento(tecnico_id, hora_inicio DESC, id DESC)",
+        "CREATE INDEX IF NOT EXISTS idx_historico_atendimento ON etapa_historico(atendimento_id)",
+        "CREATE INDEX IF NOT EXISTS idx_tecnico_email ON tecnico(email)",
+    ]
+
+    for idx in indices:
+        conn.execute(text(idx))
@@ -0,0 +1,48 @@
+# 0002_eventos_os.py
+#
+# Trigger que publica em 'os_eventos' (LISTEN/NOTIFY) toda OS criada ou
+# com status/técnico alterado; consumido por app/eventos.py.
+#
+# O NOTIFY só é entregue no COMMIT da transação que alterou a OS.
+#
+from sqlalchemy import text
+
+
+def upgrade(conn):
+    conn.execute(text("""
+        CREATE OR REPLACE FUNCTION notificar_os() RETURNS trigger AS $$
+        DECLARE
+            tipo TEXT;
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                tipo := 'criada';
+            ELSIF NEW.status IS NOT DISTINCT FROM OLD.status
+              AND NEW.tecnico_id IS NOT DISTINCT FROM OLD.tecnico_id THEN
+                RETURN NULL;
+            ELSIF NEW.tecnico_id IS DISTINCT FROM OLD.tecnico_id THEN
+                tipo := 'atribuida';
+            ELSE
+                tipo := 'status';
+            END IF;
+
+            PERFORM pg_notify('os_eventos', json_build_object(
+                'tipo', tipo,
+                'id', NEW.id,
+                'cliente', left(NEW.cliente, 500),
+                'endereco', left(NEW.endereco, 500),
+                'status', NEW.status,
+                'tecnico_id', NEW.tecnico_id
+            )::text);
+
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """))
+
+    conn.execute(text("DROP TRIGGER IF EXISTS os_eventos ON os"))
+    conn.execute(text("""
+        CREATE TRIGGER os_eventos
+        AFTER INSERT OR UPDATE OF status, tecnico_id ON os
+        FOR EACH ROW
+        EXECUTE FUNCTION notificar_os()
+    """))
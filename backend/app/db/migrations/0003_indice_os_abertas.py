@@ -0,0 +1,25 @@
+# 0003_indice_os_abertas.py
+#
+# Índice parcial só com as OS não concluídas, na ordem de /os/abertas.
+# As concluídas (a maior parte da tabela com o tempo) ficam de fora.
+#
+from sqlalchemy import text
+
+# CREATE INDEX CONCURRENTLY não roda dentro de transação
+TRANSACAO = False
+
+
+def upgrade(conn):
+    # Uma tentativa anterior interrompida deixa o índice marcado inválido
+    invalido = conn.execute(text("""
+        SELECT NOT indisvalid FROM pg_index
+        WHERE indexrelid = to_regclass('idx_os_abertas')
+    """)).scalar()
+    if invalido:
+        conn.execute(text("DROP INDEX CONCURRENTLY idx_os_abertas"))
+
+    conn.execute(text("""
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_os_abertas
+        ON os(id) INCLUDE (status, tecnico_id)
+        WHERE status <> 'CONCLUIDA'
+    """))
@@ -0,0 +1,58 @@
+# 0004_coordenadas.py
+#
+# Coordenadas das OS (com geohash indexado para a busca por proximidade),
+# posição de início do atendimento e última posição do técnico.
+#
+# Se o servidor tiver PostGIS disponível, habilita a extensão e cria
+# também o índice GiST usado na busca KNN (ver app/geo.py).
+#
+from sqlalchemy import text
+
+
+def upgrade(conn):
+    conn.execute(text("""
+        ALTER TABLE os
+            ADD COLUMN IF NOT EXISTS latitude DOUBLE PRECISION,
+            ADD COLUMN IF NOT EXISTS longitude DOUBLE PRECISION,
+            ADD COLUMN IF NOT EXISTS geohash VARCHAR(12)
+    """))
+
+    conn.execute(text("""
+        ALTER TABLE atendimento
+            ADD COLUMN IF NOT EXISTS latitude_inicio DOUBLE PRECISION,
+            ADD COLUMN IF NOT EXISTS longitude_inicio DOUBLE PRECISION
+    """))
+
+    conn.execute(text("""
+        ALTER TABLE tecnico
+            ADD COLUMN IF NOT EXISTS latitude DOUBLE PRECISION,
+            ADD COLUMN IF NOT EXISTS longitude DOUBLE PRECISION,
+            ADD COLUMN IF NOT EXISTS posicao_em TIMESTAMP WITHOUT TIME ZONE
+    """))
+
+    # Colunas novas, todas nulas: o índice nasce vazio (sem CONCURRENTLY)
+    conn.execute(text("""
+        CREATE INDEX IF NOT EXISTS idx_os_abertas_geohash
+        ON os (geohash text_pattern_ops)
+        WHERE status <> 'CONCLUIDA'
+    """))
+
+    disponivel = conn.execute(text(
+        "SELECT 1 FROM pg_available_extensions WHERE name = 'postgis'"
+    )).scalar()
+    if not disponivel:
+        return
+
+    try:
+        with conn.begin_nested():
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS postgis"))
+            conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS idx_os_abertas_geo
+                ON os USING gist (
+                    geography(ST_SetSRID(ST_MakePoint(longitude, latitude), 4326))
+                )
+                WHERE status <> 'CONCLUIDA' AND latitude IS NOT NULL
+            """))
+    except Exception as e:
+        # Sem permissão para CREATE EXTENSION: segue só com o geohash
+        print(f"  ⚠️  PostGIS não habilitado ({e.__class__.__name__}); usando geohash")
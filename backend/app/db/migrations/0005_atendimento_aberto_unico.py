@@ -0,0 +1,45 @@
+# 0005_atendimento_aberto_unico.py
+#
+# No máximo um atendimento aberto (hora_fim nula) por OS.
+#
+# Antes havia uma janela entre checar e inserir em iniciar_atendimento, e
+# dois técnicos podiam abrir atendimento na mesma OS. Desses duplicados
+# fica aberto só o mais recente; os outros são encerrados na hora da sua
+# última etapa registrada.
+#
+from sqlalchemy import text
+
+TRANSACAO = False
+
+
+def upgrade(conn):
+    encerrados = conn.execute(text("""
+        UPDATE atendimento a
+        SET hora_fim = coalesce(
+            (SELECT max(e.criado_em) FROM etapa_historico e WHERE e.atendimento_id = a.id),
+            a.hora_inicio
+        )
+        WHERE a.hora_fim IS NULL
+          AND EXISTS (
+              SELECT 1 FROM atendimento b
+              WHERE b.os_id = a.os_id
+                AND b.hora_fim IS NULL
+                AND (coalesce(b.hora_inicio, '-infinity'), b.id)
+                    > (coalesce(a.hora_inicio, '-infinity'), a.id)
+          )
+    """)).rowcount
+    if encerrados:
+        print(f"  ⚠️  {encerrados} atendimento(s) duplicado(s) encerrado(s)")
+
+    invalido = conn.execute(text("""
+        SELECT NOT indisvalid FROM pg_index
+        WHERE indexrelid = to_regclass('idx_atendimento_aberto_os')
+    """)).scalar()
+    if invalido:
+        conn.execute(text("DROP INDEX CONCURRENTLY idx_atendimento_aberto_os"))
+
+    conn.execute(text("""
+        CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS idx_atendimento_aberto_os
+        ON atendimento(os_id)
+        WHERE hora_fim IS NULL
+    """))
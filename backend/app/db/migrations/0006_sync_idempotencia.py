@@ -0,0 +1,18 @@
+# 0006_sync_idempotencia.py
+#
+# Chaves de idempotência do envio em lote de etapas (POST /sync/etapas).
+# Um evento reenviado com a mesma chave não gera histórico duplicado.
+#
+from sqlalchemy import text
+
+
+def upgrade(conn):
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS sync_idempotencia (
+            tecnico_id INTEGER NOT NULL REFERENCES tecnico(id),
+            chave VARCHAR(64) NOT NULL,
+            etapa_historico_id INTEGER,
+            criado_em TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT now(),
+            PRIMARY KEY (tecnico_id, chave)
+        )
+    """))
@@ -0,0 +1,12 @@
+# 0007_tecnico_admin.py
+#
+# Técnicos com acesso às rotas do back office (/admin/...).
+#
+from sqlalchemy import text
+
+
+def upgrade(conn):
+    conn.execute(text("""
+        ALTER TABLE tecnico
+            ADD COLUMN IF NOT EXISTS admin BOOLEAN NOT NULL DEFAULT false
+    """))
@@ -0,0 +1,122 @@
+# 0008_metricas.py
+#
+# Agregados operacionais mantidos a cada transição de etapa (app/metricas.py):
+#
+#   metrica_etapa_diaria    tempo gasto em cada etapa, por técnico e dia em
+#                           que a etapa terminou
+#   metrica_tecnico_diaria  atendimentos iniciados/concluídos por técnico e
+#                           dia, com o tempo até a conclusão e o SLA
+#
+# atendimento.etapa_em guarda quando o atendimento entrou na etapa atual,
+# para a transição calcular a duração sem reler o histórico.
+#
+# Os agregados do histórico já existente são calculados aqui, uma vez.
+#
+import os
+
+from sqlalchemy import text
+
+METRICAS_SLA_HORAS = float(os.getenv("METRICAS_SLA_HORAS", "24"))
+
+
+def upgrade(conn):
+    conn.execute(text("""
+        ALTER TABLE atendimento
+            ADD COLUMN IF NOT EXISTS etapa_em TIMESTAMP WITHOUT TIME ZONE
+    """))
+
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS metrica_etapa_diaria (
+            dia DATE NOT NULL,
+            tecnico_id INTEGER NOT NULL REFERENCES tecnico(id),
+            etapa etapa NOT NULL,
+            quantidade INTEGER NOT NULL DEFAULT 0,
+            duracao_total_s DOUBLE PRECISION NOT NULL DEFAULT 0,
+            duracao_max_s DOUBLE PRECISION NOT NULL DEFAULT 0,
+            PRIMARY KEY (dia, tecnico_id, etapa)
+        )
+    """))
+
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS metrica_tecnico_diaria (
+            dia DATE NOT NULL,
+            tecnico_id INTEGER NOT NULL REFERENCES tecnico(id),
+            iniciados INTEGER NOT NULL DEFAULT 0,
+            concluidos INTEGER NOT NULL DEFAULT 0,
+            dentro_sla INTEGER NOT NULL DEFAULT 0,
+            duracao_total_s DOUBLE PRECISION NOT NULL DEFAULT 0,
+            duracao_max_s DOUBLE PRECISION NOT NULL DEFAULT 0,
+            PRIMARY KEY (dia, tecnico_id)
+        )
+    """))
+
+    # ----- carga inicial a partir do histórico -----
+
+    # Entrada na etapa atual: a primeira linha do último bloco (etapas não
+    # voltam, então é a menor data com a etapa atual)
+    conn.execute(text("""
+        UPDATE atendimento a
+        SET etapa_em = coalesce(
+            (SELECT min(e.criado_em) FROM etapa_historico e
+             WHERE e.atendimento_id = a.id AND e.etapa = a.etapa),
+            a.hora_inicio
+        )
+        WHERE a.etapa_em IS NULL
+    """))
+
+    # Cada entrada numa etapa dura até a entrada na etapa seguinte
+    conn.execute(text("""
+        WITH historico AS (
+            SELECT e.atendimento_id, e.etapa, e.criado_em, a.tecnico_id,
+                   lag(e.etapa) OVER (
+                       PARTITION BY e.atendimento_id ORDER BY e.criado_em, e.id
+                   ) AS anterior
+            FROM etapa_historico e
+            JOIN atendimento a ON a.id = e.atendimento_id
+            WHERE a.tecnico_id IS NOT NULL AND e.criado_em IS NOT NULL
+        ),
+        entradas AS (
+            SELECT atendimento_id, etapa, tecnico_id, criado_em,
+                   lead(criado_em) OVER (
+                       PARTITION BY atendimento_id ORDER BY criado_em
+                   ) AS saida
+            FROM historico
+            WHERE anterior IS DISTINCT FROM etapa
+        )
+        INSERT INTO metrica_etapa_diaria
+            (dia, tecnico_id, etapa, quantidade, duracao_total_s, duracao_max_s)
+        SELECT saida::date, tecnico_id, etapa, count(*),
+               sum(extract(epoch FROM saida - criado_em)),
+               max(extract(epoch FROM saida - criado_em))
+        FROM entradas
+        WHERE saida IS NOT NULL
+        GROUP BY 1, 2, 3
+        ON CONFLICT DO NOTHING
+    """))
+
+    conn.execute(text("""
+        INSERT INTO metrica_tecnico_diaria (dia, tecnico_id, iniciados)
+        SELECT hora_inicio::date, tecnico_id, count(*)
+        FROM atendimento
+        WHERE hora_inicio IS NOT NULL AND tecnico_id IS NOT NULL
+        GROUP BY 1, 2
+        ON CONFLICT DO NOTHING
+    """))
+
+    conn.execute(text("""
+        INSERT INTO metrica_tecnico_diaria
+            (dia, tecnico_id, concluidos, dentro_sla, duracao_total_s, duracao_max_s)
+        SELECT hora_fim::date, tecnico_id, count(*),
+               count(*) FILTER (WHERE hora_fim - hora_inicio <= make_interval(secs => :sla)),
+               sum(extract(epoch FROM hora_fim - hora_inicio)),
+               max(extract(epoch FROM hora_fim - hora_inicio))
+        FROM atendimento
+        WHERE etapa = 'FINALIZACAO' AND hora_fim IS NOT NULL
+          AND hora_inicio IS NOT NULL AND tecnico_id IS NOT NULL
+        GROUP BY 1, 2
+        ON CONFLICT (dia, tecnico_id) DO UPDATE SET
+            concluidos = excluded.concluidos,
+            dentro_sla = excluded.dentro_sla,
+            duracao_total_s = excluded.duracao_total_s,
+            duracao_max_s = excluded.duracao_max_s
+    """), {"sla": METRICAS_SLA_HORAS * 3600})
@@ -0,0 +1,122 @@
+# 0009_particionar_historico.py
+#
+# etapa_historico passa a ser particionada por mês de criado_em.
+#
+# Cada mês vira uma tabela própria (etapa_historico_AAAA_MM) com índices
+# próprios: índice e vacuum de um mês não crescem com o tempo de vida da
+# empresa, e meses frios podem ser congelados/movidos (app/particoes.py).
+# A partição padrão (etapa_historico_padrao) só pega o que cair fora dos
+# meses criados; criar_particoes_etapa_historico() cria os meses que
+# faltam e tira da padrão as linhas deles.
+#
+# A cópia roda na transação da migração, com a tabela travada: em bases
+# grandes, aplicar numa janela de manutenção.
+#
+from sqlalchemy import text
+
+
+def upgrade(conn):
+    # Já particionada (migração reaplicada à mão, por exemplo)
+    if conn.execute(text(
+        "SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass('etapa_historico')"
+    )).scalar():
+        return
+
+    conn.execute(text("ALTER TABLE etapa_historico RENAME TO etapa_historico_antiga"))
+    conn.execute(text("ALTER INDEX etapa_historico_pkey RENAME TO etapa_historico_antiga_pkey"))
+    conn.execute(text("DROP INDEX IF EXISTS idx_historico_atendimento"))
+
+    # A chave primária precisa conter a chave de partição. O id continua
+    # vindo da mesma sequência e é único na prática.
+    conn.execute(text("""
+        CREATE TABLE etapa_historico (
+            id INTEGER NOT NULL DEFAULT nextval('etapa_historico_id_seq'),
+            atendimento_id INTEGER REFERENCES atendimento(id),
+            etapa etapa,
+            descricao TEXT,
+            foto TEXT,
+            criado_em TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+            PRIMARY KEY (id, criado_em)
+        ) PARTITION BY RANGE (criado_em)
+    """))
+    conn.execute(text("ALTER SEQUENCE etapa_historico_id_seq OWNED BY etapa_historico.id"))
+
+    # Etapas de um atendimento em ordem (get_etapas_historico), por partição
+    conn.execute(text("""
+        CREATE INDEX idx_historico_atendimento
+        ON etapa_historico(atendimento_id, criado_em)
+    """))
+
+    conn.execute(text("CREATE TABLE etapa_historico_padrao PARTITION OF etapa_historico DEFAULT"))
+
+    conn.execute(text("""
+        CREATE OR REPLACE FUNCTION criar_particoes_etapa_historico(de DATE, ate DATE)
+        RETURNS INTEGER AS $$
+        DECLARE
+            mes DATE := date_trunc('month', de);
+            nome TEXT;
+            criadas INTEGER := 0;
+        BEGIN
+            WHILE mes <= ate LOOP
+                nome := format('etapa_historico_%s', to_char(mes, 'YYYY_MM'));
+
+                IF to_regclass(nome) IS NULL THEN
+                    IF EXISTS (
+                        SELECT 1 FROM etapa_historico_padrao
+                        WHERE criado_em >= mes AND criado_em < mes + interval '1 month'
+                    ) THEN
+                        -- O mês já tem linhas na padrão: monta a tabela, move
+                        -- as linhas e só então anexa
+                        EXECUTE format(
+                            'CREATE TABLE %I (LIKE etapa_historico INCLUDING DEFAULTS INCLUDING CONSTRAINTS)',
+                            nome
+                        );
+                        EXECUTE format(
+                            'WITH movidas AS (
+                                 DELETE FROM etapa_historico_padrao
+                                 WHERE criado_em >= %L AND criado_em < %L
+                                 RETURNING *
+                             )
+                             INSERT INTO %I SELECT * FROM movidas',
+                            mes, mes + interval '1 month', nome
+                        );
+                        EXECUTE format(
+                            'ALTER TABLE etapa_historico ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                            nome, mes, mes + interval '1 month'
+                        );
+                    ELSE
+                        EXECUTE format(
+                            'CREATE TABLE %I PARTITION OF etapa_historico FOR VALUES FROM (%L) TO (%L)',
+                            nome, mes, mes + interval '1 month'
+                        );
+                    END IF;
+                    criadas := criadas + 1;
+                END IF;
+
+                mes := mes + interval '1 month';
+            END LOOP;
+
+            RETURN criadas;
+        END;
+        $$ LANGUAGE plpgsql
+    """))
+
+    # Meses do histórico existente até três meses à frente
+    conn.execute(text("""
+        SELECT criar_particoes_etapa_historico(
+            coalesce((SELECT min(criado_em) FROM etapa_historico_antiga), now())::date,
+            (now() + interval '3 months')::date
+        )
+    """))
+
+    copiadas = conn.execute(text("""
+        INSERT INTO etapa_historico (id, atendimento_id, etapa, descricao, foto, criado_em)
+        SELECT e.id, e.atendimento_id, e.etapa, e.descricao, e.foto,
+               coalesce(e.criado_em, a.hora_inicio, now() AT TIME ZONE 'utc')
+        FROM etapa_historico_antiga e
+        LEFT JOIN atendimento a ON a.id = e.atendimento_id
+    """)).rowcount
+    print(f"  📦 {copiadas} etapas copiadas para a tabela particionada")
+
+    conn.execute(text("DROP TABLE etapa_historico_antiga"))
+    conn.execute(text("ANALYZE etapa_historico"))
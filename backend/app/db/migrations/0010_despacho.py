@@ -0,0 +1,25 @@
+# 0010_despacho.py
+#
+# Plano de despacho (app/despacho.py): para cada OS em aberto, o técnico
+# sugerido e a posição dela na rota dele. Cada replanejamento troca o
+# plano inteiro; a OS em si não é alterada (nem dispara os_eventos).
+#
+from sqlalchemy import text
+
+
+def upgrade(conn):
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS despacho (
+            os_id INTEGER PRIMARY KEY REFERENCES os(id) ON DELETE CASCADE,
+            tecnico_id INTEGER NOT NULL REFERENCES tecnico(id),
+            ordem INTEGER NOT NULL,
+            distancia_km DOUBLE PRECISION NOT NULL,
+            planejado_em TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT now()
+        )
+    """))
+
+    # Rota de um técnico em ordem (GET /despacho/minha-rota)
+    conn.execute(text("""
+        CREATE INDEX IF NOT EXISTS idx_despacho_tecnico
+        ON despacho(tecnico_id, ordem)
+    """))
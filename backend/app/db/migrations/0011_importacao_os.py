@@ -0,0 +1,72 @@
+# 0011_importacao_os.py
+#
+# Importação de OS do ERP (app/importacao.py):
+#
+#   - os.referencia_externa: chave da OS no ERP, única; é por ela que a
+#     importação decide entre inserir e atualizar
+#   - o trigger os_eventos passa a respeitar app.os_eventos = 'off' na
+#     sessão: a importação desliga o NOTIFY por linha e manda um único
+#     resync no fim, sem o lock do ALTER TABLE ... DISABLE TRIGGER
+#
+from sqlalchemy import text
+
+# CREATE INDEX CONCURRENTLY não roda dentro de transação. Os demais passos
+# são idempotentes: rodar de novo depois de uma falha no meio é seguro
+TRANSACAO = False
+
+
+def upgrade(conn):
+    conn.execute(text("""
+        ALTER TABLE os ADD COLUMN IF NOT EXISTS referencia_externa VARCHAR(64)
+    """))
+
+    # Mesmo com a coluna toda nula o build lê a tabela inteira: sem
+    # CONCURRENTLY seguraria um lock SHARE em os (sem INSERT/UPDATE) até
+    # o fim. Nulos não conflitam entre si: OS criadas pelo app seguem sem
+    # chave. Uma tentativa anterior interrompida deixa o índice inválido
+    invalido = conn.execute(text("""
+        SELECT NOT indisvalid FROM pg_index
+        WHERE indexrelid = to_regclass('idx_os_referencia_externa')
+    """)).scalar()
+    if invalido:
+        conn.execute(text("DROP INDEX CONCURRENTLY idx_os_referencia_externa"))
+
+    conn.execute(text("""
+        CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS idx_os_referencia_externa
+        ON os(referencia_externa)
+    """))
+
+    conn.execute(text("""
+        CREATE OR REPLACE FUNCTION notificar_os() RETURNS trigger AS $$
+        DECLARE
+            tipo TEXT;
+        BEGIN
+            -- Carga em massa: quem desligou avisa os clientes de uma vez
+            IF current_setting('app.os_eventos', true) = 'off' THEN
+                RETURN NULL;
+            END IF;
+
+            IF TG_OP = 'INSERT' THEN
+                tipo := 'criada';
+            ELSIF NEW.status IS NOT DISTINCT FROM OLD.status
+              AND NEW.tecnico_id IS NOT DISTINCT FROM OLD.tecnico_id THEN
+                RETURN NULL;
+            ELSIF NEW.tecnico_id IS DISTINCT FROM OLD.tecnico_id THEN
+                tipo := 'atribuida';
+            ELSE
+                tipo := 'status';
+            END IF;
+
+            PERFORM pg_notify('os_eventos', json_build_object(
+                'tipo', tipo,
+                'id', NEW.id,
+                'cliente', left(NEW.cliente, 500),
+                'endereco', left(NEW.endereco, 500),
+                'status', NEW.status,
+                'tecnico_id', NEW.tecnico_id
+            )::text);
+
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """))
@@ -0,0 +1,93 @@
+# 0012_busca.py
+#
+# Índices da busca por texto (app/busca.py, GET /busca):
+#
+#   - full-text ('portuguese') de os (cliente peso A, endereço peso B) e
+#     de etapa_historico.descricao (peso C). Índice GIN por expressão: sem
+#     coluna nova, a tabela não é reescrita; a consulta usa a mesma
+#     expressão (VETOR_OS / VETOR_ETAPA em app/busca.py)
+#   - se o servidor tiver pg_trgm, índices de trigramas em cliente,
+#     endereço e descrição para a busca por trecho (ILIKE '%...%')
+#
+# etapa_historico é particionada e não aceita CREATE INDEX CONCURRENTLY:
+# o índice é criado só no pai (ON ONLY, inválido), construído em cada
+# partição sem travar escrita e anexado; com todas anexadas ele fica
+# válido, e as partições criadas depois já nascem com ele.
+#
+from sqlalchemy import text
+
+# CREATE INDEX CONCURRENTLY não roda dentro de transação
+TRANSACAO = False
+
+VETOR_OS = (
+    "(setweight(to_tsvector('portuguese', cliente), 'A') || "
+    "setweight(to_tsvector('portuguese', endereco), 'B'))"
+)
+VETOR_ETAPA = "setweight(to_tsvector('portuguese', coalesce(descricao, '')), 'C')"
+
+
+def _indice_concorrente(conn, nome: str, definicao: str):
+    # Uma tentativa anterior interrompida deixa o índice marcado inválido
+    invalido = conn.execute(text("""
+        SELECT NOT indisvalid FROM pg_index
+        WHERE indexrelid = to_regclass(:nome)
+    """), {"nome": nome}).scalar()
+    if invalido:
+        conn.execute(text(f"DROP INDEX CONCURRENTLY {nome}"))
+
+    conn.execute(text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {nome} ON {definicao}"))
+
+
+def _indice_particionado(conn, nome: str, sufixo: str, definicao: str):
+    conn.execute(text(
+        f"CREATE INDEX IF NOT EXISTS {nome} ON ONLY etapa_historico {definicao}"
+    ))
+
+    particoes = conn.execute(text("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'etapa_historico'::regclass
+        ORDER BY c.relname
+    """)).scalars().all()
+
+    for particao in particoes:
+        indice = f"{particao}_{sufixo}"
+        anexado = conn.execute(text("""
+            SELECT EXISTS (
+                SELECT 1 FROM pg_inherits
+                WHERE inhparent = to_regclass(:pai) AND inhrelid = to_regclass(:indice)
+            )
+        """), {"pai": nome, "indice": indice}).scalar()
+        if anexado:
+            continue
+
+        _indice_concorrente(conn, indice, f"{particao} {definicao}")
+        conn.execute(text(f"ALTER INDEX {nome} ATTACH PARTITION {indice}"))
+
+
+def upgrade(conn):
+    _indice_concorrente(conn, "idx_os_busca", f"os USING gin (({VETOR_OS}))")
+    _indice_particionado(
+        conn, "idx_historico_busca", "busca", f"USING gin (({VETOR_ETAPA}))"
+    )
+
+    disponivel = conn.execute(text(
+        "SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'"
+    )).scalar()
+    if not disponivel:
+        print("  ⚠️  pg_trgm não disponível; busca só por palavras (full-text)")
+        return
+
+    try:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    except Exception as e:
+        # Sem permissão para CREATE EXTENSION: segue só com o full-text
+        print(f"  ⚠️  pg_trgm não habilitado ({e.__class__.__name__}); busca só por palavras")
+        return
+
+    _indice_concorrente(conn, "idx_os_cliente_trgm", "os USING gin (cliente gin_trgm_ops)")
+    _indice_concorrente(conn, "idx_os_endereco_trgm", "os USING gin (endereco gin_trgm_ops)")
+    _indice_particionado(
+        conn, "idx_historico_descricao_trgm", "descricao_trgm", "USING gin (descricao gin_trgm_ops)"
+    )
@@ -0,0 +1,30 @@
+# 0013_tecnico_eventos.py
+#
+# Trigger que publica em 'tecnico_eventos' o id do técnico alterado
+# (nome, email, ativo, admin) ou removido. Cada worker escuta o canal
+# (app/eventos.py) e tira o técnico do cache de identidade
+# (app/auth.py): desativar vale na hora em todos os workers, venha a
+# alteração do ORM, de UPDATE em massa, de SQL direto ou de script.
+#
+from sqlalchemy import text
+
+
+def upgrade(conn):
+    conn.execute(text("""
+        CREATE OR REPLACE FUNCTION notificar_tecnico() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('tecnico_eventos', OLD.id::text);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """))
+
+    # Posição (latitude/longitude, a cada atendimento iniciado) não mexe
+    # na identidade: fica de fora
+    conn.execute(text("DROP TRIGGER IF EXISTS tecnico_eventos ON tecnico"))
+    conn.execute(text("""
+        CREATE TRIGGER tecnico_eventos
+        AFTER UPDATE OF nome, email, ativo, admin OR DELETE ON tecnico
+        FOR EACH ROW
+        EXECUTE FUNCTION notificar_tecnico()
+    """))
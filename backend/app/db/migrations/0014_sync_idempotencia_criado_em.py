@@ -0,0 +1,24 @@
+# 0014_sync_idempotencia_criado_em.py
+#
+# Índice para a limpeza das chaves de idempotência antigas do
+# /sync/etapas (app/particoes.py, SYNC_IDEMPOTENCIA_DIAS).
+#
+from sqlalchemy import text
+
+# CREATE INDEX CONCURRENTLY não roda dentro de transação
+TRANSACAO = False
+
+
+def upgrade(conn):
+    # Tentativa anterior interrompida deixa o índice inválido
+    invalido = conn.execute(text("""
+        SELECT NOT indisvalid FROM pg_index
+        WHERE indexrelid = to_regclass('idx_sync_idempotencia_criado_em')
+    """)).scalar()
+    if invalido:
+        conn.execute(text("DROP INDEX CONCURRENTLY idx_sync_idempotencia_criado_em"))
+
+    conn.execute(text("""
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_sync_idempotencia_criado_em
+        ON sync_idempotencia(criado_em)
+    """))
@@ -0,0 +1,11 @@
+# db/migrations
+#
+# Uma migração por arquivo, NNNN_descricao.py, aplicadas em ordem pelo
+# app.db.migrate. Cada arquivo define:
+#
+#   upgrade(conn)      recebe uma Connection síncrona dentro da transação
+#   TRANSACAO = False  (opcional) roda fora de transação, para comandos
+#                      como CREATE INDEX CONCURRENTLY
+#
+# Migrações já aplicadas não devem ser editadas: mudanças novas vão num
+# arquivo novo com o próximo número.
@@ -6,7 +6,9 @@ from sqlalchemy import (
     ForeignKey,
     Text,
     DateTime,
-    Enum
+    Date,
+    Enum,
+    Float
 )
 from sqlalchemy.orm import declarative_base, relationship
 from datetime import datetime
@@ -51,6 +53,12 @@ class Tecnico(Base):
     email = Column(String, unique=True, nullable=False)
     senha = Column(String, nullable=False)
     ativo = Column(Boolean, default=True)
+    admin = Column(Boolean, default=False, nullable=False)
+
+    # Última posição conhecida (enviada ao iniciar atendimento)
+    latitude = Column(Float)
+    longitude = Column(Float)
+    posicao_em = Column(DateTime)
 
 
 class OS(Base):
@@ -65,6 +73,13 @@ class OS(Base):
     tecnico_id = Column(Integer, ForeignKey("tecnico.id"))
     criado_em = Column(DateTime, default=datetime.utcnow)
 
+    latitude = Column(Float)
+    longitude = Column(Float)
+    geohash = Column(String(12))  # mantido por app/geo.py
+
+    # Chave da OS no ERP (única); preenchida pela importação em massa
+    referencia_externa = Column(String(64))
+
     tecnico = relationship("Tecnico")
 
 
@@ -80,10 +95,21 @@ class Atendimento(Base):
     hora_fim = Column(DateTime)
 
     etapa = Column(Enum(Etapa), default=Etapa.INSPECAO)
+    # Quando entrou na etapa atual (duração da etapa nas métricas)
+    etapa_em = Column(DateTime)
+
+    latitude_inicio = Column(Float)
+    longitude_inicio = Column(Float)
 
     os = relationship("OS")
     tecnico = relationship("Tecnico")
 
+    etapas = relationship(
+        "EtapaHistorico",
+        back_populates="atendimento",
+        order_by="EtapaHistorico.criado_em",
+    )
+
 
 class EtapaHistorico(Base):
     __tablename__ = "etapa_historico"
@@ -96,6 +122,59 @@ class EtapaHistorico(Base):
     descricao = Column(Text)
     foto = Column(Text)
 
+    # Chave de partição (migração 0009). No banco a PK é (id, criado_em);
+    # o id continua único e basta como identidade no ORM
+    criado_em = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    atendimento = relationship("Atendimento", back_populates="etapas")
+
+
+class SyncIdempotencia(Base):
+    """Chaves de eventos já recebidos pelo /sync/etapas (por técnico)."""
+    __tablename__ = "sync_idempotencia"
+
+    tecnico_id = Column(Integer, ForeignKey("tecnico.id"), primary_key=True)
+    chave = Column(String(64), primary_key=True)
+
+    etapa_historico_id = Column(Integer)
     criado_em = Column(DateTime, default=datetime.utcnow)
 
-    atendimento = relationship("Atendimento")
+
+class MetricaEtapaDiaria(Base):
+    """Tempo gasto em cada etapa (por técnico e dia em que a etapa terminou)."""
+    __tablename__ = "metrica_etapa_diaria"
+
+    dia = Column(Date, primary_key=True)
+    tecnico_id = Column(Integer, ForeignKey("tecnico.id"), primary_key=True)
+    etapa = Column(Enum(Etapa), primary_key=True)
+
+    quantidade = Column(Integer, default=0, nullable=False)
+    duracao_total_s = Column(Float, default=0, nullable=False)
+    duracao_max_s = Column(Float, default=0, nullable=False)
+
+
+class MetricaTecnicoDiaria(Base):
+    """Atendimentos iniciados/concluídos por técnico e dia."""
+    __tablename__ = "metrica_tecnico_diaria"
+
+    dia = Column(Date, primary_key=True)
+    tecnico_id = Column(Integer, ForeignKey("tecnico.id"), primary_key=True)
+
+    iniciados = Column(Integer, default=0, nullable=False)
+    concluidos = Column(Integer, default=0, nullable=False)
+    dentro_sla = Column(Integer, default=0, nullable=False)
+    duracao_total_s = Column(Float, default=0, nullable=False)
+    duracao_max_s = Column(Float, default=0, nullable=False)
+
+
+class Despacho(Base):
+    """Plano de despacho: técnico sugerido e ordem de visita de cada OS em aberto."""
+    __tablename__ = "despacho"
+
+    os_id = Column(Integer, ForeignKey("os.id", ondelete="CASCADE"), primary_key=True)
+    tecnico_id = Column(Integer, ForeignKey("tecnico.id"), nullable=False)
+
+    ordem = Column(Integer, nullable=False)
+    # Do ponto anterior da rota (posição do técnico ou OS anterior)
+    distancia_km = Column(Float, nullable=False)
+    planejado_em = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -0,0 +1,296 @@
+# despacho.py
+#
+# Despacho automático: distribui as OS em aberto entre os técnicos ativos
+# (pela última posição conhecida) e define a ordem de visita de cada um.
+#
+#   1. matriz de distâncias OS x técnico (haversine vetorizado no NumPy)
+#   2. atribuição gulosa com capacidade: cada OS vai para o técnico livre
+#      mais próximo; as OS com mais a perder se o mais próximo lotar
+#      ("arrependimento": 2º mais próximo - 1º) escolhem primeiro
+#   3. rota de cada técnico: vizinho mais próximo a partir da posição dele,
+#      melhorada com 2-opt (caminho aberto, sem volta à origem)
+#
+# 5.000 OS x 300 técnicos: ~0,5 s (scripts/bench_despacho.py).
+#
+# O plano vai para a tabela despacho (migração 0010), trocado inteiro a
+# cada replanejamento: pelo admin (POST /admin/despacho) ou a cada
+# DESPACHO_INTERVALO_MIN em uma task de cada worker, com advisory lock
+# para só um replanejar por vez. A OS não muda: o técnico ainda inicia o
+# atendimento pelo fluxo normal; o plano é a rota sugerida.
+#
+import logging
+import math
+import os
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+import numpy as np
+from sqlalchemy import delete, insert, select, text
+from starlette.concurrency import run_in_threadpool
+
+from app.database import AsyncSessionLocal
+from app.db.models import OS, Despacho, StatusOS, Tecnico
+from app.geo import RAIO_TERRA_KM
+from app.tarefas import TarefaPeriodica
+
+logger = logging.getLogger(__name__)
+
+DESPACHO_INTERVALO_MIN = float(os.getenv("DESPACHO_INTERVALO_MIN", "15"))
+# Capacidade de cada técnico: média de OS por técnico x folga...
+DESPACHO_FOLGA = float(os.getenv("DESPACHO_FOLGA", "1.2"))
+# ...limitada a este máximo (0 = sem limite fixo)
+DESPACHO_MAX_POR_TECNICO = int(os.getenv("DESPACHO_MAX_POR_TECNICO", "0"))
+DESPACHO_PASSADAS_2OPT = int(os.getenv("DESPACHO_PASSADAS_2OPT", "10"))
+
+LOCK_DESPACHO = 720_100_003
+
+
+# =================================================
+# CÁLCULO (NUMPY)
+# =================================================
+
+def matriz_distancias(lat_a, lon_a, lat_b, lon_b) -> np.ndarray:
+    """Haversine entre cada ponto de A (linhas) e de B (colunas), em km."""
+    p_a = np.radians(np.asarray(lat_a, dtype=np.float64))[:, None]
+    p_b = np.radians(np.asarray(lat_b, dtype=np.float64))[None, :]
+    d_lon = np.radians(np.asarray(lon_b, dtype=np.float64))[None, :] - np.radians(np.asarray(lon_a, dtype=np.float64))[:, None]
+
+    a = np.sin((p_b - p_a) / 2) ** 2 + np.cos(p_a) * np.cos(p_b) * np.sin(d_lon / 2) ** 2
+    return 2 * RAIO_TERRA_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def capacidade_por_tecnico(n_os: int, n_tecnicos: int) -> int:
+    capacidade = math.ceil(n_os / n_tecnicos * DESPACHO_FOLGA) if n_tecnicos else 0
+    if DESPACHO_MAX_POR_TECNICO:
+        capacidade = min(capacidade, DESPACHO_MAX_POR_TECNICO)
+    return capacidade
+
+
+def atribuir(distancias: np.ndarray, capacidade: int) -> np.ndarray:
+    """Índice do técnico de cada OS (linha), -1 se todos lotaram."""
+    n_os, n_tecnicos = distancias.shape
+    escolhido = np.full(n_os, -1, dtype=np.int64)
+    if n_os == 0 or n_tecnicos == 0 or capacidade <= 0:
+        return escolhido
+
+    # Técnicos de cada OS do mais perto ao mais longe
+    preferencias = np.argsort(distancias, axis=1)
+
+    if n_tecnicos > 1:
+        duas = np.partition(distancias, 1, axis=1)[:, :2]
+        arrependimento = duas[:, 1] - duas[:, 0]
+    else:
+        arrependimento = np.zeros(n_os)
+
+    livres = np.full(n_tecnicos, capacidade, dtype=np.int64)
+    for i in np.argsort(-arrependimento, kind="stable"):
+        for t in preferencias[i]:
+            if livres[t]:
+                livres[t] -= 1
+                escolhido[i] = t
+                break
+        else:
+            # Todos lotados: as próximas também não cabem
+            break
+
+    return escolhido
+
+
+def vizinho_mais_proximo(distancias: np.ndarray) -> np.ndarray:
+    """Caminho a partir do ponto 0 sempre para o mais próximo não visitado."""
+    n = len(distancias)
+    rota = np.empty(n, dtype=np.int64)
+    visitado = np.zeros(n, dtype=bool)
+    atual = 0
+    rota[0] = 0
+    visitado[0] = True
+
+    for k in range(1, n):
+        candidatos = np.where(visitado, np.inf, distancias[atual])
+        atual = int(candidatos.argmin())
+        rota[k] = atual
+        visitado[atual] = True
+
+    return rota
+
+
+def dois_opt(distancias: np.ndarray, rota: np.ndarray, passadas: int = DESPACHO_PASSADAS_2OPT) -> np.ndarray:
+    """
+    Melhora o caminho invertendo trechos rota[i..j] enquanto encurtar.
+    O ponto 0 (técnico) fica fixo no início; o fim é livre. Para cada i
+    o ganho de todos os j é calculado de uma vez.
+    """
+    rota = rota.copy()
+    n = len(rota)
+
+    for _ in range(passadas):
+        melhorou = False
+        for i in range(1, n - 1):
+            a, b = rota[i - 1], rota[i]
+            j = np.arange(i + 1, n)
+            c = rota[j]
+            ultimo = j == n - 1
+            d = rota[np.minimum(j + 1, n - 1)]
+
+            # Arestas (a,b) e (c,d) viram (a,c) e (b,d); no último ponto
+            # não há (c,d)
+            antes = distancias[a, b] + np.where(ultimo, 0.0, distancias[c, d])
+            depois = distancias[a, c] + np.where(ultimo, 0.0, distancias[b, d])
+            ganho = antes - depois
+
+            k = int(ganho.argmax())
+            if ganho[k] > 1e-9:
+                rota[i:j[k] + 1] = rota[i:j[k] + 1][::-1].copy()
+                melhorou = True
+
+        if not melhorou:
+            break
+
+    return rota
+
+
+def comprimento(distancias: np.ndarray, rota: np.ndarray) -> float:
+    return float(distancias[rota[:-1], rota[1:]].sum())
+
+
+def planejar(
+    os_ids, os_lat, os_lon,
+    tecnico_ids, tecnico_lat, tecnico_lon,
+    otimizar: bool = True
+) -> dict:
+    """
+    Plano completo em memória (sem banco). Devolve as paradas de cada
+    técnico em ordem: {"rotas": {tecnico_id: [(os_id, distancia_km), ...]},
+    "sem_tecnico": [os_id, ...], "distancia_total_km": ...}.
+    """
+    os_ids = np.asarray(os_ids)
+    os_lat = np.asarray(os_lat, dtype=np.float64)
+    os_lon = np.asarray(os_lon, dtype=np.float64)
+    tecnico_lat = np.asarray(tecnico_lat, dtype=np.float64)
+    tecnico_lon = np.asarray(tecnico_lon, dtype=np.float64)
+
+    distancias = matriz_distancias(os_lat, os_lon, tecnico_lat, tecnico_lon)
+    escolhido = atribuir(distancias, capacidade_por_tecnico(len(os_ids), len(tecnico_ids)))
+
+    rotas: Dict[int, list] = {}
+    total = 0.0
+    for t in np.unique(escolhido[escolhido >= 0]):
+        indices = np.flatnonzero(escolhido == t)
+
+        # Ponto 0 = técnico, 1..n = OS dele
+        lat = np.concatenate(([tecnico_lat[t]], os_lat[indices]))
+        lon = np.concatenate(([tecnico_lon[t]], os_lon[indices]))
+        local = matriz_distancias(lat, lon, lat, lon)
+
+        rota = vizinho_mais_proximo(local)
+        if otimizar and len(rota) > 3:
+            rota = dois_opt(local, rota)
+
+        trechos = local[rota[:-1], rota[1:]]
+        total += float(trechos.sum())
+        rotas[int(tecnico_ids[t])] = [
+            (int(os_ids[indices[p - 1]]), float(km))
+            for p, km in zip(rota[1:], trechos)
+        ]
+
+    return {
+        "rotas": rotas,
+        "sem_tecnico": [int(i) for i in os_ids[escolhido < 0]],
+        "distancia_total_km": total,
+    }
+
+
+# =================================================
+# BANCO
+# =================================================
+
+def _validas(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    # Mesma regra de geo.coordenada_valida (0,0 = GPS falhou)
+    return (
+        ~((lat == 0) & (lon == 0))
+        & (np.abs(lat) <= 90) & (np.abs(lon) <= 180)
+    )
+
+
+async def _carregar(db):
+    oss = (await db.execute(
+        select(OS.id, OS.latitude, OS.longitude)
+        .where(OS.status == StatusOS.EM_ABERTO, OS.latitude.isnot(None), OS.longitude.isnot(None))
+    )).all()
+    tecnicos = (await db.execute(
+        select(Tecnico.id, Tecnico.latitude, Tecnico.longitude)
+        # Ativo como no login (auth.py): NULL conta como ativo
+        .where(Tecnico.ativo.isnot(False), Tecnico.latitude.isnot(None), Tecnico.longitude.isnot(None))
+        .order_by(Tecnico.id)
+    )).all()
+
+    def colunas(linhas):
+        ids = np.array([l[0] for l in linhas], dtype=np.int64)
+        lat = np.array([l[1] for l in linhas], dtype=np.float64)
+        lon = np.array([l[2] for l in linhas], dtype=np.float64)
+        ok = _validas(lat, lon)
+        return ids[ok], lat[ok], lon[ok]
+
+    return colunas(oss), colunas(tecnicos)
+
+
+async def replanejar(db, aplicar: bool = True) -> Optional[dict]:
+    """
+    Recalcula o plano e, com aplicar, troca o da tabela despacho (na
+    transação de `db`). None se outro processo está replanejando.
+    """
+    if aplicar and not (await db.execute(
+        text("SELECT pg_try_advisory_xact_lock(:k)"), {"k": LOCK_DESPACHO}
+    )).scalar():
+        return None
+
+    inicio = time.perf_counter()
+    (os_ids, os_lat, os_lon), (tecnico_ids, tecnico_lat, tecnico_lon) = await _carregar(db)
+
+    # CPU pura: fora do event loop (o NumPy solta o GIL nas operações grandes)
+    plano = await run_in_threadpool(
+        planejar, os_ids, os_lat, os_lon, tecnico_ids, tecnico_lat, tecnico_lon
+    )
+    plano["tempo_ms"] = (time.perf_counter() - inicio) * 1000
+    plano["planejado_em"] = datetime.utcnow()
+
+    if aplicar:
+        await db.execute(delete(Despacho))
+        linhas = [
+            {
+                "os_id": os_id, "tecnico_id": tecnico_id, "ordem": ordem,
+                "distancia_km": km, "planejado_em": plano["planejado_em"]
+            }
+            for tecnico_id, paradas in plano["rotas"].items()
+            for ordem, (os_id, km) in enumerate(paradas, start=1)
+        ]
+        if linhas:
+            await db.execute(insert(Despacho), linhas)
+        await db.commit()
+
+    return plano
+
+
+# =================================================
+# REPLANEJAMENTO PERIÓDICO
+# =================================================
+
+async def _rodada_despacho():
+    async with AsyncSessionLocal() as db:
+        plano = await replanejar(db)
+    if plano is not None:
+        logger.info(
+            f"🧭 Despacho replanejado: {sum(len(p) for p in plano['rotas'].values())} OS "
+            f"para {len(plano['rotas'])} técnicos, {len(plano['sem_tecnico'])} sem técnico "
+            f"({plano['tempo_ms']:.0f} ms)"
+        )
+
+
+# DESPACHO_INTERVALO_MIN = 0 desliga (só pelo POST /admin/despacho)
+replanejamento_despacho = TarefaPeriodica(
+    _rodada_despacho,
+    DESPACHO_INTERVALO_MIN * 60,
+    "Erro no replanejamento do despacho",
+    imediata=False
+)
@@ -0,0 +1,212 @@
+# eventos.py
+#
+# Eventos de OS em tempo real (Server-Sent Events).
+#
+# Um trigger no banco (migração 0002) faz pg_notify('os_eventos', ...) a
+# cada OS criada ou com status/técnico alterado. Cada worker mantém UMA
+# conexão asyncpg dedicada em LISTEN e repassa os eventos para as filas
+# em memória dos clientes conectados. Cliente ocioso custa só uma fila e
+# uma corrotina: nenhuma conexão do pool fica presa.
+#
+# Se a fila de um cliente lento enche, se a conexão de LISTEN cair ou
+# depois de uma importação em massa de OS, o cliente recebe "resync" e
+# deve recarregar /os/abertas.
+#
+# A mesma conexão escuta 'tecnico_eventos' (migração 0013): técnico
+# alterado ou removido sai do cache de identidade deste worker.
+#
+import asyncio
+import json
+import logging
+import os
+from typing import Optional, Set
+
+import asyncpg
+
+from app.auth import invalidar_usuario, usuarios_cache
+from app.database import DB_URL
+from app.db.models import StatusOS
+
+logger = logging.getLogger(__name__)
+
+CANAL_OS = "os_eventos"
+CANAL_TECNICOS = "tecnico_eventos"
+
+# LISTEN precisa de conexão direta com o Postgres (não passa por PgBouncer
+# em modo transaction); por padrão usa o mesmo banco da API
+EVENTOS_DB_URL = os.getenv("EVENTOS_DB_URL", DB_URL.replace("postgresql+psycopg2://", "postgresql://", 1))
+EVENTOS_FILA_MAX = int(os.getenv("EVENTOS_FILA_MAX", "100"))
+EVENTOS_MAX_CONEXOES = int(os.getenv("EVENTOS_MAX_CONEXOES", "5000"))
+EVENTOS_HEARTBEAT = float(os.getenv("EVENTOS_HEARTBEAT", "25"))
+
+RESYNC = "event: resync\ndata: {}\n\n"
+PING = ": ping\n\n"
+
+
+def os_visivel_para(status: str, tecnico_id: Optional[int], user_id: int) -> bool:
+    """Mesma regra de /os/abertas: some a concluída e a que outro técnico pegou."""
+    if status == StatusOS.CONCLUIDA.value:
+        return False
+    if status in (StatusOS.EM_ATENDIMENTO.value, StatusOS.EM_CAMPO.value):
+        return tecnico_id == user_id
+    return True
+
+
+def _mensagem(acao: str, dados: dict) -> str:
+    return f"event: os\ndata: {json.dumps({'acao': acao, 'os': dados}, ensure_ascii=False)}\n\n"
+
+
+class Assinante:
+    __slots__ = ("user_id", "fila")
+
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+        self.fila: asyncio.Queue = asyncio.Queue(maxsize=EVENTOS_FILA_MAX)
+
+    def entregar(self, mensagem: str):
+        try:
+            self.fila.put_nowait(mensagem)
+        except asyncio.QueueFull:
+            # Cliente não acompanha: descarta o acumulado e pede recarga
+            while not self.fila.empty():
+                self.fila.get_nowait()
+            self.fila.put_nowait(RESYNC)
+
+
+class HubEventos:
+    def __init__(self):
+        self.assinantes: Set[Assinante] = set()
+        self.conectado = False
+        self.eventos = 0
+        self._tarefa: Optional[asyncio.Task] = None
+
+    # ----- assinaturas -----
+
+    def lotado(self) -> bool:
+        return len(self.assinantes) >= EVENTOS_MAX_CONEXOES
+
+    def assinar(self, user_id: int) -> Assinante:
+        assinante = Assinante(user_id)
+        self.assinantes.add(assinante)
+        return assinante
+
+    def cancelar(self, assinante: Assinante):
+        self.assinantes.discard(assinante)
+
+    def _difundir(self, dados: dict):
+        # Serializa uma vez por evento; cada cliente só escolhe a versão
+        atualizar = _mensagem("atualizar", dados)
+        remover = _mensagem("remover", {"id": dados["id"]})
+
+        for assinante in self.assinantes:
+            if os_visivel_para(dados["status"], dados["tecnico_id"], assinante.user_id):
+                assinante.entregar(atualizar)
+            else:
+                assinante.entregar(remover)
+
+    def _resync(self):
+        for assinante in self.assinantes:
+            assinante.entregar(RESYNC)
+
+    def _ao_notificar(self, conexao, pid, canal, payload):
+        try:
+            dados = json.loads(payload)
+        except ValueError:
+            logger.warning(f"⚠️  Evento inválido em {canal}: {payload[:200]}")
+            return
+
+        self.eventos += 1
+        # Carga em massa (app/importacao.py): um aviso só no lugar de N eventos
+        if dados.get("tipo") == "resync":
+            self._resync()
+            return
+        self._difundir(dados)
+
+    def _ao_alterar_tecnico(self, conexao, pid, canal, payload):
+        try:
+            invalidar_usuario(int(payload))
+        except ValueError:
+            logger.warning(f"⚠️  Evento inválido em {canal}: {payload[:200]}")
+
+    # ----- conexão LISTEN -----
+
+    async def iniciar(self):
+        if self._tarefa is None:
+            self._tarefa = asyncio.create_task(self._escutar())
+
+    async def encerrar(self):
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+            try:
+                await self._tarefa
+            except asyncio.CancelledError:
+                pass
+            self._tarefa = None
+
+    async def _escutar(self):
+        espera = 1
+
+        while True:
+            conexao = None
+            try:
+                conexao = await asyncpg.connect(EVENTOS_DB_URL)
+                await conexao.add_listener(CANAL_OS, self._ao_notificar)
+                await conexao.add_listener(CANAL_TECNICOS, self._ao_alterar_tecnico)
+                self.conectado = True
+                espera = 1
+                logger.info(f"📡 Escutando eventos de OS ({CANAL_OS}) e técnicos ({CANAL_TECNICOS})")
+
+                # Pode ter perdido eventos enquanto estava desconectado
+                self._resync()
+                usuarios_cache.clear()
+
+                # Notificações chegam pelo callback; aqui só confere se a
+                # conexão continua viva
+                while True:
+                    await asyncio.sleep(EVENTOS_HEARTBEAT)
+                    await conexao.fetchval("SELECT 1")
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"⚠️  Conexão de eventos perdida: {e}. Reconectando em {espera}s")
+            finally:
+                self.conectado = False
+                if conexao is not None and not conexao.is_closed():
+                    await conexao.close()
+
+            await asyncio.sleep(espera)
+            espera = min(espera * 2, 30)
+
+    def metricas(self):
+        return {
+            "conectado": self.conectado,
+            "clientes": len(self.assinantes),
+            "eventos": self.eventos,
+        }
+
+
+hub = HubEventos()
+
+
+async def fluxo_sse(user_id: int, expira_em: float):
+    """Corpo do StreamingResponse: eventos da fila + ping periódico."""
+    loop = asyncio.get_running_loop()
+    assinante = hub.assinar(user_id)
+    try:
+        yield "retry: 5000\n\n"
+
+        while True:
+            restante = expira_em - loop.time()
+            if restante <= 0:
+                # Token venceu: encerra e o cliente reconecta com token novo
+                break
+
+            try:
+                yield await asyncio.wait_for(
+                    assinante.fila.get(), min(EVENTOS_HEARTBEAT, restante)
+                )
+            except asyncio.TimeoutError:
+                yield PING
+    finally:
+        hub.cancelar(assinante)
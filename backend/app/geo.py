@@ -0,0 +1,204 @@
+# geo.py
+#
+# Coordenadas das OS e busca das K OS abertas mais próximas do técnico.
+#
+# Com PostGIS instalado (e o índice GiST da migração 0004) a busca é um
+# ORDER BY <-> (KNN) direto no índice. Sem PostGIS usa geohash: cada OS
+# guarda o geohash da posição, indexado (text_pattern_ops) só para as não
+# concluídas. A busca lê as 9 células em volta do técnico e, se não achar
+# K OS garantidamente mais próximas que a borda dessas células, sobe para
+# células maiores (precisão menor).
+#
+import math
+from typing import List, Optional, Tuple
+
+from sqlalchemy import event, inspect, text, func, and_, or_
+
+from app.db.models import OS
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+PRECISAO_GEOHASH = 9
+RAIO_TERRA_KM = 6371.0
+
+# Precisão inicial da busca (5 ≈ 4,9 km x 4,9 km por célula)
+PRECISAO_BUSCA = 5
+
+# Preenchido no startup por detectar_postgis()
+POSTGIS = False
+
+
+# =================================================
+# GEOHASH
+# =================================================
+
+def coordenada_valida(latitude: Optional[float], longitude: Optional[float]) -> bool:
+    # O app manda 0,0 quando o GPS falha
+    if latitude is None or longitude is None or (latitude == 0 and longitude == 0):
+        return False
+    return -90 <= latitude <= 90 and -180 <= longitude <= 180
+
+
+def codificar(latitude: float, longitude: float, precisao: int = PRECISAO_GEOHASH) -> str:
+    lat = [-90.0, 90.0]
+    lon = [-180.0, 180.0]
+    resultado = []
+    bits = 0
+    n_bits = 0
+    par = True
+
+    while len(resultado) < precisao:
+        intervalo, valor = (lon, longitude) if par else (lat, latitude)
+        meio = (intervalo[0] + intervalo[1]) / 2
+
+        bits <<= 1
+        if valor >= meio:
+            bits |= 1
+            intervalo[0] = meio
+        else:
+            intervalo[1] = meio
+
+        par = not par
+        n_bits += 1
+        if n_bits == 5:
+            resultado.append(BASE32[bits])
+            bits = 0
+            n_bits = 0
+
+    return "".join(resultado)
+
+
+def dimensoes_celula(precisao: int) -> Tuple[float, float]:
+    """(altura, largura) da célula em graus."""
+    bits_lon = math.ceil(precisao * 5 / 2)
+    bits_lat = math.floor(precisao * 5 / 2)
+    return 180.0 / (2 ** bits_lat), 360.0 / (2 ** bits_lon)
+
+
+def celulas_vizinhas(latitude: float, longitude: float, precisao: int) -> List[str]:
+    """A célula do ponto e as 8 em volta (sem repetir nos polos/antimeridiano)."""
+    altura, largura = dimensoes_celula(precisao)
+    celulas = []
+
+    for d_lat in (-1, 0, 1):
+        lat = latitude + d_lat * altura
+        if not -90 <= lat <= 90:
+            continue
+        for d_lon in (-1, 0, 1):
+            lon = (longitude + d_lon * largura + 180) % 360 - 180
+            celula = codificar(lat, lon, precisao)
+            if celula not in celulas:
+                celulas.append(celula)
+
+    return celulas
+
+
+def raio_coberto_km(latitude: float, longitude: float, precisao: int) -> float:
+    """Distância mínima do ponto até a borda do bloco 3x3 de células.
+
+    Qualquer OS mais perto que isso está, com certeza, dentro do bloco.
+    """
+    altura, largura = dimensoes_celula(precisao)
+    celula_lat = math.floor((latitude + 90) / altura) * altura - 90
+    celula_lon = math.floor((longitude + 180) / largura) * largura - 180
+
+    # Margem até a borda do bloco, em graus, para cada lado
+    margem_lat = min(latitude - (celula_lat - altura), (celula_lat + 2 * altura) - latitude)
+    margem_lon = min(longitude - (celula_lon - largura), (celula_lon + 2 * largura) - longitude)
+
+    km_por_grau = math.pi * RAIO_TERRA_KM / 180
+    # A largura em km de um grau de longitude encolhe com a latitude; usa a
+    # latitude mais distante do equador dentro do bloco (pior caso)
+    lat_extrema = min(abs(latitude) + margem_lat, 90)
+    return min(
+        margem_lat * km_por_grau,
+        margem_lon * km_por_grau * math.cos(math.radians(lat_extrema))
+    )
+
+
+def lado_minimo_km(precisao: int, latitude: float) -> float:
+    altura, largura = dimensoes_celula(precisao)
+    km_por_grau = math.pi * RAIO_TERRA_KM / 180
+    return min(altura * km_por_grau, largura * km_por_grau * math.cos(math.radians(abs(latitude))))
+
+
+def proxima_precisao(precisao: int, encontradas: int, k: int,
+                     distancia_k: Optional[float], latitude: float) -> int:
+    """Quantos níveis subir quando as células atuais não bastaram."""
+    if encontradas >= k:
+        # Já se sabe o raio necessário: vai direto a células desse tamanho
+        alvo = precisao - 1
+        while alvo > 1 and lado_minimo_km(alvo, latitude) < distancia_k:
+            alvo -= 1
+        return alvo
+
+    # Poucas OS por perto: cada nível tem área 32x maior
+    if encontradas == 0:
+        return precisao - 2
+    return precisao - max(1, math.ceil(math.log(k / encontradas, 32)))
+
+
+def distancia_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Haversine."""
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    d_lat = p2 - p1
+    d_lon = math.radians(lon2 - lon1)
+    a = math.sin(d_lat / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(d_lon / 2) ** 2
+    return 2 * RAIO_TERRA_KM * math.asin(math.sqrt(a))
+
+
+def distancia_km_sql(latitude: float, longitude: float):
+    """Haversine em SQL entre a OS e o ponto (só funções nativas)."""
+    d_lat = func.radians(OS.latitude - latitude)
+    d_lon = func.radians(OS.longitude - longitude)
+    a = (
+        func.power(func.sin(d_lat / 2), 2)
+        + math.cos(math.radians(latitude)) * func.cos(func.radians(OS.latitude))
+        * func.power(func.sin(d_lon / 2), 2)
+    )
+    return 2 * RAIO_TERRA_KM * func.asin(func.least(func.sqrt(a), 1.0))
+
+
+def filtro_celulas(celulas: List[str]):
+    """OS cujo geohash começa com alguma das células (range no índice)."""
+    # ~>=~ / ~<~ são os operadores do text_pattern_ops: comparam byte a
+    # byte e funcionam com parâmetros (LIKE 'x%' não, em plano genérico)
+    return or_(*[
+        and_(OS.geohash.op("~>=~")(celula), OS.geohash.op("~<~")(celula + "~"))
+        for celula in celulas
+    ])
+
+
+# Mantém o geohash em dia em toda OS gravada pelo ORM. Cargas em massa
+# (COPY/insert direto) precisam preencher a coluna com codificar().
+@event.listens_for(OS, "before_insert")
+def _geohash_ao_inserir(mapper, connection, target):
+    if coordenada_valida(target.latitude, target.longitude):
+        target.geohash = codificar(target.latitude, target.longitude)
+
+
+@event.listens_for(OS, "before_update")
+def _geohash_ao_alterar(mapper, connection, target):
+    # Só quando a posição mudou (mudança de status não recalcula nada)
+    estado = inspect(target)
+    if not (estado.attrs.latitude.history.has_changes()
+            or estado.attrs.longitude.history.has_changes()):
+        return
+
+    if coordenada_valida(target.latitude, target.longitude):
+        target.geohash = codificar(target.latitude, target.longitude)
+    else:
+        target.geohash = None
+
+
+# =================================================
+# POSTGIS
+# =================================================
+
+def detectar_postgis(conn) -> bool:
+    """Liga a busca KNN se houver PostGIS e o índice GiST das OS abertas."""
+    global POSTGIS
+    POSTGIS = bool(conn.execute(text("""
+        SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'postgis')
+           AND to_regclass('idx_os_abertas_geo') IS NOT NULL
+    """)).scalar())
+    return POSTGIS
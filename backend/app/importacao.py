@@ -0,0 +1,378 @@
+# importacao.py
+#
+# Importação em massa de OS (lotes do ERP), em CSV ou NDJSON:
+#
+#   1. lê o arquivo em lotes de IMPORTACAO_LOTE linhas e valida cada uma
+#      (campos obrigatórios, coordenadas); o geohash é calculado aqui, já
+#      que o evento do ORM (app/geo.py) não roda em COPY
+#   2. COPY das linhas válidas para uma tabela temporária (staging)
+#   3. um único INSERT ... ON CONFLICT (referencia_externa) da staging
+#      para os: OS nova entra em aberto; a existente, se ainda em aberto,
+#      tem cliente/endereço/posição atualizados. OS já em atendimento ou
+#      concluída não é mexida (a linha volta como erro)
+#
+# Linha inválida não derruba a importação: volta na lista de erros com o
+# número da linha e as demais seguem. Referência repetida no arquivo: vale
+# a última ocorrência. Tudo numa transação; simular faz o mesmo caminho e
+# desfaz no fim (relatório sem gravar nada).
+#
+# O NOTIFY por OS do trigger os_eventos fica desligado na transação
+# (migração 0011) e os clientes SSE recebem um único resync no commit.
+#
+# Colunas: referencia_externa, cliente, endereco, latitude, longitude (as
+# duas últimas opcionais). CSV com cabeçalho, separado por vírgula ou por
+# ponto e vírgula (como o Excel exporta; aceita vírgula decimal).
+#
+#   POST /admin/importacao/os          (multipart, campo "arquivo")
+#   cd backend && python -m app.importacao ordens.csv [--simular]
+#
+import argparse
+import asyncio
+import csv
+import io
+import itertools
+import json
+import logging
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
+
+from app import geo
+from app.database import async_engine
+
+logger = logging.getLogger(__name__)
+
+IMPORTACAO_LOTE = int(os.getenv("IMPORTACAO_LOTE", "5000"))
+# Erros devolvidos no relatório (os demais só são contados)
+IMPORTACAO_MAX_ERROS = int(os.getenv("IMPORTACAO_MAX_ERROS", "1000"))
+
+LOCK_IMPORTACAO = 720_100_004
+
+CAMPOS_OBRIGATORIOS = ("referencia_externa", "cliente", "endereco")
+TAMANHO_REFERENCIA = 64
+
+COLUNAS_STAGING = (
+    "linha", "referencia_externa", "cliente", "endereco", "latitude", "longitude", "geohash"
+)
+
+SQL_STAGING = """
+    CREATE TEMP TABLE os_importacao (
+        linha INTEGER NOT NULL,
+        referencia_externa VARCHAR(64) NOT NULL,
+        cliente TEXT NOT NULL,
+        endereco TEXT NOT NULL,
+        latitude DOUBLE PRECISION,
+        longitude DOUBLE PRECISION,
+        geohash VARCHAR(12)
+    ) ON COMMIT DROP
+"""
+
+# Mesma referência em mais de uma linha: fica a última
+SQL_REPETIDAS = """
+    DELETE FROM os_importacao i
+    USING os_importacao j
+    WHERE j.referencia_externa = i.referencia_externa AND j.linha > i.linha
+    RETURNING i.linha, i.referencia_externa
+"""
+
+SQL_FORA_DE_ABERTO = """
+    SELECT i.linha, i.referencia_externa, o.status
+    FROM os_importacao i
+    JOIN os o ON o.referencia_externa = i.referencia_externa
+    WHERE o.status <> 'EM_ABERTO'
+      AND (o.cliente, o.endereco, o.latitude, o.longitude)
+          IS DISTINCT FROM (i.cliente, i.endereco, i.latitude, i.longitude)
+"""
+
+# xmax = 0 só na linha recém-inserida (a atualizada tem o xmax da transação)
+SQL_UPSERT = """
+    WITH gravadas AS (
+        INSERT INTO os (referencia_externa, cliente, endereco, latitude, longitude, geohash, status, criado_em)
+        SELECT referencia_externa, cliente, endereco, latitude, longitude, geohash, 'EM_ABERTO', :agora
+        FROM os_importacao
+        ORDER BY linha
+        ON CONFLICT (referencia_externa) DO UPDATE SET
+            cliente = EXCLUDED.cliente,
+            endereco = EXCLUDED.endereco,
+            latitude = EXCLUDED.latitude,
+            longitude = EXCLUDED.longitude,
+            geohash = EXCLUDED.geohash
+        WHERE os.status = 'EM_ABERTO'
+          AND (os.cliente, os.endereco, os.latitude, os.longitude)
+              IS DISTINCT FROM (EXCLUDED.cliente, EXCLUDED.endereco, EXCLUDED.latitude, EXCLUDED.longitude)
+        RETURNING xmax = 0 AS inserida
+    )
+    SELECT count(*) FILTER (WHERE inserida), count(*) FILTER (WHERE NOT inserida)
+    FROM gravadas
+"""
+
+
+class ArquivoInvalido(Exception):
+    """O arquivo como um todo não serve (cabeçalho, codificação): nada é importado."""
+
+
+def formato_pelo_nome(nome: Optional[str]) -> Optional[str]:
+    extensao = (nome or "").rsplit(".", 1)[-1].lower()
+    if extensao == "csv":
+        return "csv"
+    if extensao in ("ndjson", "jsonl"):
+        return "ndjson"
+    return None
+
+
+# =================================================
+# LEITURA E VALIDAÇÃO
+# =================================================
+# Geradores de (número da linha, registro dict | mensagem de erro)
+
+def _linhas_csv(arquivo):
+    texto = io.TextIOWrapper(arquivo, encoding="utf-8-sig", newline="")
+    try:
+        cabecalho = texto.readline()
+        if not cabecalho.strip():
+            raise ArquivoInvalido("Arquivo vazio")
+
+        separador = ";" if cabecalho.count(";") > cabecalho.count(",") else ","
+        colunas = [c.strip().lower() for c in next(csv.reader([cabecalho], delimiter=separador))]
+        faltando = [c for c in CAMPOS_OBRIGATORIOS if c not in colunas]
+        if faltando:
+            raise ArquivoInvalido(f"Colunas obrigatórias ausentes: {', '.join(faltando)}")
+
+        leitor = csv.reader(texto, delimiter=separador)
+        for valores in leitor:
+            # line_num não conta o cabeçalho, lido à parte
+            numero = leitor.line_num + 1
+            if not any(v.strip() for v in valores):
+                continue
+            if len(valores) != len(colunas):
+                yield numero, f"Esperadas {len(colunas)} colunas, encontradas {len(valores)}"
+                continue
+            yield numero, dict(zip(colunas, valores))
+    finally:
+        # Sem isso o wrapper fecharia o arquivo de quem chamou
+        texto.detach()
+
+
+def _linhas_ndjson(arquivo):
+    for numero, linha in enumerate(arquivo, start=1):
+        if not linha.strip():
+            continue
+        try:
+            registro = json.loads(linha)
+        except ValueError:
+            yield numero, "JSON inválido"
+            continue
+        if not isinstance(registro, dict):
+            yield numero, "Esperado um objeto JSON"
+            continue
+        yield numero, registro
+
+
+def _texto(registro: dict, campo: str) -> str:
+    valor = registro.get(campo)
+    # Referência numérica no NDJSON é comum em ERP
+    if isinstance(valor, int) and not isinstance(valor, bool):
+        valor = str(valor)
+    if not isinstance(valor, str) or not valor.strip():
+        raise ValueError(f"{campo} obrigatório")
+    if "\x00" in valor:
+        raise ValueError(f"{campo} com caractere inválido")
+    return valor.strip()
+
+
+def _coordenada(valor) -> Optional[float]:
+    if valor is None or (isinstance(valor, str) and not valor.strip()):
+        return None
+    if isinstance(valor, bool):
+        raise ValueError
+    if isinstance(valor, str):
+        valor = valor.strip().replace(",", ".")
+    return float(valor)
+
+
+def validar(registro: dict) -> tuple:
+    """(referencia, cliente, endereco, latitude, longitude, geohash) ou ValueError com o motivo."""
+    referencia = _texto(registro, "referencia_externa")
+    if len(referencia) > TAMANHO_REFERENCIA:
+        raise ValueError(f"referencia_externa com mais de {TAMANHO_REFERENCIA} caracteres")
+    cliente = _texto(registro, "cliente")
+    endereco = _texto(registro, "endereco")
+
+    try:
+        latitude = _coordenada(registro.get("latitude"))
+        longitude = _coordenada(registro.get("longitude"))
+    except (TypeError, ValueError):
+        raise ValueError("Latitude/longitude não numérica")
+
+    if latitude is None and longitude is None:
+        return referencia, cliente, endereco, None, None, None
+    if not geo.coordenada_valida(latitude, longitude):
+        raise ValueError("Latitude/longitude inválida")
+
+    return referencia, cliente, endereco, latitude, longitude, geo.codificar(latitude, longitude)
+
+
+def _ler_lote(linhas, tamanho: int):
+    """Próximas `tamanho` linhas: (quantas lidas, registros do COPY, erros)."""
+    lidas = 0
+    validas = []
+    erros = []
+    for numero, registro in itertools.islice(linhas, tamanho):
+        lidas += 1
+        if isinstance(registro, str):
+            erros.append((numero, None, registro))
+            continue
+        try:
+            validas.append((numero, *validar(registro)))
+        except ValueError as e:
+            referencia = registro.get("referencia_externa")
+            erros.append((numero, str(referencia)[:TAMANHO_REFERENCIA] if referencia else None, str(e)))
+    return lidas, validas, erros
+
+
+# =================================================
+# IMPORTAÇÃO
+# =================================================
+
+def _anotar_erros(resultado: dict, erros):
+    for linha, referencia, mensagem in erros:
+        resultado["com_erro"] += 1
+        if len(resultado["erros"]) < IMPORTACAO_MAX_ERROS:
+            resultado["erros"].append(
+                {"linha": linha, "referencia_externa": referencia, "erro": mensagem}
+            )
+
+
+async def importar(arquivo, formato: str, simular: bool = False, engine=async_engine) -> Optional[dict]:
+    """
+    Importa o arquivo (binário, aberto para leitura). None se outra
+    importação está em andamento; ArquivoInvalido se nada pode ser lido.
+    """
+    inicio = time.perf_counter()
+    resultado = {
+        "simulada": simular,
+        "lidas": 0,
+        "validas": 0,
+        "inseridas": 0,
+        "atualizadas": 0,
+        "inalteradas": 0,
+        "com_erro": 0,
+        "erros": [],
+    }
+    linhas = _linhas_csv(arquivo) if formato == "csv" else _linhas_ndjson(arquivo)
+
+    async with engine.connect() as conn:
+        transacao = await conn.begin()
+        try:
+            if not (await conn.execute(
+                text("SELECT pg_try_advisory_xact_lock(:k)"), {"k": LOCK_IMPORTACAO}
+            )).scalar():
+                return None
+
+            await conn.execute(text(SQL_STAGING))
+            await conn.execute(text("SET LOCAL app.os_eventos = 'off'"))
+            raw = (await conn.get_raw_connection()).driver_connection
+
+            while True:
+                # Leitura e validação são CPU: fora do event loop
+                try:
+                    lidas, validas, erros = await run_in_threadpool(_ler_lote, linhas, IMPORTACAO_LOTE)
+                except UnicodeDecodeError:
+                    raise ArquivoInvalido("Arquivo não está em UTF-8")
+
+                resultado["lidas"] += lidas
+                _anotar_erros(resultado, erros)
+                if validas:
+                    await raw.copy_records_to_table(
+                        "os_importacao", records=validas, columns=COLUNAS_STAGING
+                    )
+                if lidas < IMPORTACAO_LOTE:
+                    break
+
+            await conn.execute(text("ANALYZE os_importacao"))
+
+            repetidas = (await conn.execute(text(SQL_REPETIDAS))).all()
+            _anotar_erros(resultado, (
+                (linha, referencia, "Referência repetida no arquivo: vale a última ocorrência")
+                for linha, referencia in repetidas
+            ))
+
+            resultado["validas"] = (await conn.execute(text("SELECT count(*) FROM os_importacao"))).scalar()
+
+            bloqueadas = (await conn.execute(text(SQL_FORA_DE_ABERTO))).all()
+            _anotar_erros(resultado, (
+                (linha, referencia, f"OS com status {status}: alterações não aplicadas")
+                for linha, referencia, status in bloqueadas
+            ))
+
+            inseridas, atualizadas = (await conn.execute(
+                text(SQL_UPSERT), {"agora": datetime.utcnow()}
+            )).one()
+            resultado["inseridas"] = inseridas
+            resultado["atualizadas"] = atualizadas
+            resultado["inalteradas"] = resultado["validas"] - inseridas - atualizadas - len(bloqueadas)
+
+            # Entregue só no commit: simulação não avisa ninguém
+            if inseridas or atualizadas:
+                await conn.execute(text("""SELECT pg_notify('os_eventos', '{"tipo": "resync"}')"""))
+
+            if simular:
+                await transacao.rollback()
+            else:
+                await transacao.commit()
+        finally:
+            if transacao.is_active:
+                await transacao.rollback()
+
+    resultado["erros"].sort(key=lambda e: e["linha"])
+    resultado["erros_omitidos"] = resultado["com_erro"] - len(resultado["erros"])
+    resultado["tempo_ms"] = round((time.perf_counter() - inicio) * 1000, 1)
+    return resultado
+
+
+async def _importar_arquivo(caminho: str, formato: str, simular: bool) -> Optional[dict]:
+    try:
+        if caminho == "-":
+            return await importar(sys.stdin.buffer, formato, simular)
+        with open(caminho, "rb") as arquivo:
+            return await importar(arquivo, formato, simular)
+    finally:
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Importa OS em massa (CSV/NDJSON)")
+    parser.add_argument("arquivo", help="caminho do arquivo ou - para stdin")
+    parser.add_argument("--formato", choices=["csv", "ndjson"], help="padrão: pela extensão")
+    parser.add_argument("--simular", action="store_true", help="valida e conta, sem gravar")
+    args = parser.parse_args()
+
+    formato = args.formato or formato_pelo_nome(args.arquivo)
+    if formato is None:
+        parser.error("informe --formato (extensão não reconhecida)")
+
+    try:
+        resultado = asyncio.run(_importar_arquivo(args.arquivo, formato, args.simular))
+    except ArquivoInvalido as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    if resultado is None:
+        print("⏳ Outra importação em andamento")
+        sys.exit(1)
+
+    print(
+        f"📥 {resultado['lidas']} linhas em {resultado['tempo_ms'] / 1000:.1f}s"
+        f"{' (simulação, nada gravado)' if resultado['simulada'] else ''}: "
+        f"{resultado['inseridas']} inseridas, {resultado['atualizadas']} atualizadas, "
+        f"{resultado['inalteradas']} inalteradas, {resultado['com_erro']} com erro"
+    )
+    for erro in resultado["erros"]:
+        print(f"   linha {erro['linha']} [{erro['referencia_externa'] or '-'}]: {erro['erro']}")
+    if resultado["erros_omitidos"]:
+        print(f"   ... +{resultado['erros_omitidos']} erros")
@@ -0,0 +1,290 @@
+# instrumentacao.py
+#
+# Medição por requisição:
+#
+#   - latência por rota (histograma), número de consultas e tempo de banco
+#     de cada requisição, contados pelos eventos before/after_cursor_execute
+#     dos engines (síncrono e assíncrono)
+#   - /metrics no formato texto do Prometheus
+#   - log de requisição lenta: acima de LOG_LENTO_MS ou de
+#     LOG_LENTO_CONSULTAS consultas, loga a lista de SQL agrupada (a mesma
+#     consulta repetida N vezes é o sinal de N+1)
+#
+# A requisição corrente fica num ContextVar: as consultas feitas pela rota,
+# pelas dependências e por run_in_threadpool caem na mesma medição. Tarefas
+# de fundo (hub, partições) não têm requisição e não são contadas.
+#
+# As métricas são por processo: com vários workers, o Prometheus soma.
+#
+import logging
+import os
+import re
+import time
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+LOG_LENTO_MS = float(os.getenv("LOG_LENTO_MS", "500"))
+LOG_LENTO_CONSULTAS = int(os.getenv("LOG_LENTO_CONSULTAS", "20"))
+# Consultas guardadas por requisição para o log (as demais só são contadas)
+LOG_LENTO_MAX_SQL = int(os.getenv("LOG_LENTO_MAX_SQL", "200"))
+# Vazio: /metrics aberto (rede interna). Com valor: exige Bearer <token>
+METRICAS_TOKEN = os.getenv("METRICAS_TOKEN", "")
+
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_CONSULTAS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+# =================================================
+# MEDIÇÃO DA REQUISIÇÃO
+# =================================================
+
+class MedicaoRequisicao:
+    __slots__ = ("consultas", "tempo_db", "sql", "_inicio_consulta")
+
+    def __init__(self):
+        self.consultas = 0
+        self.tempo_db = 0.0
+        self.sql: List[str] = []
+        self._inicio_consulta: Dict[int, float] = {}
+
+
+_requisicao: ContextVar[Optional[MedicaoRequisicao]] = ContextVar("requisicao", default=None)
+
+
+def medicao_atual() -> Optional[MedicaoRequisicao]:
+    return _requisicao.get()
+
+
+def _antes_consulta(conn, cursor, statement, parameters, context, executemany):
+    medicao = _requisicao.get()
+    if medicao is not None:
+        medicao._inicio_consulta[id(cursor)] = time.perf_counter()
+
+
+def _depois_consulta(conn, cursor, statement, parameters, context, executemany):
+    medicao = _requisicao.get()
+    if medicao is None:
+        return
+
+    inicio = medicao._inicio_consulta.pop(id(cursor), None)
+    medicao.consultas += 1
+    if inicio is not None:
+        medicao.tempo_db += time.perf_counter() - inicio
+    if len(medicao.sql) < LOG_LENTO_MAX_SQL:
+        medicao.sql.append(statement)
+
+
+def instrumentar_engine(engine):
+    """Registra os eventos de cursor (AsyncEngine: no sync_engine)."""
+    alvo = getattr(engine, "sync_engine", engine)
+    if not event.contains(alvo, "before_cursor_execute", _antes_consulta):
+        event.listen(alvo, "before_cursor_execute", _antes_consulta)
+        event.listen(alvo, "after_cursor_execute", _depois_consulta)
+
+
+# =================================================
+# AGREGADOS (PROMETHEUS)
+# =================================================
+
+class Histograma:
+    __slots__ = ("buckets", "contagens", "soma", "total")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.contagens = [0] * len(buckets)
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, valor: float):
+        self.soma += valor
+        self.total += 1
+        for i, limite in enumerate(self.buckets):
+            if valor <= limite:
+                self.contagens[i] += 1
+                break
+
+
+class MetricasRequisicoes:
+    def __init__(self):
+        # (metodo, rota) -> histogramas; (metodo, rota, status) -> contagem
+        self.latencia: Dict[Tuple[str, str], Histograma] = defaultdict(lambda: Histograma(BUCKETS_SEGUNDOS))
+        self.consultas: Dict[Tuple[str, str], Histograma] = defaultdict(lambda: Histograma(BUCKETS_CONSULTAS))
+        self.tempo_db: Dict[Tuple[str, str], float] = defaultdict(float)
+        self.requisicoes: Dict[Tuple[str, str, str], int] = defaultdict(int)
+        self.lentas: Dict[Tuple[str, str], int] = defaultdict(int)
+
+    def registrar(
+        self, metodo: str, rota: str, status: int, segundos: float,
+        medicao: MedicaoRequisicao, fluxo: bool = False
+    ) -> bool:
+        chave = (metodo, rota)
+        self.requisicoes[(metodo, rota, str(status))] += 1
+        self.latencia[chave].observar(segundos)
+        self.consultas[chave].observar(medicao.consultas)
+        self.tempo_db[chave] += medicao.tempo_db
+
+        # SSE fica aberto por definição: só conta consultas, não tempo
+        lenta = (
+            (not fluxo and segundos * 1000 >= LOG_LENTO_MS)
+            or medicao.consultas >= LOG_LENTO_CONSULTAS
+        )
+        if lenta:
+            self.lentas[chave] += 1
+        return lenta
+
+
+metricas_requisicoes = MetricasRequisicoes()
+
+
+def _rotulos(**valores) -> str:
+    partes = []
+    for nome, valor in valores.items():
+        valor = str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        partes.append(f'{nome}="{valor}"')
+    return "{" + ",".join(partes) + "}"
+
+
+def _histograma(linhas: List[str], nome: str, rotulos: dict, hist: Histograma):
+    acumulado = 0
+    for limite, contagem in zip(hist.buckets, hist.contagens):
+        acumulado += contagem
+        linhas.append(f"{nome}_bucket{_rotulos(**rotulos, le=limite)} {acumulado}")
+    linhas.append(f"{nome}_bucket{_rotulos(**rotulos, le='+Inf')} {hist.total}")
+    linhas.append(f"{nome}_sum{_rotulos(**rotulos)} {hist.soma}")
+    linhas.append(f"{nome}_count{_rotulos(**rotulos)} {hist.total}")
+
+
+def texto_prometheus(extras: Dict[str, dict]) -> str:
+    """
+    Texto de exposição do Prometheus (0.0.4). `extras`: medidores avulsos
+    {nome: {"ajuda": ..., "valores": {rotulo_pool: valor}}} (pool etc.).
+    """
+    m = metricas_requisicoes
+    linhas = [
+        "# HELP http_requisicoes_total Requisições atendidas por rota e status",
+        "# TYPE http_requisicoes_total counter",
+    ]
+    for (metodo, rota, status), total in sorted(m.requisicoes.items()):
+        linhas.append(f"http_requisicoes_total{_rotulos(metodo=metodo, rota=rota, status=status)} {total}")
+
+    linhas += [
+        "# HELP http_requisicao_segundos Latência da requisição (até o fim do corpo)",
+        "# TYPE http_requisicao_segundos histogram",
+    ]
+    for (metodo, rota), hist in sorted(m.latencia.items()):
+        _histograma(linhas, "http_requisicao_segundos", {"metodo": metodo, "rota": rota}, hist)
+
+    linhas += [
+        "# HELP db_consultas_por_requisicao Consultas SQL executadas por requisição",
+        "# TYPE db_consultas_por_requisicao histogram",
+    ]
+    for (metodo, rota), hist in sorted(m.consultas.items()):
+        _histograma(linhas, "db_consultas_por_requisicao", {"metodo": metodo, "rota": rota}, hist)
+
+    linhas += [
+        "# HELP db_tempo_segundos_total Tempo gasto em consultas SQL pelas requisições",
+        "# TYPE db_tempo_segundos_total counter",
+    ]
+    for (metodo, rota), total in sorted(m.tempo_db.items()):
+        linhas.append(f"db_tempo_segundos_total{_rotulos(metodo=metodo, rota=rota)} {total}")
+
+    linhas += [
+        "# HELP http_requisicoes_lentas_total Requisições acima de LOG_LENTO_MS ou LOG_LENTO_CONSULTAS",
+        "# TYPE http_requisicoes_lentas_total counter",
+    ]
+    for (metodo, rota), total in sorted(m.lentas.items()):
+        linhas.append(f"http_requisicoes_lentas_total{_rotulos(metodo=metodo, rota=rota)} {total}")
+
+    for nome, medidor in extras.items():
+        linhas.append(f"# HELP {nome} {medidor['ajuda']}")
+        linhas.append(f"# TYPE {nome} gauge")
+        for rotulo, valor in medidor["valores"].items():
+            linhas.append(f"{nome}{_rotulos(pool=rotulo)} {valor}")
+
+    return "\n".join(linhas) + "\n"
+
+
+# =================================================
+# LOG DE REQUISIÇÃO LENTA
+# =================================================
+
+_ESPACOS = re.compile(r"\s+")
+
+
+def _resumo_sql(sql: List[str], consultas: int) -> str:
+    # Agrupa SQL idêntico preservando a ordem da primeira ocorrência
+    contagem = Counter(sql)
+    vistos = set()
+    linhas = []
+    for statement in sql:
+        if statement in vistos:
+            continue
+        vistos.add(statement)
+        texto = _ESPACOS.sub(" ", statement).strip()
+        if len(texto) > 300:
+            texto = texto[:300] + "..."
+        linhas.append(f"    {contagem[statement]}x {texto}")
+    if consultas > len(sql):
+        linhas.append(f"    ... +{consultas - len(sql)} consultas não guardadas")
+    return "\n".join(linhas)
+
+
+# =================================================
+# MIDDLEWARE
+# =================================================
+
+def _rota(scope) -> str:
+    # Template da rota (/api/atendimento/{id}/etapas), não o caminho: sem
+    # explodir o número de séries. Em router incluído com prefixo, o
+    # FastAPI guarda o caminho completo no contexto efetivo da rota
+    contexto = scope.get("fastapi", {}).get("effective_route_context")
+    caminho = getattr(contexto, "path", None) or getattr(scope.get("route"), "path", None)
+    return caminho or "(sem rota)"
+
+
+class MiddlewareInstrumentacao:
+    """ASGI puro: não bufferiza o corpo (SSE e exportação seguem em fluxo)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        medicao = MedicaoRequisicao()
+        token = _requisicao.set(medicao)
+        status = 500
+        fluxo = False
+        inicio = time.perf_counter()
+
+        async def enviar(mensagem):
+            nonlocal status, fluxo
+            if mensagem["type"] == "http.response.start":
+                status = mensagem["status"]
+                fluxo = any(
+                    nome == b"content-type" and valor.startswith(b"text/event-stream")
+                    for nome, valor in mensagem.get("headers", ())
+                )
+            await send(mensagem)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _requisicao.reset(token)
+            segundos = time.perf_counter() - inicio
+
+            rota = _rota(scope)
+            metodo = scope["method"]
+
+            if metricas_requisicoes.registrar(metodo, rota, status, segundos, medicao, fluxo):
+                logger.warning(
+                    f"🐢 {metodo} {scope['path']} -> {status} em {segundos * 1000:.0f} ms, "
+                    f"{medicao.consultas} consultas ({medicao.tempo_db * 1000:.0f} ms no banco)\n"
+                    f"{_resumo_sql(medicao.sql, medicao.consultas)}"
+                )
@@ -1,13 +1,33 @@
 # main.py
-from fastapi import FastAPI
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import text, inspect
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from starlette.concurrency import run_in_threadpool
 from app.routes import router
-from app.database import engine
-from app.db.models import Base
+from app.admin import router as admin_router
+from app.database import engine, async_engine, replica_engines, metricas_pool
+from app.auth import controle_login
+from app.eventos import hub
+from app.particoes import manutencao_particoes
+from app.despacho import replanejamento_despacho
+from app.cache_respostas import cache_respostas, conectar_redis
+from app.replicas import roteador_leitura
+from app.instrumentacao import (
+    METRICAS_TOKEN,
+    MiddlewareInstrumentacao,
+    instrumentar_engine,
+    texto_prometheus,
+)
+from app.geo import detectar_postgis
+from app.busca import detectar_trigramas
+from app.db.migrate import migrar, versao_banco, versao_esperada
 import logging
 import os
+import time
 from datetime import datetime
+from typing import Optional
 from dotenv import load_dotenv
 
 # Carrega variáveis de ambiente
@@ -50,137 +70,46 @@ app.add_middleware(
     max_age=3600,
 )
 
+# Latência, consultas por requisição e log de lentas (app/instrumentacao.py).
+# Adicionado por último = mais externo: mede também o CORS
+instrumentar_engine(engine)
+instrumentar_engine(async_engine)
+for replica_engine in replica_engines:
+    instrumentar_engine(replica_engine)
+app.add_middleware(MiddlewareInstrumentacao)
+
 
 # =============================================
-# FUNÇÕES DE VERIFICAÇÃO DO BANCO
+# VERIFICAÇÃO DO SCHEMA
 # =============================================
 
-def verificar_conexao_banco():
-    try:
-        with engine.connect() as conn:
-            conn.execute(text("SELECT 1"))
-            logger.info("✅ Conexão com banco de dados OK")
-            return True
-    except Exception as e:
-        logger.error(f"❌ Erro de conexão com banco: {e}")
-        return False
+# Só para desenvolvimento: aplica as migrações pendentes no startup.
+# Em produção rode `python -m app.db.migrate` uma vez no deploy.
+DB_AUTO_MIGRAR = os.getenv("DB_AUTO_MIGRAR", "false").lower() in ("1", "true", "sim", "yes")
 
 
-def verificar_e_criar_tabelas():
-    logger.info("📋 Verificando tabelas...")
-    
-    inspector = inspect(engine)
-    tabelas_existentes = inspector.get_table_names()
-    
-    tabelas_necessarias = ['tecnico', 'os', 'atendimento', 'etapa_historico']
-    
-    for tabela in tabelas_necessarias:
-        if tabela not in tabelas_existentes:
-            logger.warning(f"⚠️  Tabela '{tabela}' não encontrada. Criando...")
-            Base.metadata.create_all(bind=engine, tables=[Base.metadata.tables[tabela]])
-            logger.info(f"  ✅ Tabela '{tabela}' criada")
-        else:
-            logger.info(f"  ✅ Tabela '{tabela}' OK")
-    
-    return True
+async def verificar_schema():
+    """Compara a versão do banco com a última migração do código."""
+    esperada = versao_esperada()
 
+    async with async_engine.connect() as conn:
+        atual = await conn.run_sync(versao_banco)
 
-def verificar_e_corrigir_enums():
-    logger.info("🔧 Verificando enums...")
-    
-    with engine.connect() as conn:
-        conn.execute(text("BEGIN"))
-        
-        try:
-            # Verifica statusos
-            logger.info("  Verificando enum 'statusos'...")
-            
-            result = conn.execute(text("""
-                SELECT EXISTS (
-                    SELECT 1 FROM pg_type WHERE typname = 'statusos'
-                )
-            """))
-            enum_existe = result.scalar()
-            
-            if not enum_existe:
-                logger.warning("  ⚠️  Enum 'statusos' não existe. Recriando tabelas...")
-                Base.metadata.create_all(bind=engine)
-            else:
-                valores_statusos = ['AGUARDANDO', 'EM_CAMPO', 'CONCLUIDA']
-                
-                for valor in valores_statusos:
-                    try:
-                        conn.execute(text(f"ALTER TYPE statusos ADD VALUE IF NOT EXISTS '{valor}'"))
-                        logger.info(f"    ✅ '{valor}' adicionado/verificado")
-                    except Exception as e:
-                        logger.warning(f"    ⚠️  '{valor}': {e}")
-            
-            # Verifica etapa
-            logger.info("  Verificando enum 'etapa'...")
-            
-            result = conn.execute(text("""
-                SELECT EXISTS (
-                    SELECT 1 FROM pg_type WHERE typname = 'etapa'
-                )
-            """))
-            enum_existe = result.scalar()
-            
-            if not enum_existe:
-                logger.warning("  ⚠️  Enum 'etapa' não existe. Recriando tabelas...")
-                Base.metadata.create_all(bind=engine)
-            else:
-                valores_etapa = ['INSPECAO', 'DIAGNOSTICO', 'ORCAMENTO', 'APROVACAO', 'EXECUCAO', 'FINALIZACAO']
-                
-                for valor in valores_etapa:
-                    try:
-                        conn.execute(text(f"ALTER TYPE etapa ADD VALUE IF NOT EXISTS '{valor}'"))
-                        logger.info(f"    ✅ '{valor}' adicionado/verificado")
-                    except Exception as e:
-                        logger.warning(f"    ⚠️  '{valor}': {e}")
-            
-            conn.execute(text("COMMIT"))
-            
-            # Mostra resultado
-            result = conn.execute(text("SELECT unnest(enum_range(NULL::statusos))"))
-            statusos = [r[0] for r in result]
-            logger.info(f"  📊 StatusOS final: {statusos}")
-            
-            result = conn.execute(text("SELECT unnest(enum_range(NULL::etapa))"))
-            etapas = [r[0] for r in result]
-            logger.info(f"  📊 Etapas final: {etapas}")
-            
-            return True
-            
-        except Exception as e:
-            logger.error(f"  ❌ Erro ao verificar enums: {e}")
-            conn.execute(text("ROLLBACK"))
-            return False
-
-
-def criar_indices():
-    logger.info("📊 Verificando índices...")
-    
-    indices = [
-        "CREATE INDEX IF NOT EXISTS idx_os_status ON os(status)",
-        "CREATE INDEX IF NOT EXISTS idx_os_tecnico ON os(tecnico_id)",
-        "CREATE INDEX IF NOT EXISTS idx_atendimento_tecnico ON atendimento(tecnico_id)",
-        "CREATE INDEX IF NOT EXISTS idx_atendimento_os ON atendimento(os_id)",
-        "CREATE INDEX IF NOT EXISTS idx_atendimento_ativo ON atendimento(tecnico_id) WHERE hora_fim IS NULL",
-        "CREATE INDEX IF NOT EXISTS idx_historico_atendimento ON etapa_historico(atendimento_id)",
-        "CREATE INDEX IF NOT EXISTS idx_tecnico_email ON tecnico(email)"
-    ]
-    
-    with engine.connect() as conn:
-        for idx in indices:
-            try:
-                conn.execute(text(idx))
-                logger.info(f"  ✅ Índice criado")
-            except Exception as e:
-                logger.warning(f"  ⚠️  Erro ao criar índice: {e}")
-        
-        conn.commit()
-    
-    return True
+    if atual < esperada and DB_AUTO_MIGRAR:
+        logger.warning(f"⚠️  Schema na versão {atual}, aplicando migrações até {esperada}...")
+        await run_in_threadpool(migrar)
+        atual = esperada
+
+    if atual < esperada:
+        raise RuntimeError(
+            f"Schema do banco na versão {atual}, o código espera {esperada}. "
+            f"Rode: python -m app.db.migrate"
+        )
+
+    if atual > esperada:
+        logger.warning(f"⚠️  Schema na versão {atual}, mais nova que o código ({esperada})")
+    else:
+        logger.info(f"✅ Schema na versão {atual}")
 
 
 # =============================================
@@ -193,16 +122,40 @@ async def startup_event():
     logger.info("🚀 INICIANDO MVP FIELD SERVICE API")
     logger.info("=" * 50)
     
-    if not verificar_conexao_banco():
-        logger.error("❌ Falha na conexão com banco. Aplicação não pode iniciar.")
-        return
-    
-    verificar_e_criar_tabelas()
-    verificar_e_corrigir_enums()
-    criar_indices()
+    inicio = time.perf_counter()
+
+    try:
+        await verificar_schema()
+
+        async with async_engine.connect() as conn:
+            if await conn.run_sync(detectar_postgis):
+                logger.info("🗺️  Busca por proximidade com PostGIS")
+            if await conn.run_sync(detectar_trigramas):
+                logger.info("🔎 Busca por trecho com pg_trgm")
+    except (OSError, SQLAlchemyError) as e:
+        # Sem banco no boot o processo sobe assim mesmo: as tarefas abaixo
+        # (eventos, partições, despacho, réplicas) tentam de novo sozinhas.
+        # Schema incompatível (RuntimeError) não cai aqui e derruba o startup
+        logger.error(f"❌ Erro de conexão com banco: {e}; tarefas de fundo seguem tentando")
+
+    await controle_login.iniciar()
+    await hub.iniciar()
+    await manutencao_particoes.iniciar()
+    await replanejamento_despacho.iniciar()
+
+    redis = conectar_redis()
+    if redis is not None:
+        cache_respostas.usar(redis)
+        roteador_leitura.usar_redis(redis.cliente)
+        logger.info("🧠 Cache de respostas no Redis")
+
+    await roteador_leitura.iniciar()
+    if roteador_leitura.replicas:
+        em_rotacao = sum(r.em_rotacao for r in roteador_leitura.replicas)
+        logger.info(f"📚 Leituras em réplicas: {em_rotacao}/{len(roteador_leitura.replicas)} em rotação")
     
     logger.info("=" * 50)
-    logger.info("✅ APLICAÇÃO PRONTA!")
+    logger.info(f"✅ APLICAÇÃO PRONTA! ({(time.perf_counter() - inicio) * 1000:.0f} ms)")
     logger.info(f"📅 Iniciada em: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}")
     logger.info(f"📚 Documentação: http://localhost:8000/docs")
     logger.info("=" * 50)
@@ -216,6 +169,13 @@ async def startup_event():
 async def shutdown_event():
     logger.info("=" * 50)
     logger.info("🛑 Encerrando aplicação...")
+    await hub.encerrar()
+    await manutencao_particoes.encerrar()
+    await replanejamento_despacho.encerrar()
+    controle_login.encerrar()
+    await cache_respostas.encerrar()
+    await roteador_leitura.encerrar()
+    await async_engine.dispose()
     logger.info("=" * 50)
 
 
@@ -224,6 +184,7 @@ async def shutdown_event():
 # =============================================
 
 app.include_router(router, prefix="/api")
+app.include_router(admin_router, prefix="/api")
 
 
 # =============================================
@@ -247,8 +208,8 @@ async def root():
 @app.get("/health")
 async def health_check():
     try:
-        with engine.connect() as conn:
-            conn.execute(text("SELECT 1"))
+        async with async_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
             db_status = "healthy"
     except Exception as e:
         db_status = f"unhealthy: {str(e)}"
@@ -260,4 +221,66 @@ async def health_check():
             "database": db_status,
             "api": "healthy"
         }
-    }
\ No newline at end of file
+    }
+
+
+@app.get("/health/pool")
+async def health_pool():
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "api": metricas_pool(async_engine),
+        "sync": metricas_pool(engine),
+        "login": controle_login.metricas(),
+        "eventos": hub.metricas(),
+        "cache_respostas": cache_respostas.metricas(),
+        "leitura": roteador_leitura.metricas(),
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics(authorization: Optional[str] = Header(None)):
+    if METRICAS_TOKEN and authorization != f"Bearer {METRICAS_TOKEN}":
+        raise HTTPException(401, "Token de métricas inválido")
+
+    pools = {"api": metricas_pool(async_engine), "sync": metricas_pool(engine)}
+    for i, replica in enumerate(roteador_leitura.replicas, start=1):
+        pools[f"replica_{i}"] = metricas_pool(replica.engine)
+    extras = {
+        f"db_pool_{nome}": {
+            "ajuda": ajuda,
+            "valores": {pool: dados.get(nome, 0) for pool, dados in pools.items()}
+        }
+        for nome, ajuda in [
+            ("em_uso", "Conexões do pool em uso"),
+            ("ociosas", "Conexões ociosas no pool"),
+            ("overflow", "Conexões além de pool_size"),
+            ("checkouts", "Checkouts desde o início"),
+            ("espera_total_s", "Espera acumulada por conexão, em segundos"),
+            ("timeouts", "Checkouts que estouraram pool_timeout"),
+        ]
+    }
+
+    if roteador_leitura.replicas:
+        replicas = {
+            f"replica_{i}": r for i, r in enumerate(roteador_leitura.replicas, start=1)
+        }
+        extras["db_replica_atraso_s"] = {
+            "ajuda": "Atraso da réplica na última medição, em segundos (-1: sem resposta)",
+            "valores": {n: -1 if r.atraso is None else r.atraso for n, r in replicas.items()},
+        }
+        extras["db_replica_em_rotacao"] = {
+            "ajuda": "1 se a réplica está recebendo leituras",
+            "valores": {n: int(r.em_rotacao) for n, r in replicas.items()},
+        }
+        extras["db_leituras_total"] = {
+            "ajuda": "Leituras roteadas por destino (primario ou réplica)",
+            "valores": {
+                "primario": roteador_leitura.leituras_primario,
+                **{n: r.leituras for n, r in replicas.items()},
+            },
+        }
+
+    return PlainTextResponse(
+        texto_prometheus(extras),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
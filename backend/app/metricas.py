@@ -0,0 +1,115 @@
+# metricas.py
+#
+# Métricas operacionais mantidas de forma incremental: cada transição de
+# etapa soma sua duração em metrica_etapa_diaria, e cada atendimento
+# iniciado/concluído soma em metrica_tecnico_diaria (migração 0008). O
+# painel lê esses agregados (poucas linhas por técnico e dia) em vez de
+# reprocessar o etapa_historico inteiro.
+#
+# As somas vão na mesma transação da mudança de etapa: ou entram as duas
+# ou nenhuma.
+#
+import os
+from collections import defaultdict
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.db.models import Atendimento, Etapa, MetricaEtapaDiaria, MetricaTecnicoDiaria
+
+# Conclusão em até N horas conta como dentro do SLA (vale a partir de
+# quando o atendimento é concluído; não recalcula o passado)
+METRICAS_SLA_HORAS = float(os.getenv("METRICAS_SLA_HORAS", "24"))
+
+
+def _segundos(inicio: Optional[datetime], fim: datetime) -> Optional[float]:
+    if inicio is None:
+        return None
+    return max((fim - inicio).total_seconds(), 0.0)
+
+
+class AcumuladorMetricas:
+    """Junta as somas de uma requisição e grava tudo num upsert por tabela."""
+
+    def __init__(self):
+        # (dia, tecnico_id, etapa) -> [quantidade, duracao_total, duracao_max]
+        self.etapas = defaultdict(lambda: [0, 0.0, 0.0])
+        # (dia, tecnico_id) -> [iniciados, concluidos, dentro_sla, duracao_total, duracao_max]
+        self.tecnicos = defaultdict(lambda: [0, 0, 0, 0.0, 0.0])
+
+    def inicio(self, atendimento: Atendimento):
+        self.tecnicos[(atendimento.hora_inicio.date(), atendimento.tecnico_id)][0] += 1
+
+    def transicao(self, atendimento: Atendimento, nova_etapa: Etapa, momento: datetime):
+        """
+        Chamar antes de mudar atendimento.etapa, com a linha do atendimento
+        travada (FOR UPDATE): etapa/etapa_em lidos sem trava podem já ter
+        mudado, e a mesma transição seria contada duas vezes.
+        """
+        if nova_etapa == atendimento.etapa or atendimento.tecnico_id is None:
+            return
+
+        duracao = _segundos(atendimento.etapa_em, momento)
+        if duracao is not None:
+            soma = self.etapas[(momento.date(), atendimento.tecnico_id, atendimento.etapa)]
+            soma[0] += 1
+            soma[1] += duracao
+            soma[2] = max(soma[2], duracao)
+
+        if nova_etapa == Etapa.FINALIZACAO:
+            total = _segundos(atendimento.hora_inicio, momento)
+            if total is not None:
+                soma = self.tecnicos[(momento.date(), atendimento.tecnico_id)]
+                soma[1] += 1
+                soma[2] += total <= METRICAS_SLA_HORAS * 3600
+                soma[3] += total
+                soma[4] = max(soma[4], total)
+
+    async def gravar(self, db):
+        # Chaves em ordem: duas transações do mesmo técnico travam as
+        # linhas na mesma sequência (sem deadlock)
+        if self.etapas:
+            tabela = MetricaEtapaDiaria.__table__
+            stmt = pg_insert(tabela).values([
+                {
+                    "dia": dia, "tecnico_id": tecnico_id, "etapa": etapa,
+                    "quantidade": q, "duracao_total_s": total, "duracao_max_s": maximo
+                }
+                for (dia, tecnico_id, etapa), (q, total, maximo)
+                in sorted(self.etapas.items(), key=lambda item: (item[0][0], item[0][1], item[0][2].name))
+            ])
+            await db.execute(stmt.on_conflict_do_update(
+                index_elements=[tabela.c.dia, tabela.c.tecnico_id, tabela.c.etapa],
+                set_={
+                    "quantidade": tabela.c.quantidade + stmt.excluded.quantidade,
+                    "duracao_total_s": tabela.c.duracao_total_s + stmt.excluded.duracao_total_s,
+                    "duracao_max_s": func.greatest(tabela.c.duracao_max_s, stmt.excluded.duracao_max_s),
+                }
+            ))
+
+        if self.tecnicos:
+            tabela = MetricaTecnicoDiaria.__table__
+            stmt = pg_insert(tabela).values([
+                {
+                    "dia": dia, "tecnico_id": tecnico_id, "iniciados": iniciados,
+                    "concluidos": concluidos, "dentro_sla": sla,
+                    "duracao_total_s": total, "duracao_max_s": maximo
+                }
+                for (dia, tecnico_id), (iniciados, concluidos, sla, total, maximo)
+                in sorted(self.tecnicos.items())
+            ])
+            await db.execute(stmt.on_conflict_do_update(
+                index_elements=[tabela.c.dia, tabela.c.tecnico_id],
+                set_={
+                    "iniciados": tabela.c.iniciados + stmt.excluded.iniciados,
+                    "concluidos": tabela.c.concluidos + stmt.excluded.concluidos,
+                    "dentro_sla": tabela.c.dentro_sla + stmt.excluded.dentro_sla,
+                    "duracao_total_s": tabela.c.duracao_total_s + stmt.excluded.duracao_total_s,
+                    "duracao_max_s": func.greatest(tabela.c.duracao_max_s, stmt.excluded.duracao_max_s),
+                }
+            ))
+
+        self.etapas.clear()
+        self.tecnicos.clear()
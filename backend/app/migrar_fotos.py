@@ -0,0 +1,66 @@
+# migrar_fotos.py
+#
+# Move as fotos antigas (data URL base64 em etapa_historico.foto) para o
+# storage de fotos e troca o valor da coluna pela URL.
+#
+# Percorre a tabela por id em lotes pequenos: só um lote de fotos fica em
+# memória por vez, e cada lote é commitado separadamente (pode ser
+# interrompido e executado de novo).
+#
+#   cd backend && python -m app.migrar_fotos [--lote 100]
+#
+import argparse
+
+from sqlalchemy import select, update
+
+from app.database import SessionLocal
+from app.db.models import EtapaHistorico
+from app.storage import get_store, salvar_data_url, FotoInvalida, FotoMuitoGrande
+
+
+def migrar(lote: int = 100):
+    ultimo_id = 0
+    migradas = 0
+    invalidas = 0
+
+    while True:
+        with SessionLocal() as db:
+            linhas = db.execute(
+                select(EtapaHistorico.id, EtapaHistorico.foto)
+                .where(
+                    EtapaHistorico.id > ultimo_id,
+                    EtapaHistorico.foto.like("data:%")
+                )
+                .order_by(EtapaHistorico.id)
+                .limit(lote)
+            ).all()
+
+            if not linhas:
+                break
+
+            novos_valores = []
+            for id, foto in linhas:
+                try:
+                    hash, _ = salvar_data_url(foto)
+                    novos_valores.append({"id": id, "foto": get_store().url(hash)})
+                except (FotoInvalida, FotoMuitoGrande):
+                    invalidas += 1
+                    print(f"  ⚠️  Foto da etapa {id} ignorada (inválida ou muito grande)")
+
+            if novos_valores:
+                db.execute(update(EtapaHistorico), novos_valores)
+            db.commit()
+
+            ultimo_id = linhas[-1].id
+            migradas += len(novos_valores)
+            print(f"  ✅ {migradas} fotos migradas (até etapa {ultimo_id})")
+
+    print(f"📦 Concluído: {migradas} migradas, {invalidas} ignoradas")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migra fotos base64 para o storage")
+    parser.add_argument("--lote", type=int, default=100)
+    args = parser.parse_args()
+
+    migrar(args.lote)
@@ -0,0 +1,83 @@
+# miniaturas.py
+#
+# Geração de prévias (miniaturas JPEG) das fotos do storage.
+#
+# O trabalho de decodificar/redimensionar roda num pool de threads próprio
+# (o Pillow libera o GIL nessas operações), fora das threads que atendem
+# requisições. Cada foto é processada uma única vez: pedidos repetidos
+# para o mesmo hash reaproveitam o Future em andamento.
+#
+# Falha (formato que o Pillow não abre, como HEIC) fica registrada por
+# MINIATURA_FALHA_TTL segundos: nesse tempo a rota entrega o original sem
+# ler e decodificar a foto de novo a cada pedido.
+#
+import io
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict
+
+from app.cache import CacheTTL
+from app.storage import get_store, caminho_original, caminho_miniatura
+
+logger = logging.getLogger(__name__)
+
+MINIATURA_LADO = int(os.getenv("MINIATURA_LADO", "320"))
+MINIATURA_QUALIDADE = int(os.getenv("MINIATURA_QUALIDADE", "75"))
+MINIATURA_WORKERS = int(os.getenv("MINIATURA_WORKERS", "2"))
+MINIATURA_FALHA_TTL = float(os.getenv("MINIATURA_FALHA_TTL", "3600"))
+
+_pool = ThreadPoolExecutor(max_workers=MINIATURA_WORKERS, thread_name_prefix="miniatura")
+_em_andamento: Dict[str, Future] = {}
+_lock = threading.RLock()
+# hash -> exceção da última tentativa
+_falhas = CacheTTL(tamanho_max=10_000, ttl=MINIATURA_FALHA_TTL)
+
+
+def gerar_miniatura(hash: str):
+    from PIL import Image, ImageOps
+
+    store = get_store()
+    chave = caminho_miniatura(hash)
+    if store.existe(chave):
+        return
+
+    original = io.BytesIO(b"".join(store.ler(caminho_original(hash))))
+
+    with Image.open(original) as imagem:
+        imagem.draft("RGB", (MINIATURA_LADO, MINIATURA_LADO))
+        imagem = ImageOps.exif_transpose(imagem)
+        imagem.thumbnail((MINIATURA_LADO, MINIATURA_LADO))
+
+        saida = io.BytesIO()
+        imagem.convert("RGB").save(saida, "JPEG", quality=MINIATURA_QUALIDADE, optimize=True)
+
+    store.gravar_bytes(chave, saida.getvalue())
+
+
+def _finalizar(hash: str, future: Future):
+    with _lock:
+        _em_andamento.pop(hash, None)
+
+    erro = future.exception()
+    if erro:
+        _falhas.set(hash, erro)
+        logger.warning(f"⚠️  Falha ao gerar miniatura de {hash}: {erro}")
+
+
+def agendar_miniatura(hash: str) -> Future:
+    erro = _falhas.get(hash)
+    if erro is not None:
+        # Já falhou há pouco: nem volta para o pool
+        future = Future()
+        future.set_exception(erro)
+        return future
+
+    with _lock:
+        future = _em_andamento.get(hash)
+        if future is None:
+            future = _pool.submit(gerar_miniatura, hash)
+            _em_andamento[hash] = future
+            future.add_done_callback(lambda f: _finalizar(hash, f))
+        return future
@@ -0,0 +1,183 @@
+# particoes.py
+#
+# Manutenção das partições mensais de etapa_historico (migração 0009).
+#
+#   - cria as partições dos próximos HISTORICO_MESES_A_FRENTE meses, para
+#     nenhuma etapa nova cair na partição padrão
+#   - arquiva os meses mais antigos que HISTORICO_ARQUIVAR_APOS_MESES:
+#     move a partição (e seus índices) para HISTORICO_TABLESPACE_ARQUIVO,
+#     se definido (ex.: disco mais barato ou com compressão), e roda
+#     VACUUM FREEZE. Partição congelada e sem escrita é pulada pelo
+#     autovacuum: o custo de vacuum fica só nos meses recentes.
+#
+# Partição arquivada continua anexada: o histórico antigo segue legível
+# pela API, só não é mais escrito.
+#
+# Na mesma rodada apaga as chaves de idempotência do /sync/etapas mais
+# antigas que SYNC_IDEMPOTENCIA_DIAS (em lotes, sem travar o sync).
+#
+# Roda no startup e a cada HISTORICO_MANUTENCAO_HORAS em uma task de cada
+# worker; um advisory lock deixa só um deles trabalhar por vez. Também dá
+# para rodar à mão (cron):
+#
+#   cd backend && python -m app.particoes [--sem-arquivar]
+#
+import argparse
+import logging
+import os
+from datetime import date
+from typing import List, Optional
+
+from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
+
+from app.database import engine
+from app.tarefas import TarefaPeriodica
+
+logger = logging.getLogger(__name__)
+
+HISTORICO_MESES_A_FRENTE = int(os.getenv("HISTORICO_MESES_A_FRENTE", "3"))
+HISTORICO_ARQUIVAR_APOS_MESES = int(os.getenv("HISTORICO_ARQUIVAR_APOS_MESES", "6"))
+HISTORICO_TABLESPACE_ARQUIVO = os.getenv("HISTORICO_TABLESPACE_ARQUIVO", "")
+HISTORICO_MANUTENCAO_HORAS = float(os.getenv("HISTORICO_MANUTENCAO_HORAS", "6"))
+# Janela de reenvio do sync offline (ver routes.py, SYNC OFFLINE)
+SYNC_IDEMPOTENCIA_DIAS = int(os.getenv("SYNC_IDEMPOTENCIA_DIAS", "30"))
+SYNC_IDEMPOTENCIA_LOTE = 10_000
+
+LOCK_PARTICOES = 720_100_002
+MARCA_ARQUIVADA = "arquivada"
+
+
+def _meses_atras(hoje: date, meses: int) -> date:
+    total = hoje.year * 12 + hoje.month - 1 - meses
+    return date(total // 12, total % 12 + 1, 1)
+
+
+def criar_particoes(conn) -> int:
+    # Começa no mês mais antigo que tenha caído na partição padrão (horário
+    # fora dos meses criados): a função cria o mês e move as linhas para ele
+    return conn.execute(
+        text("""
+            SELECT criar_particoes_etapa_historico(
+                least(current_date, (SELECT min(criado_em) FROM etapa_historico_padrao)::date),
+                (current_date + make_interval(months => :meses))::date
+            )
+        """),
+        {"meses": HISTORICO_MESES_A_FRENTE}
+    ).scalar()
+
+
+def particoes_para_arquivar(conn, hoje: Optional[date] = None) -> List[str]:
+    """Partições mensais que terminam antes do limite e ainda não foram arquivadas."""
+    limite = _meses_atras(hoje or date.today(), HISTORICO_ARQUIVAR_APOS_MESES)
+    return list(conn.execute(
+        text("""
+            SELECT c.relname
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = 'etapa_historico'::regclass
+              AND c.relname ~ '^etapa_historico_[0-9]{4}_[0-9]{2}$'
+              AND to_date(right(c.relname, 7), 'YYYY_MM') + interval '1 month' <= :limite
+              AND obj_description(c.oid, 'pg_class') IS DISTINCT FROM :marca
+            ORDER BY c.relname
+        """),
+        {"limite": limite, "marca": MARCA_ARQUIVADA}
+    ).scalars())
+
+
+def arquivar_particao(conn, nome: str):
+    """Conexão em AUTOCOMMIT (VACUUM não roda dentro de transação)."""
+    if HISTORICO_TABLESPACE_ARQUIVO:
+        # SET TABLESPACE reescreve a partição: trava só ela, e ela é fria
+        conn.execute(text(
+            f'ALTER TABLE "{nome}" SET TABLESPACE "{HISTORICO_TABLESPACE_ARQUIVO}"'
+        ))
+        indices = conn.execute(
+            text("SELECT indexrelid::regclass::text FROM pg_index WHERE indrelid = CAST(:t AS regclass)"),
+            {"t": nome}
+        ).scalars().all()
+        for indice in indices:
+            conn.execute(text(
+                f'ALTER INDEX {indice} SET TABLESPACE "{HISTORICO_TABLESPACE_ARQUIVO}"'
+            ))
+
+    # Nada mais é escrito ali: páginas cheias e tudo congelado
+    conn.execute(text(f'ALTER TABLE "{nome}" SET (fillfactor = 100)'))
+    conn.execute(text(f'VACUUM (FREEZE, ANALYZE) "{nome}"'))
+    conn.execute(text(f"COMMENT ON TABLE \"{nome}\" IS '{MARCA_ARQUIVADA}'"))
+
+
+def limpar_idempotencia(conn) -> int:
+    """Conexão em AUTOCOMMIT: cada lote é uma transação curta."""
+    total = 0
+    while True:
+        removidas = conn.execute(
+            text("""
+                DELETE FROM sync_idempotencia
+                WHERE ctid IN (
+                    SELECT ctid FROM sync_idempotencia
+                    WHERE criado_em < now() - make_interval(days => :dias)
+                    LIMIT :lote
+                )
+            """),
+            {"dias": SYNC_IDEMPOTENCIA_DIAS, "lote": SYNC_IDEMPOTENCIA_LOTE}
+        ).rowcount
+        total += removidas
+        if removidas < SYNC_IDEMPOTENCIA_LOTE:
+            return total
+
+
+def manter(arquivar: bool = True, engine=engine) -> dict:
+    """Uma rodada completa (síncrona). Sem o lock, outro processo já está nisso."""
+    resultado = {"criadas": 0, "arquivadas": [], "chaves_removidas": 0}
+
+    with engine.connect() as conn:
+        conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+        if not conn.execute(text("SELECT pg_try_advisory_lock(:k)"), {"k": LOCK_PARTICOES}).scalar():
+            return resultado
+
+        try:
+            resultado["criadas"] = criar_particoes(conn)
+            if arquivar:
+                for nome in particoes_para_arquivar(conn):
+                    arquivar_particao(conn, nome)
+                    resultado["arquivadas"].append(nome)
+            resultado["chaves_removidas"] = limpar_idempotencia(conn)
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": LOCK_PARTICOES})
+
+    return resultado
+
+
+async def _rodada_particoes():
+    resultado = await run_in_threadpool(manter)
+    if resultado["criadas"] or resultado["arquivadas"]:
+        logger.info(
+            f"🗂️  Partições do histórico: {resultado['criadas']} criadas, "
+            f"arquivadas: {', '.join(resultado['arquivadas']) or '-'}"
+        )
+    if resultado["chaves_removidas"]:
+        logger.info(
+            f"🧹 {resultado['chaves_removidas']} chaves de idempotência do sync removidas"
+        )
+
+
+manutencao_particoes = TarefaPeriodica(
+    _rodada_particoes,
+    HISTORICO_MANUTENCAO_HORAS * 3600,
+    "Erro na manutenção das partições"
+)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Partições de etapa_historico")
+    parser.add_argument(
+        "--sem-arquivar", action="store_true", help="só cria partições, sem arquivar meses antigos"
+    )
+    args = parser.parse_args()
+
+    resultado = manter(arquivar=not args.sem_arquivar)
+    print(f"🗂️  {resultado['criadas']} partições criadas")
+    for nome in resultado["arquivadas"]:
+        print(f"   📦 {nome} arquivada")
+    print(f"🧹 {resultado['chaves_removidas']} chaves de idempotência do sync removidas")
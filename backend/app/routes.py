@@ -1,26 +1,72 @@
 # routes.py
-from fastapi import APIRouter, Depends, HTTPException, Header
-from sqlalchemy.orm import Session
-from datetime import datetime
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, UploadFile, File, Request
+from fastapi.responses import Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import select, tuple_, and_, or_, literal, func, update, insert, delete
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from sqlalchemy.orm.attributes import set_committed_value
+from collections import defaultdict
+from datetime import datetime, timezone
+from pydantic import BaseModel, Field
 from typing import Optional, List
+import asyncio
+import base64
 import logging
+import os
+import time
 
 # Configurar logger
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-from app.database import SessionLocal
+from app.database import AsyncSessionLocal
 from app.db.models import (
     Tecnico,
     OS,
     Atendimento,
     EtapaHistorico,
     StatusOS,
-    Etapa
+    Etapa,
+    SyncIdempotencia,
+    Despacho
 )
 
-from app.auth import verify_password, create_token, decode_token
+from app.auth import (
+    create_token,
+    decode_claims,
+    usuarios_cache,
+    UsuarioAutenticado,
+    AUTH_CONFIAR_TOKEN,
+    controle_login,
+    LoginSobrecarregado
+)
+from app.storage import (
+    get_store,
+    caminho_original,
+    caminho_miniatura,
+    tipo_imagem,
+    eh_data_url,
+    salvar_data_url,
+    copiar_para_store,
+    FotoInvalida,
+    FotoMuitoGrande,
+    HASH_VALIDO
+)
+from app.miniaturas import agendar_miniatura, MINIATURA_LADO
+from app.eventos import hub, fluxo_sse
+from app import busca, geo
+from app.replicas import roteador_leitura
+from app.metricas import AcumuladorMetricas
+from app import schemas
+from app.cache_respostas import (
+    cache_respostas,
+    escopo_tecnico,
+    escopo_atendimento,
+    etag_confere
+)
 
 router = APIRouter()
 
@@ -29,140 +75,526 @@ router = APIRouter()
 # DB
 # =================================================
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 
 # =================================================
 # AUTH
 # =================================================
 
-def get_current_user(
+async def autenticar(claims: Optional[dict], db: AsyncSession) -> UsuarioAutenticado:
+    if not claims:
+        raise HTTPException(401, "Usuário não autorizado")
+
+    user_id = int(claims["sub"])
+    user = UsuarioAutenticado.de_claims(claims) if AUTH_CONFIAR_TOKEN else None
+
+    if user is None:
+        user = usuarios_cache.get(user_id)
+
+    if user is None:
+        # A sessão só abre conexão aqui, quando o cache não tem o técnico
+        tecnico = await db.get(Tecnico, user_id)
+        if not tecnico:
+            raise HTTPException(401, "Usuário não autorizado")
+
+        user = UsuarioAutenticado.de_tecnico(tecnico)
+        usuarios_cache.set(user_id, user)
+
+    if not user.ativo:
+        raise HTTPException(401, "Usuário inativo")
+
+    return user
+
+
+async def get_current_user(
     authorization: str = Header(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     token = authorization.replace("Bearer ", "")
-    user_id = decode_token(token)
+    return await autenticar(decode_claims(token), db)
 
-    user = db.get(Tecnico, user_id)
-
-    if not user:
-        raise HTTPException(401, "Usuário não autorizado")
 
+async def get_admin(user: UsuarioAutenticado = Depends(get_current_user)):
+    if not user.admin:
+        raise HTTPException(403, "Acesso restrito ao administrador")
     return user
 
 
+# =================================================
+# DB DE LEITURA (RÉPLICAS)
+# =================================================
+#
+# Sessão das rotas só de leitura: numa réplica em rotação, ou no primário
+# (sem réplicas, todas atrasadas, ou nenhuma com a última escrita do
+# técnico). Escritas sempre por get_db (app/replicas.py).
+
+async def get_db_leitura(user: UsuarioAutenticado = Depends(get_current_user)):
+    replica = await roteador_leitura.escolher(user.id)
+    if replica is None:
+        async with AsyncSessionLocal() as db:
+            yield db
+        return
+
+    async with replica.sessoes() as db:
+        try:
+            yield db
+        except (OSError, DBAPIError) as e:
+            roteador_leitura.falhou(replica, e)
+            raise
+
+
 # =================================================
 # LOGIN
 # =================================================
 
-@router.post("/login")
-def login(email: str, senha: str, db: Session = Depends(get_db)):
-    user = db.query(Tecnico).filter(
-        Tecnico.email == email
-    ).first()
+@router.post("/login", response_model=schemas.TokenResposta)
+async def login(email: str, senha: str, db: AsyncSession = Depends(get_db)):
+    result = await db.execute(
+        select(Tecnico).where(Tecnico.email == email)
+    )
+    user = result.scalars().first()
+
+    if not user:
+        raise HTTPException(401, "Credenciais inválidas")
+
+    # bcrypt é CPU pura: roda no pool de processos, fora do event loop
+    try:
+        senha_ok, novo_hash = await controle_login.verificar(senha, user.senha)
+    except LoginSobrecarregado:
+        raise HTTPException(503, "Muitos logins simultâneos, tente novamente", headers={"Retry-After": "2"})
 
-    if not user or not verify_password(senha, user.senha):
+    if not senha_ok:
         raise HTTPException(401, "Credenciais inválidas")
 
-    return {"token": create_token(user.id)}
+    autenticado = UsuarioAutenticado.de_tecnico(user)
+    if not autenticado.ativo:
+        raise HTTPException(401, "Usuário inativo")
+
+    # Custo do bcrypt mudou: regrava o hash com a senha que acabou de chegar
+    if novo_hash:
+        user.senha = novo_hash
+        await db.commit()
+
+    usuarios_cache.set(user.id, autenticado)
+
+    return {"token": create_token(user.id, autenticado)}
 
 
 # =================================================
 # LISTAR OS
 # =================================================
 
-@router.get("/os/abertas")
-def listar_os(
-    user: Tecnico = Depends(get_current_user),
-    db: Session = Depends(get_db)
+# Renderizado como literal (não parâmetro) para o planner casar a consulta
+# com o índice parcial idx_os_abertas (... WHERE status <> 'CONCLUIDA')
+OS_NAO_CONCLUIDA = OS.status != literal(StatusOS.CONCLUIDA, OS.status.type, literal_execute=True)
+
+LIMITE_MAXIMO_OS = 1000
+
+
+def os_visiveis_para(user_id: int):
+    """Não concluídas, menos as que outro técnico está atendendo/em campo."""
+    return and_(
+        OS_NAO_CONCLUIDA,
+        or_(
+            OS.status.notin_([StatusOS.EM_ATENDIMENTO, StatusOS.EM_CAMPO]),
+            OS.tecnico_id == user_id
+        )
+    )
+
+
+COLUNAS_OS = (OS.id, OS.cliente, OS.endereco, OS.status, OS.tecnico_id, OS.latitude, OS.longitude)
+
+
+async def buscar_os_proximas(db: AsyncSession, user_id: int, latitude: float, longitude: float, k: int):
+    """As K OS visíveis mais próximas, com a distância em km."""
+    if geo.POSTGIS:
+        ponto_os = func.geography(func.ST_SetSRID(func.ST_MakePoint(OS.longitude, OS.latitude), 4326))
+        ponto = func.geography(func.ST_SetSRID(func.ST_MakePoint(longitude, latitude), 4326))
+        result = await db.execute(
+            select(*COLUNAS_OS, (func.ST_Distance(ponto_os, ponto) / 1000).label("distancia_km"))
+            .where(os_visiveis_para(user_id), OS.latitude.isnot(None))
+            .order_by(ponto_os.op("<->")(ponto))
+            .limit(k)
+        )
+        return result.all()
+
+    distancia = geo.distancia_km_sql(latitude, longitude).label("distancia_km")
+
+    # Células de geohash em volta do técnico, aumentando até ter K OS mais
+    # perto que a borda do bloco pesquisado (aí nenhuma de fora ganha delas)
+    precisao = geo.PRECISAO_BUSCA
+    while precisao >= 1:
+        celulas = geo.celulas_vizinhas(latitude, longitude, precisao)
+        result = await db.execute(
+            select(*COLUNAS_OS, distancia)
+            .where(os_visiveis_para(user_id), geo.filtro_celulas(celulas))
+            .order_by(distancia)
+            .limit(k)
+        )
+        linhas = result.all()
+
+        if len(linhas) == k and linhas[-1][-1] <= geo.raio_coberto_km(latitude, longitude, precisao):
+            return linhas
+
+        precisao = geo.proxima_precisao(
+            precisao, len(linhas), k, linhas[-1][-1] if linhas else None, latitude
+        )
+
+    # Menos de K OS com coordenadas perto o bastante: ordena todas
+    result = await db.execute(
+        select(*COLUNAS_OS, distancia)
+        .where(os_visiveis_para(user_id), OS.geohash.isnot(None))
+        .order_by(distancia)
+        .limit(k)
+    )
+    return result.all()
+
+
+@router.get("/os/abertas", response_model=List[schemas.OSAberta])
+async def listar_os(
+    limite: Optional[int] = Query(None, ge=1, le=LIMITE_MAXIMO_OS),
+    apos_id: Optional[int] = None,
+    latitude: Optional[float] = Query(None, ge=-90, le=90),
+    longitude: Optional[float] = Query(None, ge=-180, le=180),
+    k: int = Query(20, ge=1, le=LIMITE_MAXIMO_OS),
+    user: UsuarioAutenticado = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db_leitura)
 ):
-    lista = db.query(OS).filter(
-        OS.status != StatusOS.CONCLUIDA
-    ).all()
+    # Com a posição do técnico: as K mais próximas, da mais perto à mais longe
+    if latitude is not None or longitude is not None:
+        if not geo.coordenada_valida(latitude, longitude):
+            raise HTTPException(400, "Informe latitude e longitude válidas")
 
-    resultado = []
+        return await buscar_os_proximas(db, user.id, latitude, longitude, k)
 
-    for o in lista:
-        if o.status == StatusOS.EM_ATENDIMENTO and o.tecnico_id != user.id:
-            continue
-            
-        if o.status == StatusOS.EM_CAMPO and o.tecnico_id != user.id:
-            continue
+    # Só as colunas da resposta: tuplas, sem montar objetos do ORM
+    query = select(*COLUNAS_OS).where(
+        os_visiveis_para(user.id)
+    ).order_by(OS.id)
 
-        resultado.append({
-            "id": o.id,
-            "cliente": o.cliente,
-            "endereco": o.endereco,
-            "status": o.status.value,
-            "tecnico_id": o.tecnico_id
-        })
+    # Paginação opcional: limite=N e, nas próximas, apos_id=<último id>
+    if apos_id is not None:
+        query = query.where(OS.id > apos_id)
+    if limite is not None:
+        query = query.limit(limite)
+
+    result = await db.execute(query)
 
-    return resultado
+    return result.all()
+
+
+# =================================================
+# ROTA SUGERIDA (DESPACHO)
+# =================================================
+
+@router.get("/despacho/minha-rota", response_model=List[schemas.OSRota])
+async def minha_rota(
+    user: UsuarioAutenticado = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """OS do último plano de despacho para o técnico, na ordem de visita."""
+    result = await db.execute(
+        select(Despacho.ordem, Despacho.distancia_km, *COLUNAS_OS)
+        .join(OS, OS.id == Despacho.os_id)
+        .where(Despacho.tecnico_id == user.id, OS.status == StatusOS.EM_ABERTO)
+        .order_by(Despacho.ordem)
+    )
+    return result.all()
+
+
+# =================================================
+# EVENTOS DE OS (SSE)
+# =================================================
+
+@router.get("/eventos/os")
+async def eventos_os(
+    token: Optional[str] = None,
+    authorization: Optional[str] = Header(None)
+):
+    # EventSource do navegador não envia headers: o token vem na query
+    if token is None and authorization:
+        token = authorization.replace("Bearer ", "")
+    claims = decode_claims(token) if token else None
+
+    # Sessão só para autenticar: o stream não segura conexão do pool
+    async with AsyncSessionLocal() as db:
+        user = await autenticar(claims, db)
+
+    if hub.lotado():
+        raise HTTPException(503, "Limite de conexões de eventos atingido", headers={"Retry-After": "10"})
+
+    expira_em = asyncio.get_running_loop().time() + max(claims["exp"] - time.time(), 0)
+
+    return StreamingResponse(
+        fluxo_sse(user.id, expira_em),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 # =================================================
 # INICIAR ATENDIMENTO
 # =================================================
 
+LOCK_INDISPONIVEL = "55P03"
+
+
 class IniciarAtendimentoInput(BaseModel):
     latitude: Optional[float] = 0
     longitude: Optional[float] = 0
 
-@router.post("/os/{os_id}/iniciar")
-def iniciar_atendimento(
+@router.post("/os/{os_id}/iniciar", response_model=schemas.AtendimentoIniciado)
+async def iniciar_atendimento(
     os_id: int,
     data: IniciarAtendimentoInput,
-    user: Tecnico = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    user: UsuarioAutenticado = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    os = db.get(OS, os_id)
+    # Trava a linha da OS até o commit: entre dois técnicos disputando a
+    # mesma OS, um segue e o outro recebe 409 na hora (NOWAIT), sem ficar
+    # segurando conexão na fila do lock
+    try:
+        os = await db.get(OS, os_id, with_for_update={"nowait": True})
+    except DBAPIError as e:
+        if getattr(e.orig, "sqlstate", None) == LOCK_INDISPONIVEL:
+            raise HTTPException(409, "Esta OS está sendo iniciada por outro técnico")
+        raise
+
     if not os:
         raise HTTPException(404, "OS não encontrada")
     
     if os.status in [StatusOS.EM_ATENDIMENTO, StatusOS.EM_CAMPO] and os.tecnico_id != user.id:
-        raise HTTPException(400, "Esta OS já está sendo atendida por outro técnico")
+        raise HTTPException(409, "Esta OS já está sendo atendida por outro técnico")
     
-    atendimento_existente = db.query(Atendimento).filter(
-        Atendimento.os_id == os_id,
-        Atendimento.hora_fim.is_(None)
-    ).first()
+    result = await db.execute(
+        select(Atendimento.id, Atendimento.tecnico_id).where(
+            Atendimento.os_id == os_id,
+            Atendimento.hora_fim.is_(None)
+        )
+    )
+    atendimento_existente = result.first()
     
     if atendimento_existente:
         if atendimento_existente.tecnico_id != user.id:
-            raise HTTPException(400, "Esta OS já possui um atendimento em andamento")
+            raise HTTPException(409, "Esta OS já possui um atendimento em andamento")
         return {"id": atendimento_existente.id, "mensagem": "Atendimento já existe"}
     
+    agora = datetime.utcnow()
     atendimento = Atendimento(
         os_id=os.id,
         tecnico_id=user.id,
-        hora_inicio=datetime.utcnow(),
-        etapa=Etapa.INSPECAO
+        hora_inicio=agora,
+        etapa=Etapa.INSPECAO,
+        etapa_em=agora
     )
+    atendimento.etapas.append(EtapaHistorico(
+        etapa=Etapa.INSPECAO,
+        descricao="Início do atendimento",
+        foto="",
+        criado_em=agora
+    ))
+
+    if geo.coordenada_valida(data.latitude, data.longitude):
+        atendimento.latitude_inicio = data.latitude
+        atendimento.longitude_inicio = data.longitude
+
+        # UPDATE direto: posição não mexe na identidade em cache
+        await db.execute(
+            update(Tecnico)
+            .where(Tecnico.id == user.id)
+            .values(latitude=data.latitude, longitude=data.longitude, posicao_em=agora)
+        )
     
     os.status = StatusOS.EM_ATENDIMENTO
     os.tecnico_id = user.id
     
     db.add(atendimento)
-    db.commit()
-    db.refresh(atendimento)
-    
-    historico = EtapaHistorico(
-        atendimento_id=atendimento.id,
-        etapa=Etapa.INSPECAO,
-        descricao="Início do atendimento",
-        foto=""
-    )
-    db.add(historico)
-    db.commit()
+
+    metricas = AcumuladorMetricas()
+    metricas.inicio(atendimento)
+
+    # Uma transação só: OS, atendimento, primeira etapa e métricas juntos ou nada
+    try:
+        await metricas.gravar(db)
+        await db.commit()
+    except IntegrityError:
+        # idx_atendimento_aberto_os: outro caminho abriu atendimento para a OS
+        await db.rollback()
+        raise HTTPException(409, "Esta OS já possui um atendimento em andamento")
+
+    await roteador_leitura.marcar_escrita(db, user.id)
+    await cache_respostas.invalidar(escopo_tecnico(user.id))
     
     return {"id": atendimento.id, "mensagem": "Atendimento iniciado com sucesso"}
 
 
+# =================================================
+# FOTOS
+# =================================================
+
+CACHE_IMUTAVEL = "public, max-age=31536000, immutable"
+TIMEOUT_MINIATURA = 10
+
+
+def salvar_foto_inline(data_url: str) -> str:
+    try:
+        hash, _ = salvar_data_url(data_url)
+    except FotoMuitoGrande:
+        raise HTTPException(413, "Foto muito grande")
+    except FotoInvalida:
+        raise HTTPException(400, "Foto inválida")
+
+    agendar_miniatura(hash)
+    return get_store().url(hash)
+
+
+def interpretar_range(valor: str, tamanho: int):
+    """
+    Interpreta um header Range de faixa única ("bytes=a-b", "bytes=a-",
+    "bytes=-n"). Retorna (inicio, fim) inclusivos, None para ignorar o
+    header (múltiplas faixas/formato desconhecido) ou levanta 416.
+    """
+    if not valor.startswith("bytes=") or "," in valor:
+        return None
+
+    inicio, _, fim = valor[len("bytes="):].strip().partition("-")
+
+    try:
+        if inicio == "":
+            sufixo = int(fim)
+            if sufixo <= 0:
+                raise ValueError
+            inicio, fim = max(tamanho - sufixo, 0), tamanho - 1
+        else:
+            inicio = int(inicio)
+            fim = min(int(fim), tamanho - 1) if fim else tamanho - 1
+    except ValueError:
+        return None
+
+    if inicio >= tamanho or inicio > fim:
+        raise HTTPException(
+            416,
+            "Faixa não satisfazível",
+            headers={"Content-Range": f"bytes */{tamanho}"}
+        )
+
+    return inicio, fim
+
+
+async def resposta_arquivo(
+    request: Request,
+    chave: str,
+    etag: str,
+    cache_control: str = CACHE_IMUTAVEL
+):
+    """
+    Serve um arquivo do storage com ETag forte, Cache-Control e suporte a
+    requisições condicionais (If-None-Match) e parciais (Range/If-Range).
+
+    Chamadas ao storage (disco ou S3) rodam no threadpool, fora do event loop.
+    """
+    store = get_store()
+    headers = {
+        "ETag": etag,
+        "Cache-Control": cache_control,
+        "Accept-Ranges": "bytes"
+    }
+
+    if etag_confere(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    tamanho = await run_in_threadpool(store.tamanho, chave)
+    cabecalho = await run_in_threadpool(lambda: b"".join(store.ler(chave, 0, 15)))
+    tipo = tipo_imagem(cabecalho) or "application/octet-stream"
+
+    faixa = None
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (not if_range or if_range.strip() == etag):
+        faixa = interpretar_range(range_header, tamanho)
+
+    if faixa is None:
+        headers["Content-Length"] = str(tamanho)
+        return StreamingResponse(store.ler(chave), media_type=tipo, headers=headers)
+
+    inicio, fim = faixa
+    headers["Content-Length"] = str(fim - inicio + 1)
+    headers["Content-Range"] = f"bytes {inicio}-{fim}/{tamanho}"
+    return StreamingResponse(
+        store.ler(chave, inicio, fim),
+        status_code=206,
+        media_type=tipo,
+        headers=headers
+    )
+
+
+@router.post("/fotos", response_model=schemas.FotoEnviada)
+async def upload_foto(
+    arquivo: UploadFile = File(...),
+    user: UsuarioAutenticado = Depends(get_current_user)
+):
+    try:
+        hash, tamanho = await run_in_threadpool(copiar_para_store, arquivo.file)
+    except FotoMuitoGrande:
+        raise HTTPException(413, "Foto muito grande")
+    except FotoInvalida:
+        raise HTTPException(400, "Arquivo não é uma imagem suportada")
+
+    # Prévia gerada em segundo plano; a resposta não espera por ela
+    agendar_miniatura(hash)
+
+    store = get_store()
+    return {
+        "hash": hash,
+        "url": store.url(hash),
+        "miniatura": store.url_miniatura(hash),
+        "tamanho": tamanho
+    }
+
+
+async def validar_hash_foto(hash: str):
+    # Sem autenticação: <img> não envia o header Authorization e a URL
+    # (sha256 do conteúdo) não é adivinhável
+    if not HASH_VALIDO.match(hash) or not await run_in_threadpool(
+        get_store().existe, caminho_original(hash)
+    ):
+        raise HTTPException(404, "Foto não encontrada")
+
+
+@router.get("/fotos/{hash}")
+async def baixar_foto(hash: str, request: Request):
+    await validar_hash_foto(hash)
+
+    # Conteúdo endereçado por hash nunca muda: pode ficar em cache para sempre
+    return await resposta_arquivo(request, caminho_original(hash), f'"{hash}"')
+
+
+@router.get("/fotos/{hash}/miniatura")
+async def baixar_miniatura(hash: str, request: Request):
+    await validar_hash_foto(hash)
+
+    chave = caminho_miniatura(hash)
+    if not await run_in_threadpool(get_store().existe, chave):
+        try:
+            # shield: o timeout desta requisição não cancela a geração
+            await asyncio.wait_for(
+                asyncio.shield(asyncio.wrap_future(agendar_miniatura(hash))),
+                TIMEOUT_MINIATURA
+            )
+        except Exception:
+            # Formato que o Pillow não abre (ou demora demais): entrega o
+            # original, sem cache longo, para tentar a prévia de novo depois
+            # (falha fica registrada por MINIATURA_FALHA_TTL, app/miniaturas.py)
+            return await resposta_arquivo(
+                request, caminho_original(hash), f'"{hash}"', cache_control="no-cache"
+            )
+
+    return await resposta_arquivo(request, chave, f'"{hash}-m{MINIATURA_LADO}"')
+
+
 # =================================================
 # AVANÇAR ETAPA
 # =================================================
@@ -173,53 +605,90 @@ class EtapaInput(BaseModel):
     foto: str = ""
 
 
-@router.post("/atendimento/{id}/etapa")
-def avancar_etapa(
-    id: int,
-    data: EtapaInput,
-    user: Tecnico = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    atendimento = db.get(Atendimento, id)
-    if not atendimento:
-        raise HTTPException(404, "Atendimento não encontrado")
-    
-    if atendimento.tecnico_id != user.id:
+def validar_etapa(atendimento: Atendimento, etapa: str, user_id: int) -> Etapa:
+    """Regras comuns ao avanço online e ao /sync/etapas."""
+    if atendimento.tecnico_id != user_id:
         raise HTTPException(403, "Você não tem permissão para este atendimento")
-    
+
     try:
-        nova_etapa = Etapa[data.etapa]
+        nova_etapa = Etapa[etapa]
     except KeyError:
-        raise HTTPException(400, f"Etapa inválida: {data.etapa}")
-    
+        raise HTTPException(400, f"Etapa inválida: {etapa}")
+
     etapas_ordem = list(Etapa)
     etapa_atual_index = etapas_ordem.index(atendimento.etapa)
     nova_etapa_index = etapas_ordem.index(nova_etapa)
-    
+
     if nova_etapa_index <= etapa_atual_index and nova_etapa != atendimento.etapa:
         raise HTTPException(400, f"Não é possível voltar para {nova_etapa.value}")
-    
+
+    return nova_etapa
+
+
+def aplicar_etapa(
+    atendimento: Atendimento,
+    nova_etapa: Etapa,
+    momento: datetime,
+    metricas: AcumuladorMetricas
+):
+    metricas.transicao(atendimento, nova_etapa, momento)
+    if nova_etapa != atendimento.etapa:
+        atendimento.etapa_em = momento
     atendimento.etapa = nova_etapa
-    
-    hist = EtapaHistorico(
-        atendimento_id=id,
-        etapa=nova_etapa,
-        descricao=data.descricao,
-        foto=data.foto
-    )
-    db.add(hist)
-    
+
     if nova_etapa in [Etapa.ORCAMENTO, Etapa.APROVACAO]:
         atendimento.os.status = StatusOS.AGUARDANDO
     elif nova_etapa == Etapa.EXECUCAO:
         atendimento.os.status = StatusOS.EM_CAMPO
     elif nova_etapa == Etapa.FINALIZACAO:
-        atendimento.hora_fim = datetime.utcnow()
+        atendimento.hora_fim = momento
         atendimento.os.status = StatusOS.CONCLUIDA
     else:
         atendimento.os.status = StatusOS.EM_ATENDIMENTO
+
+
+@router.post("/atendimento/{id}/etapa", response_model=schemas.EtapaAvancada)
+async def avancar_etapa(
+    id: int,
+    data: EtapaInput,
+    user: UsuarioAutenticado = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    # Trava o atendimento até o commit, como o /sync/etapas: a validação e
+    # as métricas usam a etapa atual, que um lote concorrente poderia mudar.
+    # Só a linha do atendimento (a OS vem por outer join, que não trava)
+    atendimento = await db.get(
+        Atendimento, id,
+        options=[joinedload(Atendimento.os)],
+        with_for_update={"of": Atendimento}
+    )
+    if not atendimento:
+        raise HTTPException(404, "Atendimento não encontrado")
+    
+    nova_etapa = validar_etapa(atendimento, data.etapa, user.id)
+    
+    foto = data.foto
+    if eh_data_url(foto):
+        # Clientes antigos ainda mandam a foto inline em base64
+        foto = await run_in_threadpool(salvar_foto_inline, foto)
+    
+    agora = datetime.utcnow()
+    hist = EtapaHistorico(
+        atendimento_id=id,
+        etapa=nova_etapa,
+        descricao=data.descricao,
+        foto=foto,
+        criado_em=agora
+    )
+    db.add(hist)
+    
+    metricas = AcumuladorMetricas()
+    aplicar_etapa(atendimento, nova_etapa, agora, metricas)
+    await metricas.gravar(db)
     
-    db.commit()
+    await db.commit()
+    await roteador_leitura.marcar_escrita(db, user.id)
+    await cache_respostas.invalidar(escopo_tecnico(user.id), escopo_atendimento(id))
     
     return {
         "etapa": nova_etapa.value,
@@ -227,159 +696,467 @@ def avancar_etapa(
     }
 
 
+# =================================================
+# SYNC OFFLINE (LOTE DE ETAPAS)
+# =================================================
+#
+# O app guarda as etapas feitas sem sinal e, ao reconectar, manda a fila
+# inteira de uma vez. Cada evento traz uma chave de idempotência gerada no
+# aparelho: reenviar o mesmo lote (timeout, app fechado no meio) não
+# duplica histórico. Tudo é aplicado numa única transação, com o histórico
+# inserido em lote.
+#
+# As chaves valem por SYNC_IDEMPOTENCIA_DIAS (app/particoes.py apaga as
+# mais antigas): essa é a janela de reenvio. Um evento reenviado depois
+# dela volta a ser tratado como novo; uma etapa que já foi aplicada cai
+# na validação de transição e é recusada, mas o app não deve guardar
+# eventos sem confirmação por mais tempo que isso.
+
+SYNC_MAX_EVENTOS = int(os.getenv("SYNC_MAX_EVENTOS", "200"))
+
+
+class EventoEtapaSync(BaseModel):
+    chave: str = Field(min_length=1, max_length=64)
+    atendimento_id: int
+    etapa: str
+    descricao: str = ""
+    foto: str = ""
+    criado_em: datetime
+
+
+class SyncEtapasInput(BaseModel):
+    eventos: List[EventoEtapaSync] = Field(max_length=SYNC_MAX_EVENTOS)
+
+
+def _horario_servidor(criado_em: datetime) -> datetime:
+    # O banco guarda UTC sem fuso
+    if criado_em.tzinfo is not None:
+        criado_em = criado_em.astimezone(timezone.utc).replace(tzinfo=None)
+    return criado_em
+
+
+@router.post("/sync/etapas", response_model=schemas.SyncResposta)
+async def sincronizar_etapas(
+    data: SyncEtapasInput,
+    user: UsuarioAutenticado = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    eventos = data.eventos
+    if not eventos:
+        return {"aplicados": 0, "resultados": []}
+
+    chaves = [e.chave for e in eventos]
+    if len(set(chaves)) != len(chaves):
+        raise HTTPException(400, "Chave de idempotência repetida no lote")
+
+    # Reserva as chaves. Um reenvio simultâneo do mesmo lote espera aqui
+    # pelo commit do primeiro e depois vê as chaves como já usadas.
+    novas = set((await db.execute(
+        pg_insert(SyncIdempotencia)
+        .values([{"tecnico_id": user.id, "chave": c} for c in chaves])
+        .on_conflict_do_nothing()
+        .returning(SyncIdempotencia.chave)
+    )).scalars())
+
+    ja_aplicadas = {}
+    if len(novas) < len(chaves):
+        ja_aplicadas = dict((await db.execute(
+            select(SyncIdempotencia.chave, SyncIdempotencia.etapa_historico_id).where(
+                SyncIdempotencia.tecnico_id == user.id,
+                SyncIdempotencia.chave.in_([c for c in chaves if c not in novas])
+            )
+        )).all())
+
+    # Atendimentos do lote, travados contra um avanço online concorrente
+    ids = {e.atendimento_id for e in eventos if e.chave in novas}
+    atendimentos = {}
+    if ids:
+        result = await db.execute(
+            select(Atendimento)
+            .options(joinedload(Atendimento.os))
+            .where(Atendimento.id.in_(ids))
+            .order_by(Atendimento.id)
+            .with_for_update(of=Atendimento)
+        )
+        atendimentos = {a.id: a for a in result.scalars()}
+
+        # Última etapa já gravada de cada um (piso para o horário do
+        # aparelho). Etapa nunca é anterior ao início do atendimento: o
+        # limite deixa de fora as partições de meses anteriores
+        inicios = [a.hora_inicio for a in atendimentos.values() if a.hora_inicio]
+        query = (
+            select(EtapaHistorico.atendimento_id, func.max(EtapaHistorico.criado_em))
+            .where(EtapaHistorico.atendimento_id.in_(ids))
+            .group_by(EtapaHistorico.atendimento_id)
+        )
+        if len(inicios) == len(atendimentos):
+            query = query.where(EtapaHistorico.criado_em >= min(inicios))
+        ultimo_horario = dict((await db.execute(query)).all())
+    else:
+        ultimo_horario = {}
+
+    agora = datetime.utcnow()
+    metricas = AcumuladorMetricas()
+    resultados = []
+    linhas = []
+    rejeitadas = []
+
+    for evento in eventos:
+        if evento.chave not in novas:
+            resultados.append({
+                "chave": evento.chave,
+                "status": "duplicado",
+                "etapa_historico_id": ja_aplicadas.get(evento.chave)
+            })
+            continue
+
+        atendimento = atendimentos.get(evento.atendimento_id)
+        try:
+            if not atendimento:
+                raise HTTPException(404, "Atendimento não encontrado")
+
+            nova_etapa = validar_etapa(atendimento, evento.etapa, user.id)
+
+            foto = evento.foto
+            if eh_data_url(foto):
+                foto = await run_in_threadpool(salvar_foto_inline, foto)
+        except HTTPException as e:
+            rejeitadas.append(evento.chave)
+            resultados.append({
+                "chave": evento.chave,
+                "status": "erro",
+                "codigo": e.status_code,
+                "erro": e.detail
+            })
+            continue
+
+        # Relógio do aparelho não é confiável: mantém o horário entre a
+        # etapa anterior (gravada ou do próprio lote) e agora
+        minimo = ultimo_horario.get(atendimento.id) or atendimento.hora_inicio
+        momento = min(_horario_servidor(evento.criado_em), agora)
+        if minimo is not None:
+            momento = max(momento, minimo)
+        ultimo_horario[atendimento.id] = momento
+
+        linhas.append({
+            "atendimento_id": atendimento.id,
+            "etapa": nova_etapa,
+            "descricao": evento.descricao,
+            "foto": foto,
+            "criado_em": momento
+        })
+        aplicar_etapa(atendimento, nova_etapa, momento, metricas)
+        resultados.append({"chave": evento.chave, "status": "aplicado"})
+
+    if linhas:
+        historico_ids = (await db.execute(
+            insert(EtapaHistorico).returning(EtapaHistorico.id, sort_by_parameter_order=True),
+            linhas
+        )).scalars().all()
+
+        aplicados = [r for r in resultados if r["status"] == "aplicado"]
+        for resultado, historico_id in zip(aplicados, historico_ids):
+            resultado["etapa_historico_id"] = historico_id
+
+        await db.execute(
+            update(SyncIdempotencia),
+            [
+                {"tecnico_id": user.id, "chave": r["chave"], "etapa_historico_id": r["etapa_historico_id"]}
+                for r in aplicados
+            ]
+        )
+
+    await metricas.gravar(db)
+
+    if rejeitadas:
+        # Evento recusado não consome a chave: o aparelho pode corrigir e reenviar
+        await db.execute(
+            delete(SyncIdempotencia).where(
+                SyncIdempotencia.tecnico_id == user.id,
+                SyncIdempotencia.chave.in_(rejeitadas)
+            )
+        )
+
+    await db.commit()
+
+    if linhas:
+        await roteador_leitura.marcar_escrita(db, user.id)
+        await cache_respostas.invalidar(
+            escopo_tecnico(user.id),
+            *{escopo_atendimento(l["atendimento_id"]) for l in linhas}
+        )
+
+    logger.info(
+        f"🔄 Sync de {user.email}: {len(linhas)} aplicados, "
+        f"{len(eventos) - len(novas)} duplicados, {len(rejeitadas)} recusados"
+    )
+    return {"aplicados": len(linhas), "resultados": resultados}
+
+
 # =================================================
 # ATENDIMENTO ATIVO
 # =================================================
 
-@router.get("/atendimento/ativo")
-def atendimento_ativo(
-    user: Tecnico = Depends(get_current_user),
-    db: Session = Depends(get_db)
+@router.get("/atendimento/ativo", response_model=Optional[schemas.AtendimentoAtivo])
+async def atendimento_ativo(
+    request: Request,
+    user: UsuarioAutenticado = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    atendimento = db.query(Atendimento).filter(
-        Atendimento.tecnico_id == user.id,
-        Atendimento.hora_fim.is_(None)
-    ).first()
+    async def gerar():
+        result = await db.execute(
+            select(Atendimento).options(
+                joinedload(Atendimento.os)
+            ).where(
+                Atendimento.tecnico_id == user.id,
+                Atendimento.hora_fim.is_(None)
+            ).limit(1)
+        )
+        return result.scalars().first()
 
-    if not atendimento:
-        return None
+    return await cache_respostas.responder(
+        request, escopo_tecnico(user.id), Optional[schemas.AtendimentoAtivo], gerar
+    )
 
-    return {
-        "id": atendimento.id,
-        "etapa": atendimento.etapa.value,
-        "os": {
-            "id": atendimento.os.id,
-            "cliente": atendimento.os.cliente,
-            "endereco": atendimento.os.endereco,
-            "status": atendimento.os.status.value
-        }
-    }
+
+# =================================================
+# PAGINAÇÃO (KEYSET)
+# =================================================
+
+LIMITE_PADRAO = 20
+LIMITE_MAXIMO = 100
+
+STATUS_ATENDIMENTO = ["concluido", "em_andamento"]
+
+
+def codificar_cursor(atendimento: Atendimento) -> str:
+    valor = f"{atendimento.hora_inicio.isoformat()}|{atendimento.id}"
+    return base64.urlsafe_b64encode(valor.encode()).decode()
+
+
+def decodificar_cursor(cursor: str):
+    try:
+        valor = base64.urlsafe_b64decode(cursor.encode()).decode()
+        hora_inicio, id = valor.split("|")
+        return datetime.fromisoformat(hora_inicio), int(id)
+    except ValueError:
+        raise HTTPException(400, "Cursor inválido")
+
+
+async def paginar_atendimentos(
+    db: AsyncSession,
+    query,
+    cursor: Optional[str],
+    limite: int,
+    inicio: Optional[datetime],
+    fim: Optional[datetime],
+    status: Optional[str]
+):
+    """
+    Aplica filtros e paginação por (hora_inicio, id) decrescente.
+
+    Usa o índice idx_atendimento_tecnico_inicio: cada página custa o
+    mesmo, não importa quantos atendimentos o técnico já tenha.
+    Retorna (atendimentos, proximo_cursor).
+    """
+    if status is not None and status not in STATUS_ATENDIMENTO:
+        raise HTTPException(400, f"Status inválido: {status}")
+
+    query = query.where(Atendimento.hora_inicio.isnot(None))
+
+    if inicio:
+        query = query.where(Atendimento.hora_inicio >= inicio)
+    if fim:
+        query = query.where(Atendimento.hora_inicio < fim)
+
+    if status == "concluido":
+        query = query.where(Atendimento.hora_fim.isnot(None))
+    elif status == "em_andamento":
+        query = query.where(Atendimento.hora_fim.is_(None))
+
+    if cursor:
+        query = query.where(
+            tuple_(Atendimento.hora_inicio, Atendimento.id) < decodificar_cursor(cursor)
+        )
+
+    result = await db.execute(
+        query.order_by(
+            Atendimento.hora_inicio.desc(),
+            Atendimento.id.desc()
+        ).limit(limite + 1)
+    )
+    atendimentos = result.scalars().all()
+
+    proximo_cursor = None
+    if len(atendimentos) > limite:
+        atendimentos = atendimentos[:limite]
+        proximo_cursor = codificar_cursor(atendimentos[-1])
+
+    return atendimentos, proximo_cursor
+
+
+async def carregar_etapas(db: AsyncSession, atendimentos):
+    """
+    Preenche atendimento.etapas da página num único SELECT.
+
+    Faz o papel do selectinload, mas limitando criado_em ao início mais
+    antigo da página: o Postgres só lê as partições mensais desses meses
+    em vez de todas (migração 0009).
+    """
+    if not atendimentos:
+        return
+
+    etapas = defaultdict(list)
+    query = select(EtapaHistorico).where(
+        EtapaHistorico.atendimento_id.in_([a.id for a in atendimentos])
+    ).order_by(EtapaHistorico.atendimento_id, EtapaHistorico.criado_em)
+
+    inicios = [a.hora_inicio for a in atendimentos if a.hora_inicio]
+    if len(inicios) == len(atendimentos):
+        query = query.where(EtapaHistorico.criado_em >= min(inicios))
+
+    for etapa in (await db.execute(query)).scalars():
+        etapas[etapa.atendimento_id].append(etapa)
+
+    for atendimento in atendimentos:
+        set_committed_value(atendimento, "etapas", etapas[atendimento.id])
 
 
 # =================================================
 # HISTÓRICO COMPLETO
 # =================================================
 
-@router.get("/atendimentos/historico")
-def listar_historico_completo(
-    user: Tecnico = Depends(get_current_user),
-    db: Session = Depends(get_db)
+@router.get("/atendimentos/historico", response_model=schemas.PaginaHistorico)
+async def listar_historico_completo(
+    request: Request,
+    cursor: Optional[str] = None,
+    limite: int = Query(LIMITE_PADRAO, ge=1, le=LIMITE_MAXIMO),
+    inicio: Optional[datetime] = None,
+    fim: Optional[datetime] = None,
+    status: Optional[str] = None,
+    user: UsuarioAutenticado = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db_leitura)
 ):
-    logger.info(f"📊 Buscando histórico completo para técnico {user.id}")
-    
-    try:
-        atendimentos = db.query(Atendimento).filter(
+    async def gerar():
+        logger.info(f"📊 Buscando histórico completo para técnico {user.id}")
+
+        # OS via JOIN e etapas num único SELECT ... IN (página limitada a
+        # LIMITE_MAXIMO): número de consultas constante por página
+        query = select(Atendimento).options(
+            joinedload(Atendimento.os)
+        ).where(
             Atendimento.tecnico_id == user.id
-        ).order_by(Atendimento.hora_inicio.desc()).all()
-        
+        )
+
+        atendimentos, proximo_cursor = await paginar_atendimentos(
+            db, query, cursor, limite, inicio, fim, status
+        )
+        await carregar_etapas(db, atendimentos)
+
         logger.info(f"✅ Encontrados {len(atendimentos)} atendimentos")
-        
-        resultado = []
-        
-        for atendimento in atendimentos:
-            try:
-                etapas = db.query(EtapaHistorico).filter(
-                    EtapaHistorico.atendimento_id == atendimento.id
-                ).order_by(EtapaHistorico.criado_em).all()
-                
-                resultado.append({
-                    "id": atendimento.id,
-                    "os_id": atendimento.os_id,
-                    "cliente": atendimento.os.cliente if atendimento.os else "Cliente não encontrado",
-                    "endereco": atendimento.os.endereco if atendimento.os else "Endereço não encontrado",
-                    "etapa_atual": atendimento.etapa.value if atendimento.etapa else None,
-                    "hora_inicio": atendimento.hora_inicio.isoformat() if atendimento.hora_inicio else None,
-                    "hora_fim": atendimento.hora_fim.isoformat() if atendimento.hora_fim else None,
-                    "status": "concluido" if atendimento.hora_fim else "em_andamento",
-                    "etapas": [
-                        {
-                            "id": e.id,
-                            "etapa": e.etapa.value if e.etapa else None,
-                            "descricao": e.descricao,
-                            "foto": e.foto,
-                            "criado_em": e.criado_em.isoformat() if e.criado_em else None
-                        }
-                        for e in etapas
-                    ]
-                })
-            except Exception as e:
-                logger.error(f"❌ Erro ao processar atendimento {atendimento.id}: {e}")
-                continue
-        
-        logger.info(f"✅ Histórico processado com sucesso: {len(resultado)} itens")
-        return resultado
-        
-    except Exception as e:
-        logger.error(f"❌ Erro ao buscar histórico: {e}")
-        raise HTTPException(500, f"Erro ao buscar histórico: {str(e)}")
+        return {"itens": atendimentos, "proximo_cursor": proximo_cursor}
+
+    return await cache_respostas.responder(
+        request, escopo_tecnico(user.id), schemas.PaginaHistorico, gerar
+    )
 
 
 # =================================================
 # ETAPAS DE UM ATENDIMENTO
 # =================================================
 
-@router.get("/atendimento/{id}/etapas")
-def get_etapas_historico(
+@router.get("/atendimento/{id}/etapas", response_model=List[schemas.EtapaItem])
+async def get_etapas_historico(
+    request: Request,
     id: int,
-    user: Tecnico = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    user: UsuarioAutenticado = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db_leitura)
 ):
-    atendimento = db.get(Atendimento, id)
-    if not atendimento:
-        raise HTTPException(404, "Atendimento não encontrado")
-    
-    historico = db.query(EtapaHistorico).filter(
-        EtapaHistorico.atendimento_id == id
-    ).order_by(EtapaHistorico.criado_em).all()
+    async def gerar():
+        atendimento = await db.get(Atendimento, id)
+        if not atendimento:
+            raise HTTPException(404, "Atendimento não encontrado")
 
-    return [
-        {
-            "id": h.id,
-            "etapa": h.etapa.value if h.etapa else None,
-            "descricao": h.descricao,
-            "foto": h.foto,
-            "criado_em": h.criado_em.isoformat() if h.criado_em else None
-        }
-        for h in historico
-    ]
+        query = select(EtapaHistorico).where(
+            EtapaHistorico.atendimento_id == id
+        ).order_by(EtapaHistorico.criado_em)
+        if atendimento.hora_inicio:
+            query = query.where(EtapaHistorico.criado_em >= atendimento.hora_inicio)
+
+        result = await db.execute(query)
+        return result.scalars().all()
+
+    return await cache_respostas.responder(
+        request, escopo_atendimento(id), List[schemas.EtapaItem], gerar
+    )
 
 
 # =================================================
 # HISTÓRICO (COMPATIBILIDADE)
 # =================================================
 
-@router.get("/atendimento/{id}/historico")
-def historico_completo(
-    id: int, 
-    user: Tecnico = Depends(get_current_user),
-    db: Session = Depends(get_db)
+@router.get("/atendimento/{id}/historico", response_model=List[schemas.EtapaItem])
+async def historico_completo(
+    request: Request,
+    id: int,
+    user: UsuarioAutenticado = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db_leitura)
 ):
-    return get_etapas_historico(id, user, db)
+    return await get_etapas_historico(request, id, user, db)
 
 
 # =================================================
 # MEUS ATENDIMENTOS
 # =================================================
 
-@router.get("/tecnicos/meus-atendimentos")
-def meus_atendimentos(
-    user: Tecnico = Depends(get_current_user),
-    db: Session = Depends(get_db)
+@router.get("/tecnicos/meus-atendimentos", response_model=schemas.PaginaMeusAtendimentos)
+async def meus_atendimentos(
+    request: Request,
+    cursor: Optional[str] = None,
+    limite: int = Query(LIMITE_PADRAO, ge=1, le=LIMITE_MAXIMO),
+    inicio: Optional[datetime] = None,
+    fim: Optional[datetime] = None,
+    status: Optional[str] = None,
+    user: UsuarioAutenticado = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db_leitura)
 ):
-    atendimentos = db.query(Atendimento).filter(
-        Atendimento.tecnico_id == user.id
-    ).order_by(Atendimento.hora_inicio.desc()).all()
-    
-    return [
-        {
-            "id": a.id,
-            "os_id": a.os_id,
-            "cliente": a.os.cliente if a.os else None,
-            "etapa": a.etapa.value if a.etapa else None,
-            "status_os": a.os.status.value if a.os and a.os.status else None,
-            "hora_inicio": a.hora_inicio.isoformat() if a.hora_inicio else None,
-            "hora_fim": a.hora_fim.isoformat() if a.hora_fim else None,
-            "ativo": a.hora_fim is None
-        }
-        for a in atendimentos
-    ]
\ No newline at end of file
+    async def gerar():
+        query = select(Atendimento).options(
+            joinedload(Atendimento.os)
+        ).where(
+            Atendimento.tecnico_id == user.id
+        )
+
+        atendimentos, proximo_cursor = await paginar_atendimentos(
+            db, query, cursor, limite, inicio, fim, status
+        )
+        return {"itens": atendimentos, "proximo_cursor": proximo_cursor}
+
+    return await cache_respostas.responder(
+        request, escopo_tecnico(user.id), schemas.PaginaMeusAtendimentos, gerar
+    )
+
+
+# =================================================
+# BUSCA
+# =================================================
+#
+# Por cliente, endereço ou texto das etapas (app/busca.py). O técnico busca
+# nos próprios atendimentos; o admin em todos, ou nos de um técnico.
+
+@router.get("/busca", response_model=schemas.PaginaBusca)
+async def buscar_atendimentos(
+    q: str = Query(..., min_length=2, max_length=200),
+    cursor: Optional[str] = None,
+    limite: int = Query(LIMITE_PADRAO, ge=1, le=LIMITE_MAXIMO),
+    tecnico_id: Optional[int] = None,
+    user: UsuarioAutenticado = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db_leitura)
+):
+    if not user.admin:
+        tecnico_id = user.id
+
+    itens, proximo_cursor = await busca.buscar(
+        db, q, tecnico_id, limite, busca.decodificar_cursor(cursor)
+    )
+    return {"itens": itens, "proximo_cursor": proximo_cursor}
@@ -0,0 +1,320 @@
+# schemas.py
+#
+# Modelos de resposta das rotas. Com response_model o FastAPI serializa
+# direto para bytes JSON pelo pydantic-core (Rust), sem passar pelo
+# jsonable_encoder; datas e enums saem no formato de sempre (ISO 8601 e
+# o valor do enum).
+#
+# from_attributes: as rotas devolvem objetos do ORM ou linhas do SELECT e
+# o modelo lê os atributos; campos da OS relacionada vêm por AliasPath.
+#
+from datetime import date, datetime
+from typing import List, Literal, Optional
+
+from pydantic import AliasPath, BaseModel, ConfigDict, Field, computed_field, field_validator
+
+from app.db.models import Etapa, StatusOS
+from app.storage import url_miniatura
+
+
+class Modelo(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+
+# =================================================
+# LOGIN
+# =================================================
+
+class TokenResposta(Modelo):
+    token: str
+
+
+# =================================================
+# OS
+# =================================================
+
+class OSAberta(Modelo):
+    id: int
+    cliente: str
+    endereco: str
+    status: StatusOS
+    tecnico_id: Optional[int] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    # Só na busca por proximidade
+    distancia_km: Optional[float] = None
+
+    @field_validator("distancia_km")
+    @classmethod
+    def _arredondar(cls, valor):
+        return round(valor, 3) if valor is not None else None
+
+
+class OSResumo(Modelo):
+    id: int
+    cliente: str
+    endereco: str
+    status: StatusOS
+
+
+# =================================================
+# ATENDIMENTO
+# =================================================
+
+class AtendimentoIniciado(Modelo):
+    id: int
+    mensagem: str
+
+
+class AtendimentoAtivo(Modelo):
+    id: int
+    etapa: Etapa
+    os: OSResumo
+
+
+class EtapaAvancada(Modelo):
+    etapa: Etapa
+    mensagem: str
+
+
+class EtapaItem(Modelo):
+    id: int
+    etapa: Optional[Etapa] = None
+    descricao: Optional[str] = None
+    foto: Optional[str] = None
+    criado_em: Optional[datetime] = None
+
+    @computed_field
+    @property
+    def miniatura(self) -> Optional[str]:
+        return url_miniatura(self.foto)
+
+
+class AtendimentoHistorico(Modelo):
+    id: int
+    os_id: Optional[int] = None
+    cliente: str = Field("Cliente não encontrado", validation_alias=AliasPath("os", "cliente"))
+    endereco: str = Field("Endereço não encontrado", validation_alias=AliasPath("os", "endereco"))
+    etapa_atual: Optional[Etapa] = Field(None, validation_alias="etapa")
+    hora_inicio: Optional[datetime] = None
+    hora_fim: Optional[datetime] = None
+    etapas: List[EtapaItem] = []
+
+    @computed_field
+    @property
+    def status(self) -> str:
+        return "concluido" if self.hora_fim else "em_andamento"
+
+
+class PaginaHistorico(Modelo):
+    itens: List[AtendimentoHistorico]
+    proximo_cursor: Optional[str] = None
+
+
+class MeuAtendimento(Modelo):
+    id: int
+    os_id: Optional[int] = None
+    cliente: Optional[str] = Field(None, validation_alias=AliasPath("os", "cliente"))
+    etapa: Optional[Etapa] = None
+    status_os: Optional[StatusOS] = Field(None, validation_alias=AliasPath("os", "status"))
+    hora_inicio: Optional[datetime] = None
+    hora_fim: Optional[datetime] = None
+
+    @computed_field
+    @property
+    def ativo(self) -> bool:
+        return self.hora_fim is None
+
+
+class PaginaMeusAtendimentos(Modelo):
+    itens: List[MeuAtendimento]
+    proximo_cursor: Optional[str] = None
+
+
+class ResultadoBusca(Modelo):
+    id: int = Field(validation_alias="atendimento_id")
+    os_id: int
+    cliente: str
+    endereco: str
+    status_os: Optional[StatusOS] = None
+    etapa: Optional[Etapa] = None
+    tecnico_id: Optional[int] = None
+    hora_inicio: Optional[datetime] = None
+    hora_fim: Optional[datetime] = None
+    relevancia: float
+    # Trecho da etapa que casou, com os termos entre « »
+    trecho: Optional[str] = None
+
+    @field_validator("relevancia")
+    @classmethod
+    def _arredondar(cls, valor: float) -> float:
+        return round(valor, 4)
+
+
+class PaginaBusca(Modelo):
+    itens: List[ResultadoBusca]
+    proximo_cursor: Optional[str] = None
+
+
+# =================================================
+# FOTOS
+# =================================================
+
+class FotoEnviada(Modelo):
+    hash: str
+    url: str
+    miniatura: str
+    tamanho: int
+
+
+# =================================================
+# SYNC OFFLINE
+# =================================================
+
+class ResultadoSync(Modelo):
+    chave: str
+    status: Literal["aplicado", "duplicado", "erro"]
+    etapa_historico_id: Optional[int] = None
+    codigo: Optional[int] = None
+    erro: Optional[str] = None
+
+
+class SyncResposta(Modelo):
+    aplicados: int
+    resultados: List[ResultadoSync]
+
+
+# =================================================
+# EXPORTAÇÃO (ADMIN)
+# =================================================
+
+class LinhaExportacao(Modelo):
+    """Uma etapa do histórico com os dados do atendimento (uma linha por etapa)."""
+    atendimento_id: int
+    os_id: Optional[int] = None
+    cliente: Optional[str] = None
+    endereco: Optional[str] = None
+    tecnico_id: Optional[int] = None
+    tecnico_nome: Optional[str] = None
+    hora_inicio: Optional[datetime] = None
+    hora_fim: Optional[datetime] = None
+    etapa_atual: Optional[Etapa] = None
+    etapa_id: Optional[int] = None
+    etapa: Optional[Etapa] = None
+    descricao: Optional[str] = None
+    foto: Optional[str] = None
+    etapa_em: Optional[datetime] = None
+
+
+# =================================================
+# MÉTRICAS (ADMIN)
+# =================================================
+
+class MetricaEtapa(Modelo):
+    etapa: Etapa
+    quantidade: int
+    duracao_media_s: Optional[float] = None
+    duracao_max_s: Optional[float] = None
+
+
+class MetricaTecnico(Modelo):
+    tecnico_id: int
+    nome: Optional[str] = None
+    iniciados: int
+    concluidos: int
+    dentro_sla: int
+    duracao_media_s: Optional[float] = None
+    duracao_max_s: Optional[float] = None
+
+
+class MetricaTotal(Modelo):
+    iniciados: int
+    concluidos: int
+    dentro_sla: int
+    percentual_sla: Optional[float] = None
+    duracao_media_s: Optional[float] = None
+
+
+class MetricasOperacionais(Modelo):
+    inicio: date
+    fim: date
+    sla_horas: float
+    por_etapa: List[MetricaEtapa]
+    por_tecnico: List[MetricaTecnico]
+    total: MetricaTotal
+
+
+# =================================================
+# DESPACHO
+# =================================================
+
+def _km(valor):
+    return round(valor, 3) if valor is not None else None
+
+
+class ParadaDespacho(Modelo):
+    os_id: int
+    ordem: int
+    # Do ponto anterior da rota (posição do técnico ou OS anterior)
+    distancia_km: float
+
+    _arredondar = field_validator("distancia_km")(_km)
+
+
+class RotaDespacho(Modelo):
+    tecnico_id: int
+    distancia_km: float
+    paradas: List[ParadaDespacho]
+
+    _arredondar = field_validator("distancia_km")(_km)
+
+
+class PlanoDespacho(Modelo):
+    planejado_em: Optional[datetime] = None
+    aplicado: bool
+    tecnicos: int
+    os_planejadas: int
+    # OS em aberto com posição que ficaram fora do plano
+    sem_tecnico: List[int]
+    distancia_total_km: float
+    tempo_ms: Optional[float] = None
+    rotas: List[RotaDespacho]
+
+    _arredondar = field_validator("distancia_total_km")(_km)
+
+
+class OSRota(Modelo):
+    ordem: int
+    distancia_km: float
+    id: int
+    cliente: str
+    endereco: str
+    status: StatusOS
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+
+    _arredondar = field_validator("distancia_km")(_km)
+
+
+# =================================================
+# IMPORTAÇÃO DE OS (ADMIN)
+# =================================================
+
+class ErroImportacao(Modelo):
+    linha: int
+    referencia_externa: Optional[str] = None
+    erro: str
+
+
+class ResultadoImportacao(Modelo):
+    simulada: bool
+    lidas: int
+    validas: int
+    inseridas: int
+    atualizadas: int
+    inalteradas: int
+    com_erro: int
+    # Até IMPORTACAO_MAX_ERROS, em ordem de linha; o resto só é contado
+    erros: List[ErroImportacao]
+    erros_omitidos: int
+    tempo_ms: float
@@ -0,0 +1,283 @@
+# storage.py
+#
+# Armazenamento de fotos endereçado por conteúdo.
+#
+# A chave de cada foto é o sha256 dos bytes; o banco guarda só a URL
+# (EtapaHistorico.foto). Fotos repetidas ocupam espaço uma única vez.
+#
+# Backends:
+#   FOTO_STORAGE=local  -> arquivos em FOTO_DIR (padrão ./fotos)
+#   FOTO_STORAGE=s3     -> bucket S3/MinIO (FOTO_S3_BUCKET, FOTO_S3_ENDPOINT)
+#
+import base64
+import hashlib
+import os
+import re
+import tempfile
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import Iterable, Iterator, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+FOTO_STORAGE = os.getenv("FOTO_STORAGE", "local")
+FOTO_DIR = os.getenv("FOTO_DIR", "./fotos")
+FOTO_TAMANHO_MAX = int(os.getenv("FOTO_TAMANHO_MAX", str(15 * 1024 * 1024)))
+
+URL_FOTOS = "/api/fotos"
+
+CHUNK = 64 * 1024
+
+HASH_VALIDO = re.compile(r"^[0-9a-f]{64}$")
+
+
+class FotoInvalida(Exception):
+    pass
+
+
+class FotoMuitoGrande(Exception):
+    pass
+
+
+# =================================================
+# TIPO DE IMAGEM
+# =================================================
+
+def tipo_imagem(cabecalho: bytes) -> Optional[str]:
+    """Identifica o formato pelos primeiros bytes (não confia no cliente)."""
+    if cabecalho.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if cabecalho.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if cabecalho[:4] == b"RIFF" and cabecalho[8:12] == b"WEBP":
+        return "image/webp"
+    if cabecalho[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if cabecalho[4:8] == b"ftyp" and cabecalho[8:12] in (b"heic", b"heix", b"mif1"):
+        return "image/heic"
+    return None
+
+
+def caminho_original(hash: str) -> str:
+    return f"originais/{hash[:2]}/{hash[2:4]}/{hash}"
+
+
+def caminho_miniatura(hash: str) -> str:
+    return f"miniaturas/{hash[:2]}/{hash[2:4]}/{hash}.jpg"
+
+
+# =================================================
+# BACKENDS
+# =================================================
+
+class FotoStore(ABC):
+    """
+    Interface comum dos backends (backend sem algum dos métodos abstratos
+    falha ao ser criado, não na primeira foto).
+
+    `gravar_stream` consome os chunks uma única vez, calculando o hash
+    enquanto escreve num arquivo temporário; nada é mantido inteiro em
+    memória.
+    """
+
+    def gravar_stream(self, chunks: Iterable[bytes]) -> Tuple[str, int]:
+        temporario = tempfile.NamedTemporaryFile(delete=False, dir=self.dir_temporario())
+        sha = hashlib.sha256()
+        tamanho = 0
+        cabecalho = b""
+
+        try:
+            with temporario:
+                for chunk in chunks:
+                    tamanho += len(chunk)
+                    if tamanho > FOTO_TAMANHO_MAX:
+                        raise FotoMuitoGrande()
+                    if len(cabecalho) < 16:
+                        cabecalho += chunk[:16]
+                    sha.update(chunk)
+                    temporario.write(chunk)
+
+            if tipo_imagem(cabecalho) is None:
+                raise FotoInvalida()
+
+            hash = sha.hexdigest()
+            chave = caminho_original(hash)
+            if not self.existe(chave):
+                self.gravar_arquivo(chave, temporario.name)
+            return hash, tamanho
+        finally:
+            if os.path.exists(temporario.name):
+                os.unlink(temporario.name)
+
+    def gravar_bytes(self, chave: str, dados: bytes):
+        with tempfile.NamedTemporaryFile(delete=False, dir=self.dir_temporario()) as temporario:
+            temporario.write(dados)
+        try:
+            self.gravar_arquivo(chave, temporario.name)
+        finally:
+            if os.path.exists(temporario.name):
+                os.unlink(temporario.name)
+
+    def dir_temporario(self) -> Optional[str]:
+        return None
+
+    def url(self, hash: str) -> str:
+        return f"{URL_FOTOS}/{hash}"
+
+    def url_miniatura(self, hash: str) -> str:
+        return f"{URL_FOTOS}/{hash}/miniatura"
+
+    @abstractmethod
+    def gravar_arquivo(self, chave: str, caminho: str):
+        ...
+
+    @abstractmethod
+    def existe(self, chave: str) -> bool:
+        ...
+
+    @abstractmethod
+    def tamanho(self, chave: str) -> int:
+        ...
+
+    @abstractmethod
+    def ler(self, chave: str, inicio: int = 0, fim: Optional[int] = None) -> Iterator[bytes]:
+        """Lê os bytes [inicio, fim] (inclusivo) em chunks."""
+
+
+class LocalFotoStore(FotoStore):
+    def __init__(self, raiz: str):
+        self.raiz = os.path.abspath(raiz)
+        os.makedirs(os.path.join(self.raiz, "tmp"), exist_ok=True)
+
+    def _caminho(self, chave: str) -> str:
+        return os.path.join(self.raiz, chave)
+
+    def dir_temporario(self) -> str:
+        # Mesmo sistema de arquivos do destino: o os.replace é atômico
+        return os.path.join(self.raiz, "tmp")
+
+    def gravar_arquivo(self, chave: str, caminho: str):
+        destino = self._caminho(chave)
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        os.replace(caminho, destino)
+
+    def existe(self, chave: str) -> bool:
+        return os.path.exists(self._caminho(chave))
+
+    def tamanho(self, chave: str) -> int:
+        return os.path.getsize(self._caminho(chave))
+
+    def ler(self, chave: str, inicio: int = 0, fim: Optional[int] = None) -> Iterator[bytes]:
+        with open(self._caminho(chave), "rb") as f:
+            f.seek(inicio)
+            restante = None if fim is None else fim - inicio + 1
+            while restante is None or restante > 0:
+                chunk = f.read(CHUNK if restante is None else min(CHUNK, restante))
+                if not chunk:
+                    break
+                if restante is not None:
+                    restante -= len(chunk)
+                yield chunk
+
+
+class S3FotoStore(FotoStore):
+    def __init__(self, bucket: str, prefixo: str = "", endpoint: Optional[str] = None):
+        import boto3
+
+        self.bucket = bucket
+        self.prefixo = prefixo
+        self.s3 = boto3.client("s3", endpoint_url=endpoint)
+
+    def _chave(self, chave: str) -> str:
+        return f"{self.prefixo}{chave}"
+
+    def gravar_arquivo(self, chave: str, caminho: str):
+        self.s3.upload_file(caminho, self.bucket, self._chave(chave))
+
+    def existe(self, chave: str) -> bool:
+        from botocore.exceptions import ClientError
+
+        try:
+            self.s3.head_object(Bucket=self.bucket, Key=self._chave(chave))
+            return True
+        except ClientError:
+            return False
+
+    def tamanho(self, chave: str) -> int:
+        resposta = self.s3.head_object(Bucket=self.bucket, Key=self._chave(chave))
+        return resposta["ContentLength"]
+
+    def ler(self, chave: str, inicio: int = 0, fim: Optional[int] = None) -> Iterator[bytes]:
+        faixa = f"bytes={inicio}-{'' if fim is None else fim}"
+        resposta = self.s3.get_object(Bucket=self.bucket, Key=self._chave(chave), Range=faixa)
+        yield from resposta["Body"].iter_chunks(CHUNK)
+
+
+@lru_cache
+def get_store() -> FotoStore:
+    if FOTO_STORAGE == "s3":
+        return S3FotoStore(
+            bucket=os.environ["FOTO_S3_BUCKET"],
+            prefixo=os.getenv("FOTO_S3_PREFIXO", ""),
+            endpoint=os.getenv("FOTO_S3_ENDPOINT"),
+        )
+    return LocalFotoStore(FOTO_DIR)
+
+
+# =================================================
+# COMPATIBILIDADE COM FOTOS EM BASE64
+# =================================================
+
+def eh_data_url(valor: Optional[str]) -> bool:
+    return bool(valor) and valor.startswith("data:")
+
+
+def _chunks_data_url(valor: str) -> Iterator[bytes]:
+    try:
+        _, dados = valor.split(",", 1)
+    except ValueError:
+        raise FotoInvalida()
+
+    # Decodifica em blocos múltiplos de 4 caracteres
+    passo = CHUNK // 3 * 4
+    for i in range(0, len(dados), passo):
+        try:
+            yield base64.b64decode(dados[i:i + passo])
+        except ValueError:
+            raise FotoInvalida()
+
+
+def salvar_data_url(valor: str) -> Tuple[str, int]:
+    """Grava uma foto enviada como data URL (mesmo retorno de gravar_stream)."""
+    return get_store().gravar_stream(_chunks_data_url(valor))
+
+
+def copiar_para_store(origem) -> Tuple[str, int]:
+    """Grava um arquivo aberto (ex.: UploadFile.file) lendo em chunks."""
+    def chunks():
+        while True:
+            chunk = origem.read(CHUNK)
+            if not chunk:
+                break
+            yield chunk
+
+    return get_store().gravar_stream(chunks())
+
+
+def hash_da_url(foto: Optional[str]) -> Optional[str]:
+    """Extrai o hash de uma URL do storage; None para data URL/vazio."""
+    if not foto or not foto.startswith(URL_FOTOS + "/"):
+        return None
+    hash = foto[len(URL_FOTOS) + 1:]
+    return hash if HASH_VALIDO.match(hash) else None
+
+
+def url_miniatura(foto: Optional[str]) -> Optional[str]:
+    """
+    URL da prévia de uma foto, ou None se ela não tiver prévia (fotos
+    antigas em base64): o cliente usa `foto`, sem repetir o base64.
+    """
+    hash = hash_da_url(foto)
+    return get_store().url_miniatura(hash) if hash else None
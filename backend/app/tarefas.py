@@ -0,0 +1,58 @@
+# tarefas.py
+#
+# Tarefa periódica de fundo, uma por worker (partições, despacho, medição
+# das réplicas). Erro numa rodada é logado e a próxima segue no horário;
+# encerrar() cancela e espera a task terminar.
+#
+import asyncio
+import logging
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TarefaPeriodica:
+    def __init__(
+        self,
+        rodada: Callable[[], Awaitable],
+        intervalo: float,
+        mensagem_erro: str,
+        imediata: bool = True
+    ):
+        """
+        `rodada()` a cada `intervalo` segundos (0 ou menos: desligada).
+        `imediata`: a primeira rodada sai no iniciar(), senão depois do
+        primeiro intervalo.
+        """
+        self.rodada = rodada
+        self.intervalo = intervalo
+        self.mensagem_erro = mensagem_erro
+        self.imediata = imediata
+        self._tarefa: Optional[asyncio.Task] = None
+
+    async def iniciar(self):
+        if self.intervalo > 0 and self._tarefa is None:
+            self._tarefa = asyncio.create_task(self._rodar())
+
+    async def encerrar(self):
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+            try:
+                await self._tarefa
+            except asyncio.CancelledError:
+                pass
+            self._tarefa = None
+
+    async def _rodar(self):
+        if not self.imediata:
+            await asyncio.sleep(self.intervalo)
+
+        while True:
+            try:
+                await self.rodada()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ {self.mensagem_erro}: {e}")
+
+            await asyncio.sleep(self.intervalo)
@@ -0,0 +1,96 @@
+# scripts/bench_despacho.py
+#
+# Tempo do planejamento do despacho (app/despacho.py), sem banco: OS e
+# técnicos em posições aleatórias numa área do tamanho da Grande São Paulo.
+#
+#   matriz     distâncias OS x técnico (haversine no NumPy)
+#   atribuir   gulosa com capacidade, por arrependimento
+#   rotas      vizinho mais próximo + 2-opt de cada técnico
+#
+# Compara também com "primeiro que chegar" (cada OS para um técnico
+# qualquer, que é o que o fluxo atual produz na prática) e com as rotas
+# sem o 2-opt.
+#
+#   cd backend && python -m scripts.bench_despacho [--os 5000] [--tecnicos 300]
+#
+import argparse
+import time
+
+import numpy as np
+
+from app import despacho
+
+# Retângulo aproximado da Grande São Paulo
+LAT = (-23.85, -23.35)
+LON = (-46.95, -46.35)
+
+
+def pontos(n: int, gerador):
+    return gerador.uniform(*LAT, n), gerador.uniform(*LON, n)
+
+
+def km_aleatorio(os_lat, os_lon, tec_lat, tec_lon, gerador) -> float:
+    """Cada OS com um técnico sorteado, na ordem em que aparecem."""
+    escolhido = gerador.integers(0, len(tec_lat), len(os_lat))
+    total = 0.0
+    for t in range(len(tec_lat)):
+        indices = np.flatnonzero(escolhido == t)
+        lat = np.concatenate(([tec_lat[t]], os_lat[indices]))
+        lon = np.concatenate(([tec_lon[t]], os_lon[indices]))
+        distancias = despacho.matriz_distancias(lat, lon, lat, lon)
+        total += despacho.comprimento(distancias, np.arange(len(lat)))
+    return total
+
+
+def main(n_os: int, n_tecnicos: int, semente: int):
+    gerador = np.random.default_rng(semente)
+    os_lat, os_lon = pontos(n_os, gerador)
+    tec_lat, tec_lon = pontos(n_tecnicos, gerador)
+    os_ids = np.arange(1, n_os + 1)
+    tec_ids = np.arange(1, n_tecnicos + 1)
+
+    print(f"📦 {n_os} OS, {n_tecnicos} técnicos")
+
+    inicio = time.perf_counter()
+    distancias = despacho.matriz_distancias(os_lat, os_lon, tec_lat, tec_lon)
+    t_matriz = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    escolhido = despacho.atribuir(distancias, despacho.capacidade_por_tecnico(n_os, n_tecnicos))
+    t_atribuir = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    sem_2opt = despacho.planejar(os_ids, os_lat, os_lon, tec_ids, tec_lat, tec_lon, otimizar=False)
+    t_sem_2opt = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    plano = despacho.planejar(os_ids, os_lat, os_lon, tec_ids, tec_lat, tec_lon)
+    t_total = time.perf_counter() - inicio
+
+    aleatorio = km_aleatorio(os_lat, os_lon, tec_lat, tec_lon, gerador)
+    por_tecnico = [len(p) for p in plano["rotas"].values()]
+
+    print(f"matriz      {t_matriz * 1000:>8.0f} ms")
+    print(f"atribuir    {t_atribuir * 1000:>8.0f} ms  ({(escolhido >= 0).sum()} atribuídas)")
+    print(f"sem 2-opt   {t_sem_2opt * 1000:>8.0f} ms  (planejar completo)")
+    print(f"com 2-opt   {t_total * 1000:>8.0f} ms  (planejar completo)")
+    print()
+    print(f"{'plano':<22} {'km total':>10}")
+    print(f"{'primeiro que chegar':<22} {aleatorio:>10.0f}")
+    print(f"{'vizinho mais próximo':<22} {sem_2opt['distancia_total_km']:>10.0f}")
+    print(f"{'+ 2-opt':<22} {plano['distancia_total_km']:>10.0f}")
+    print()
+    print(
+        f"OS por técnico: min {min(por_tecnico)}, máx {max(por_tecnico)}, "
+        f"sem técnico: {len(plano['sem_tecnico'])}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark do despacho automático")
+    parser.add_argument("--os", type=int, default=5000)
+    parser.add_argument("--tecnicos", type=int, default=300)
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+
+    main(args.os, args.tecnicos, args.semente)
@@ -0,0 +1,128 @@
+# scripts/bench_historico.py
+#
+# Mede quantas consultas e quanto tempo o GET /atendimentos/historico custa
+# conforme o histórico do técnico cresce (primeira página e última página,
+# seguindo o cursor).
+#
+# Roda contra o banco configurado no .env, dentro de uma transação que é
+# desfeita no final (nenhum dado fica gravado).
+#
+#   cd backend && python -m scripts.bench_historico
+#
+from datetime import datetime, timedelta
+import asyncio
+import time
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import async_engine
+from app.db.models import Tecnico, OS, Atendimento, EtapaHistorico, StatusOS, Etapa
+from app.routes import listar_historico_completo, LIMITE_MAXIMO
+
+TAMANHOS = [10, 100, 500, 2000]
+
+
+class ContadorConsultas:
+    def __init__(self):
+        self.total = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.total += 1
+
+
+async def popular(db: AsyncSession, tecnico: Tecnico, quantidade: int):
+    agora = datetime.utcnow()
+
+    for i in range(quantidade):
+        os = OS(
+            cliente=f"Cliente {i}",
+            endereco=f"Rua {i}, {i * 10}",
+            status=StatusOS.CONCLUIDA,
+            tecnico_id=tecnico.id
+        )
+        inicio = agora - timedelta(days=i)
+        atendimento = Atendimento(
+            os=os,
+            tecnico_id=tecnico.id,
+            hora_inicio=inicio,
+            hora_fim=inicio + timedelta(hours=2),
+            etapa=Etapa.FINALIZACAO
+        )
+        for n, etapa in enumerate(Etapa):
+            atendimento.etapas.append(EtapaHistorico(
+                etapa=etapa,
+                descricao=f"Etapa {etapa.value}",
+                foto="",
+                criado_em=inicio + timedelta(minutes=20 * n)
+            ))
+        db.add(atendimento)
+
+    await db.flush()
+
+
+async def medir(quantidade: int):
+    engine = async_engine.sync_engine
+
+    async with async_engine.connect() as conn:
+        trans = await conn.begin()
+        db = AsyncSession(bind=conn, join_transaction_mode="create_savepoint")
+
+        try:
+            tecnico = Tecnico(
+                nome="bench",
+                email=f"bench-{time.time_ns()}@teste.com",
+                senha="x"
+            )
+            db.add(tecnico)
+            await db.flush()
+
+            await popular(db, tecnico, quantidade)
+            db.expunge_all()
+
+            medicoes = []
+            cursor = None
+            total = 0
+
+            while True:
+                contador = ContadorConsultas()
+                event.listen(engine, "before_cursor_execute", contador)
+                try:
+                    inicio = time.perf_counter()
+                    pagina = await listar_historico_completo(
+                        cursor=cursor,
+                        limite=LIMITE_MAXIMO,
+                        inicio=None,
+                        fim=None,
+                        status=None,
+                        user=tecnico,
+                        db=db
+                    )
+                    duracao = time.perf_counter() - inicio
+                finally:
+                    event.remove(engine, "before_cursor_execute", contador)
+
+                medicoes.append((contador.total, duracao))
+                total += len(pagina["itens"])
+                cursor = pagina["proximo_cursor"]
+                if not cursor:
+                    break
+
+            assert total == quantidade
+            return medicoes[0], medicoes[-1]
+        finally:
+            await db.close()
+            await trans.rollback()
+
+
+async def main():
+    print(f"{'atendimentos':>12} {'pagina':>8} {'consultas':>10} {'tempo (ms)':>12}")
+
+    for quantidade in TAMANHOS:
+        primeira, ultima = await medir(quantidade)
+        for nome, (consultas, duracao) in [("primeira", primeira), ("ultima", ultima)]:
+            print(f"{quantidade:>12} {nome:>8} {consultas:>10} {duracao * 1000:>12.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,95 @@
+# scripts/bench_login.py
+#
+# Benchmark da verificação de senha do login (bcrypt).
+#
+# Mede logins/s com 1..N processos de verificação (ControleLogin) e o
+# rendimento por núcleo, para dimensionar LOGIN_WORKERS e BCRYPT_ROUNDS.
+# Com --url, dispara logins reais contra uma API rodando, usando os
+# técnicos criados pelo scripts.carga (senha "carga").
+#
+#   cd backend && python -m scripts.bench_login --logins 200
+#   python -m scripts.bench_login --url http://127.0.0.1:8000/api --concorrencia 100
+#
+import argparse
+import asyncio
+import os
+import time
+
+import httpx
+
+from app.auth import ControleLogin, hash_password, BCRYPT_ROUNDS
+
+
+async def medir_pool(workers: int, logins: int, hashed: str):
+    controle = ControleLogin(workers=workers, fila_max=logins)
+    await controle.iniciar()
+
+    inicio = time.perf_counter()
+    resultados = await asyncio.gather(*[
+        controle.verificar("senha-bench", hashed) for _ in range(logins)
+    ])
+    duracao = time.perf_counter() - inicio
+    controle.encerrar()
+
+    assert all(ok for ok, _ in resultados)
+    por_segundo = logins / duracao
+    print(
+        f"{workers:>8} {logins:>7} {duracao:>8.2f} {por_segundo:>10.1f} "
+        f"{por_segundo / min(workers, os.cpu_count() or 1):>12.1f}"
+    )
+
+
+async def medir_http(url: str, logins: int, concorrencia: int, tecnicos: int):
+    limite = asyncio.Semaphore(concorrencia)
+    status = {}
+    latencias = []
+
+    async with httpx.AsyncClient(base_url=url, timeout=120) as cliente:
+        async def um_login(i: int):
+            async with limite:
+                t0 = time.perf_counter()
+                resposta = await cliente.post(
+                    "/login", params={"email": f"carga-{i % tecnicos}@teste.com", "senha": "carga"}
+                )
+                latencias.append(time.perf_counter() - t0)
+                status[resposta.status_code] = status.get(resposta.status_code, 0) + 1
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*[um_login(i) for i in range(logins)])
+        duracao = time.perf_counter() - inicio
+
+        latencias.sort()
+        p = lambda q: latencias[min(int(len(latencias) * q), len(latencias) - 1)] * 1000
+        print(f"🔐 {logins} logins em {duracao:.2f}s → {logins / duracao:.1f} logins/s")
+        print(f"   p50 {p(0.50):.0f} ms | p95 {p(0.95):.0f} ms | p99 {p(0.99):.0f} ms | status {status}")
+
+        resposta = await cliente.get(url.rsplit("/api", 1)[0] + "/health/pool")
+        if resposta.status_code == 200:
+            print(f"📊 Login: {resposta.json().get('login')}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de login (bcrypt)")
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--workers", type=int, nargs="*", help="padrão: 1..núcleos")
+    parser.add_argument("--url", help="mede a rota /login de uma API rodando")
+    parser.add_argument("--concorrencia", type=int, default=100)
+    parser.add_argument("--tecnicos", type=int, default=500, help="técnicos carga-N existentes")
+    args = parser.parse_args()
+
+    if args.url:
+        asyncio.run(medir_http(args.url, args.logins, args.concorrencia, args.tecnicos))
+        return
+
+    nucleos = os.cpu_count() or 1
+    workers = args.workers or sorted({1, max(nucleos // 2, 1), nucleos})
+    hashed = hash_password("senha-bench")
+
+    print(f"🔐 bcrypt custo {BCRYPT_ROUNDS}, {nucleos} núcleo(s)")
+    print(f"{'workers':>8} {'logins':>7} {'tempo_s':>8} {'logins/s':>10} {'por_nucleo':>12}")
+    for n in workers:
+        asyncio.run(medir_pool(n, args.logins, hashed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+# scripts/bench_os_abertas.py
+#
+# Compara o GET /os/abertas antigo (carrega todas as OS não concluídas no
+# ORM e filtra em Python) com o atual (filtro em SQL, índice parcial e
+# tuplas de colunas), com 100 mil OS abertas + concluídas.
+#
+# Roda dentro de uma transação desfeita no final (nada fica gravado).
+#
+#   cd backend && python -m scripts.bench_os_abertas [--abertas 100000]
+#
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.auth import UsuarioAutenticado
+from app.database import async_engine
+from app.db.models import OS, StatusOS
+from app.routes import listar_os, os_visiveis_para
+
+TECNICOS = 500
+REPETICOES = 3
+
+
+async def popular(conn, abertas: int, concluidas: int):
+    # O BEGIN do driver é preguiçoso: força a transação antes de usar a
+    # conexão asyncpg direto, senão o COPY seria commitado na hora
+    await conn.execute(text("SELECT 1"))
+    raw = (await conn.get_raw_connection()).driver_connection
+
+    ids = await raw.fetch(
+        "INSERT INTO tecnico (nome, email, senha, ativo) "
+        "SELECT 'bench ' || n, 'bench-os-' || n || '-' || $1 || '@teste.com', 'x', true "
+        "FROM generate_series(1, $2) n RETURNING id",
+        str(time.time_ns()), TECNICOS
+    )
+    tecnicos = [r["id"] for r in ids]
+    agora = datetime.utcnow()
+
+    def linha(i, status):
+        tecnico = None if status in ("EM_ABERTO",) else random.choice(tecnicos)
+        return (f"Cliente {i}", f"Rua {i}", status, tecnico, agora)
+
+    pesos = {"EM_ABERTO": 6, "AGUARDANDO": 2, "EM_ATENDIMENTO": 1, "EM_CAMPO": 1}
+    status_abertos = random.choices(list(pesos), list(pesos.values()), k=abertas)
+
+    registros = [linha(i, s) for i, s in enumerate(status_abertos)]
+    registros += [linha(abertas + i, "CONCLUIDA") for i in range(concluidas)]
+
+    await raw.copy_records_to_table(
+        "os",
+        records=registros,
+        columns=["cliente", "endereco", "status", "tecnico_id", "criado_em"]
+    )
+    await raw.execute("ANALYZE os")
+    return tecnicos
+
+
+async def listar_os_antigo(user, db):
+    result = await db.execute(select(OS).where(OS.status != StatusOS.CONCLUIDA))
+    resultado = []
+    for o in result.scalars().all():
+        if o.status == StatusOS.EM_ATENDIMENTO and o.tecnico_id != user.id:
+            continue
+        if o.status == StatusOS.EM_CAMPO and o.tecnico_id != user.id:
+            continue
+        resultado.append({
+            "id": o.id,
+            "cliente": o.cliente,
+            "endereco": o.endereco,
+            "status": o.status.value,
+            "tecnico_id": o.tecnico_id
+        })
+    return resultado
+
+
+async def cronometrar(nome, funcao, db):
+    tempos = []
+    for _ in range(REPETICOES):
+        db.expunge_all()
+        inicio = time.perf_counter()
+        linhas = await funcao()
+        tempos.append(time.perf_counter() - inicio)
+    print(f"{nome:<34} {len(linhas):>8} {min(tempos) * 1000:>12.1f}")
+    return linhas
+
+
+async def main(abertas: int, concluidas: int):
+    async with async_engine.connect() as conn:
+        trans = await conn.begin()
+        db = AsyncSession(bind=conn, join_transaction_mode="create_savepoint")
+
+        try:
+            print(f"⏳ Inserindo {abertas} OS abertas e {concluidas} concluídas...")
+            tecnicos = await popular(conn, abertas, concluidas)
+            user = UsuarioAutenticado(id=tecnicos[0], nome="bench", email="", ativo=True)
+
+            print(f"{'consulta':<34} {'linhas':>8} {'tempo (ms)':>12}")
+            antigo = await cronometrar(
+                "antigo (ORM + filtro Python)", lambda: listar_os_antigo(user, db), db
+            )
+            novo = await cronometrar(
+                "atual (SQL + tuplas)",
+                lambda: listar_os(limite=None, apos_id=None, user=user, db=db), db
+            )
+            await cronometrar(
+                "atual, página de 100",
+                lambda: listar_os(limite=100, apos_id=None, user=user, db=db), db
+            )
+            meio = novo[len(novo) // 2].id
+            await cronometrar(
+                "atual, página de 100 no meio",
+                lambda: listar_os(limite=100, apos_id=meio, user=user, db=db), db
+            )
+
+            assert sorted(o["id"] for o in antigo) == [o.id for o in novo]
+
+            plano = await conn.execute(text(
+                "EXPLAIN " + str(
+                    select(OS.id, OS.cliente, OS.endereco, OS.status, OS.tecnico_id)
+                    .where(os_visiveis_para(user.id))
+                    .order_by(OS.id)
+                    .limit(100)
+                    .compile(conn.sync_connection, compile_kwargs={"literal_binds": True})
+                )
+            ))
+            print("\n📋 Plano da página:")
+            for (linha,) in plano:
+                print(f"   {linha}")
+        finally:
+            await db.close()
+            await trans.rollback()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de /os/abertas")
+    parser.add_argument("--abertas", type=int, default=100_000)
+    parser.add_argument("--concluidas", type=int, default=100_000)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.abertas, args.concluidas))
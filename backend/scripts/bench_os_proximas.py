@@ -0,0 +1,136 @@
+# scripts/bench_os_proximas.py
+#
+# Mede a busca das K OS abertas mais próximas (/os/abertas?latitude=&longitude=)
+# com 100 mil OS abertas espalhadas em volta de algumas capitais, e confere
+# o resultado contra a força bruta (todas as OS ordenadas por distância).
+#
+# Roda dentro de uma transação desfeita no final (nada fica gravado).
+#
+#   cd backend && python -m scripts.bench_os_proximas [--abertas 100000] [--k 20]
+#
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime
+
+from sqlalchemy import event, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import geo
+from app.database import async_engine
+from app.db.models import OS
+from app.routes import buscar_os_proximas, os_visiveis_para
+
+# (latitude, longitude, espalhamento em graus)
+CIDADES = [
+    (-23.55, -46.63, 0.35),   # São Paulo
+    (-22.91, -43.20, 0.30),   # Rio de Janeiro
+    (-19.92, -43.94, 0.20),   # Belo Horizonte
+    (-30.03, -51.23, 0.20),   # Porto Alegre
+    (-12.97, -38.50, 0.20),   # Salvador
+    (-3.73, -38.52, 0.15),    # Fortaleza
+    (-15.79, -47.88, 0.20),   # Brasília
+]
+CONSULTAS = 200
+CONFERIDAS = 30
+
+
+def ponto_aleatorio():
+    # 90% perto das cidades, 10% em qualquer lugar do país
+    if random.random() < 0.9:
+        lat, lon, espalhamento = random.choice(CIDADES)
+        return random.gauss(lat, espalhamento), random.gauss(lon, espalhamento)
+    return random.uniform(-33, 4), random.uniform(-73, -35)
+
+
+async def popular(conn, abertas: int):
+    # O BEGIN do driver é preguiçoso: força a transação antes do COPY
+    await conn.execute(text("SELECT 1"))
+    raw = (await conn.get_raw_connection()).driver_connection
+    agora = datetime.utcnow()
+
+    registros = []
+    for i in range(abertas):
+        lat, lon = ponto_aleatorio()
+        registros.append((
+            f"Cliente geo {i}", f"Rua {i}", "EM_ABERTO", agora,
+            lat, lon, geo.codificar(lat, lon)
+        ))
+
+    await raw.copy_records_to_table(
+        "os",
+        records=registros,
+        columns=["cliente", "endereco", "status", "criado_em", "latitude", "longitude", "geohash"]
+    )
+    await raw.execute("ANALYZE os")
+
+
+async def forca_bruta(db, latitude, longitude, k):
+    distancia = geo.distancia_km_sql(latitude, longitude)
+    result = await db.execute(
+        select(OS.id, distancia)
+        .where(os_visiveis_para(0), OS.latitude.isnot(None))
+        .order_by(distancia)
+        .limit(k)
+    )
+    return result.all()
+
+
+async def main(abertas: int, k: int):
+    consultas = 0
+
+    def contar(*args):
+        nonlocal consultas
+        consultas += 1
+
+    async with async_engine.connect() as conn:
+        trans = await conn.begin()
+        db = AsyncSession(bind=conn, join_transaction_mode="create_savepoint")
+
+        try:
+            print(f"⏳ Inserindo {abertas} OS abertas com coordenadas...")
+            await popular(conn, abertas)
+            await conn.run_sync(geo.detectar_postgis)
+            print(f"🗺️  Modo: {'PostGIS (KNN)' if geo.POSTGIS else 'geohash'}")
+
+            pontos = [ponto_aleatorio() for _ in range(CONSULTAS)]
+            tempos = []
+            event.listen(async_engine.sync_engine, "before_cursor_execute", contar)
+            try:
+                for lat, lon in pontos:
+                    inicio = time.perf_counter()
+                    await buscar_os_proximas(db, 0, lat, lon, k)
+                    tempos.append(time.perf_counter() - inicio)
+            finally:
+                event.remove(async_engine.sync_engine, "before_cursor_execute", contar)
+
+            tempos.sort()
+            p = lambda q: tempos[min(int(len(tempos) * q), len(tempos) - 1)] * 1000
+            print(f"🔎 {CONSULTAS} buscas, K={k}: p50 {p(0.50):.1f} ms | p95 {p(0.95):.1f} ms | "
+                  f"máx {tempos[-1] * 1000:.1f} ms | {consultas / CONSULTAS:.2f} consultas/busca")
+
+            # Mesmo resultado que ordenar todas as OS por distância?
+            erradas = 0
+            for lat, lon in pontos[:CONFERIDAS]:
+                rapida = await buscar_os_proximas(db, 0, lat, lon, k)
+                exata = await forca_bruta(db, lat, lon, k)
+                if [round(l[-1], 6) for l in rapida] != [round(l[-1], 6) for l in exata]:
+                    erradas += 1
+
+            inicio = time.perf_counter()
+            await forca_bruta(db, *pontos[0], k)
+            print(f"🐢 Força bruta: {(time.perf_counter() - inicio) * 1000:.1f} ms por busca")
+            print(f"✅ {CONFERIDAS - erradas}/{CONFERIDAS} buscas iguais à força bruta")
+        finally:
+            await db.close()
+            await trans.rollback()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark da busca por proximidade")
+    parser.add_argument("--abertas", type=int, default=100_000)
+    parser.add_argument("--k", type=int, default=20)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.abertas, args.k))
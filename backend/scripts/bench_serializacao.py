@@ -0,0 +1,142 @@
+# scripts/bench_serializacao.py
+#
+# Tempo de serialização de 1.000 itens do histórico (atendimento + OS +
+# etapas), sem banco: só a etapa de transformar o resultado em JSON.
+#
+#   antigo   dicts montados à mão (.isoformat()/.value) + jsonable_encoder
+#            + json.dumps, o caminho padrão do FastAPI sem response_model
+#   orjson   os mesmos dicts com orjson.dumps (se o pacote existir)
+#   atual    schemas.PaginaHistorico lendo os objetos do ORM e gerando os
+#            bytes no pydantic-core (o que o cache de respostas faz)
+#
+#   cd backend && python -m scripts.bench_serializacao [--itens 1000] [--etapas 6]
+#
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+
+from fastapi.encoders import jsonable_encoder
+
+from app import schemas
+from app.cache_respostas import serializar
+from app.db.models import OS, Atendimento, EtapaHistorico, Etapa, StatusOS
+from app.storage import url_miniatura
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+REPETICOES = 5
+
+
+def montar(itens: int, etapas: int):
+    agora = datetime.utcnow()
+    ordem = list(Etapa)
+    atendimentos = []
+
+    for i in range(itens):
+        os = OS(id=i, cliente=f"Cliente {i}", endereco=f"Rua {i}, {i * 7}", status=StatusOS.CONCLUIDA)
+        atendimento = Atendimento(
+            id=i, os_id=i, os=os, tecnico_id=1, etapa=Etapa.FINALIZACAO,
+            hora_inicio=agora - timedelta(hours=i), hora_fim=agora - timedelta(hours=i - 1)
+        )
+        atendimento.etapas = [
+            EtapaHistorico(
+                id=i * etapas + n, etapa=ordem[n % len(ordem)],
+                descricao=f"Etapa {n} do atendimento {i}",
+                foto=f"http://127.0.0.1:8000/api/fotos/{'ab' * 32}" if n % 2 else "",
+                criado_em=agora - timedelta(hours=i, minutes=-n * 10)
+            )
+            for n in range(etapas)
+        ]
+        atendimentos.append(atendimento)
+
+    return atendimentos
+
+
+def dicts_antigos(atendimentos):
+    # Como listar_historico_completo montava a resposta antes dos schemas
+    return {
+        "itens": [
+            {
+                "id": a.id,
+                "os_id": a.os_id,
+                "cliente": a.os.cliente if a.os else "Cliente não encontrado",
+                "endereco": a.os.endereco if a.os else "Endereço não encontrado",
+                "etapa_atual": a.etapa.value if a.etapa else None,
+                "hora_inicio": a.hora_inicio.isoformat() if a.hora_inicio else None,
+                "hora_fim": a.hora_fim.isoformat() if a.hora_fim else None,
+                "status": "concluido" if a.hora_fim else "em_andamento",
+                "etapas": [
+                    {
+                        "id": e.id,
+                        "etapa": e.etapa.value if e.etapa else None,
+                        "descricao": e.descricao,
+                        "foto": e.foto,
+                        "miniatura": url_miniatura(e.foto),
+                        "criado_em": e.criado_em.isoformat() if e.criado_em else None
+                    }
+                    for e in a.etapas
+                ]
+            }
+            for a in atendimentos
+        ],
+        "proximo_cursor": None
+    }
+
+
+def antigo(atendimentos) -> bytes:
+    return json.dumps(
+        jsonable_encoder(dicts_antigos(atendimentos)), ensure_ascii=False
+    ).encode()
+
+
+def com_orjson(atendimentos) -> bytes:
+    return orjson.dumps(dicts_antigos(atendimentos))
+
+
+def atual(atendimentos) -> bytes:
+    return serializar(schemas.PaginaHistorico, {"itens": atendimentos, "proximo_cursor": None})
+
+
+def cronometrar(funcao, atendimentos):
+    tempos = []
+    for _ in range(REPETICOES):
+        inicio = time.perf_counter()
+        corpo = funcao(atendimentos)
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos), corpo
+
+
+def main(itens: int, etapas: int):
+    atendimentos = montar(itens, etapas)
+    print(f"📦 {itens} atendimentos com {etapas} etapas cada")
+    print(f"{'caminho':<10} {'ms/1000 itens':>14} {'bytes':>10}")
+
+    referencia = None
+    for nome, funcao in [("antigo", antigo), ("orjson", com_orjson), ("atual", atual)]:
+        if funcao is com_orjson and orjson is None:
+            print(f"{nome:<10} {'(orjson não instalado)':>25}")
+            continue
+
+        tempo, corpo = cronometrar(funcao, atendimentos)
+        por_mil = tempo * 1000 * 1000 / itens
+        print(f"{nome:<10} {por_mil:>14.1f} {len(corpo):>10}")
+
+        # Mesmo conteúdo nos três (só a ordem das chaves pode mudar)
+        dados = json.loads(corpo)
+        if referencia is None:
+            referencia = dados
+        elif dados != referencia:
+            print(f"❌ {nome}: JSON diferente do antigo")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de serialização do histórico")
+    parser.add_argument("--itens", type=int, default=1000)
+    parser.add_argument("--etapas", type=int, default=6)
+    args = parser.parse_args()
+
+    main(args.itens, args.etapas)
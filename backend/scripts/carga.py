@@ -0,0 +1,424 @@
+# scripts/carga.py
+#
+# Teste de carga por cenário, com N técnicos simultâneos:
+#
+#   misto      telas de leitura (OS abertas, atendimento ativo, histórico,
+#              meus atendimentos), com o peso de uso real
+#   login      tempestade de login (todo mundo abrindo o app às 8h)
+#   abertas    lista de OS abertas, paginada e por proximidade
+#   historico  páginas do histórico seguindo o cursor + etapas de um item
+#   etapas     inicia uma OS aberta e avança até FINALIZACAO; 409 na
+#              disputa pela mesma OS é esperado e contado à parte
+#   todos      os cinco em sequência (etapas por último: escreve)
+#
+# Prepara os técnicos carga-N@teste.com no banco do .env (idempotente) e
+# dispara as requisições contra uma API já rodando. Os tokens são gerados
+# direto com o SECRET_KEY local; só o cenário login passa pelo /login.
+# Para uma base no tamanho de produção, gere antes com scripts.gerar_dados
+# (usa os mesmos técnicos).
+#
+# Reprodutível: a mesma --semente sorteia as mesmas rotas/OS por técnico.
+# O resultado (p50/p95/p99 por rota) pode ser salvo em JSON e comparado
+# com uma execução anterior: sai com código 1 se algum p95 piorou mais que
+# --tolerancia, para rodar antes/depois de uma mudança ou no CI.
+#
+#   cd backend && uvicorn app.main:app --workers 1 &
+#   python -m scripts.carga --cenario todos --tecnicos 200 --duracao 20 --saida base.json
+#   python -m scripts.carga --cenario todos --tecnicos 200 --duracao 20 --comparar base.json
+#
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import httpx
+
+from app.auth import create_token, hash_password
+from app.database import SessionLocal
+from app.db.models import Tecnico, OS, Atendimento, EtapaHistorico, StatusOS, Etapa
+
+ROTAS_LEITURA = [
+    ("/os/abertas", 3),
+    ("/atendimento/ativo", 3),
+    ("/atendimentos/historico", 2),
+    ("/tecnicos/meus-atendimentos", 2),
+]
+
+CENARIOS = ["login", "abertas", "historico", "misto", "etapas"]
+
+# Posições para /os/abertas por proximidade (mesmas capitais do gerar_dados)
+POSICOES = [
+    (-23.55, -46.63), (-22.91, -43.20), (-19.92, -43.94), (-30.03, -51.23),
+    (-12.97, -38.50), (-3.73, -38.52), (-15.79, -47.88), (-8.05, -34.90),
+]
+
+# Abaixo disso a diferença de p95 é ruído de medição
+P95_MINIMO_COMPARACAO_MS = 5.0
+
+
+def preparar(tecnicos: int, atendimentos_por_tecnico: int, os_abertas: int):
+    """Garante `tecnicos` técnicos de carga, cada um com histórico."""
+    with SessionLocal() as db:
+        existentes = {
+            email: id for id, email in db.query(Tecnico.id, Tecnico.email).filter(
+                Tecnico.email.like("carga-%@teste.com")
+            )
+        }
+
+        senha = hash_password("carga")
+        agora = datetime.utcnow()
+        ids = []
+
+        for i in range(tecnicos):
+            email = f"carga-{i}@teste.com"
+            if email in existentes:
+                ids.append(existentes[email])
+                continue
+
+            tecnico = Tecnico(nome=f"Carga {i}", email=email, senha=senha)
+            db.add(tecnico)
+            db.flush()
+            ids.append(tecnico.id)
+
+            for n in range(atendimentos_por_tecnico):
+                inicio = agora - timedelta(days=n, hours=random.randint(0, 8))
+                atendimento = Atendimento(
+                    os=OS(
+                        cliente=f"Cliente {i}-{n}",
+                        endereco=f"Rua {n}, {i}",
+                        status=StatusOS.CONCLUIDA,
+                        tecnico_id=tecnico.id
+                    ),
+                    tecnico_id=tecnico.id,
+                    hora_inicio=inicio,
+                    hora_fim=inicio + timedelta(hours=2),
+                    etapa=Etapa.FINALIZACAO
+                )
+                for k, etapa in enumerate(Etapa):
+                    atendimento.etapas.append(EtapaHistorico(
+                        etapa=etapa,
+                        descricao=f"{etapa.value} ok",
+                        foto="",
+                        criado_em=inicio + timedelta(minutes=20 * k)
+                    ))
+                db.add(atendimento)
+
+        abertas = db.query(OS).filter(OS.status == StatusOS.EM_ABERTO).count()
+        for i in range(max(os_abertas - abertas, 0)):
+            db.add(OS(cliente=f"Cliente aberto {i}", endereco=f"Av. Carga, {i}"))
+
+        db.commit()
+        return ids
+
+
+# =================================================
+# ESTATÍSTICAS
+# =================================================
+
+def _percentil(valores, p):
+    return valores[min(int(len(valores) * p), len(valores) - 1)] * 1000
+
+
+class Estatisticas:
+    def __init__(self):
+        self.latencias = defaultdict(list)
+        self.erros = defaultdict(int)
+        self.conflitos = defaultdict(int)
+
+    def registrar(self, rota: str, segundos: float, ok: bool, conflito: bool = False):
+        self.latencias[rota].append(segundos)
+        if conflito:
+            self.conflitos[rota] += 1
+        elif not ok:
+            self.erros[rota] += 1
+
+    def resumo(self, duracao: float) -> dict:
+        rotas = {}
+        for rota, valores in sorted(self.latencias.items()):
+            valores.sort()
+            rotas[rota] = {
+                "req": len(valores),
+                "req_s": round(len(valores) / duracao, 1),
+                "p50": round(_percentil(valores, 0.50), 1),
+                "p95": round(_percentil(valores, 0.95), 1),
+                "p99": round(_percentil(valores, 0.99), 1),
+                "erros": self.erros[rota],
+                "conflitos": self.conflitos[rota],
+            }
+        return {"duracao": round(duracao, 1), "rotas": rotas}
+
+    def relatorio(self, duracao: float):
+        print(
+            f"{'rota':<34} {'req':>7} {'req/s':>8} {'p50':>8} {'p95':>8} "
+            f"{'p99':>8} {'erros':>6} {'409':>6}"
+        )
+        for rota, r in self.resumo(duracao)["rotas"].items():
+            print(
+                f"{rota:<34} {r['req']:>7} {r['req_s']:>8.1f} {r['p50']:>8.1f} "
+                f"{r['p95']:>8.1f} {r['p99']:>8.1f} {r['erros']:>6} {r['conflitos']:>6}"
+            )
+
+        todas = sorted(v for valores in self.latencias.values() for v in valores)
+        if todas:
+            print(
+                f"{'TOTAL':<34} {len(todas):>7} {len(todas) / duracao:>8.1f} "
+                f"{_percentil(todas, 0.50):>8.1f} {_percentil(todas, 0.95):>8.1f} "
+                f"{_percentil(todas, 0.99):>8.1f} {sum(self.erros.values()):>6} "
+                f"{sum(self.conflitos.values()):>6}"
+            )
+
+
+async def requisitar(cliente, stats: Estatisticas, rota: str, metodo: str, url: str, **kwargs):
+    """Mede a requisição sob o nome `rota` (o template, não a URL). None em falha de rede."""
+    inicio = time.perf_counter()
+    try:
+        resposta = await cliente.request(metodo, url, **kwargs)
+    except httpx.HTTPError:
+        stats.registrar(rota, time.perf_counter() - inicio, False)
+        return None
+
+    stats.registrar(
+        rota, time.perf_counter() - inicio,
+        resposta.status_code < 400, conflito=resposta.status_code == 409
+    )
+    return resposta
+
+
+# =================================================
+# CENÁRIOS
+# =================================================
+# Cada um: técnico virtual em loop até `fim`, com seu próprio Random
+
+async def cenario_misto(cliente, stats, tecnico, fim, rng):
+    headers = {"Authorization": f"Bearer {tecnico['token']}"}
+    rotas = [r for r, _ in ROTAS_LEITURA]
+    pesos = [p for _, p in ROTAS_LEITURA]
+
+    while time.monotonic() < fim:
+        rota = rng.choices(rotas, pesos)[0]
+        await requisitar(cliente, stats, rota, "GET", rota, headers=headers)
+
+
+async def cenario_login(cliente, stats, tecnico, fim, rng):
+    params = {"email": tecnico["email"], "senha": "carga"}
+
+    while time.monotonic() < fim:
+        await requisitar(cliente, stats, "/login", "POST", "/login", params=params)
+
+
+async def cenario_abertas(cliente, stats, tecnico, fim, rng):
+    headers = {"Authorization": f"Bearer {tecnico['token']}"}
+
+    while time.monotonic() < fim:
+        sorteio = rng.random()
+        if sorteio < 0.4:
+            await requisitar(cliente, stats, "/os/abertas", "GET", "/os/abertas", headers=headers)
+        elif sorteio < 0.7:
+            # Primeira página e a seguinte pelo keyset
+            resposta = await requisitar(
+                cliente, stats, "/os/abertas (página)", "GET", "/os/abertas",
+                params={"limite": 50}, headers=headers
+            )
+            if resposta is not None and resposta.status_code == 200 and resposta.json():
+                await requisitar(
+                    cliente, stats, "/os/abertas (página)", "GET", "/os/abertas",
+                    params={"limite": 50, "apos_id": resposta.json()[-1]["id"]}, headers=headers
+                )
+        else:
+            latitude, longitude = rng.choice(POSICOES)
+            await requisitar(
+                cliente, stats, "/os/abertas (próximas)", "GET", "/os/abertas",
+                params={
+                    "latitude": latitude + rng.uniform(-0.1, 0.1),
+                    "longitude": longitude + rng.uniform(-0.1, 0.1),
+                    "k": 20
+                },
+                headers=headers
+            )
+
+
+async def cenario_historico(cliente, stats, tecnico, fim, rng):
+    headers = {"Authorization": f"Bearer {tecnico['token']}"}
+
+    while time.monotonic() < fim:
+        params = {"limite": 20}
+        itens = []
+        # Rola de 1 a 5 páginas, como quem procura um atendimento antigo
+        for _ in range(rng.randint(1, 5)):
+            resposta = await requisitar(
+                cliente, stats, "/atendimentos/historico", "GET", "/atendimentos/historico",
+                params=params, headers=headers
+            )
+            if resposta is None or resposta.status_code != 200:
+                break
+            pagina = resposta.json()
+            itens = pagina["itens"] or itens
+            if not pagina["proximo_cursor"]:
+                break
+            params = {"limite": 20, "cursor": pagina["proximo_cursor"]}
+
+        if itens:
+            id = rng.choice(itens)["id"]
+            await requisitar(
+                cliente, stats, "/atendimento/{id}/etapas", "GET",
+                f"/atendimento/{id}/etapas", headers=headers
+            )
+
+
+async def cenario_etapas(cliente, stats, tecnico, fim, rng):
+    headers = {"Authorization": f"Bearer {tecnico['token']}"}
+    etapas = [e.value for e in Etapa][1:]
+
+    while time.monotonic() < fim:
+        resposta = await requisitar(
+            cliente, stats, "/os/abertas (página)", "GET", "/os/abertas",
+            params={"limite": 50}, headers=headers
+        )
+        if resposta is None or resposta.status_code != 200:
+            continue
+        abertas = resposta.json()
+        if not abertas:
+            await asyncio.sleep(0.5)
+            continue
+
+        # Vários técnicos sorteiam da mesma página: a disputa é proposital
+        os_id = rng.choice(abertas)["id"]
+        resposta = await requisitar(
+            cliente, stats, "/os/{os_id}/iniciar", "POST", f"/os/{os_id}/iniciar",
+            json={}, headers=headers
+        )
+        if resposta is None or resposta.status_code != 200:
+            continue
+
+        id = resposta.json()["id"]
+        for etapa in etapas:
+            if time.monotonic() >= fim:
+                break
+            resposta = await requisitar(
+                cliente, stats, "/atendimento/{id}/etapa", "POST", f"/atendimento/{id}/etapa",
+                json={"etapa": etapa, "descricao": "carga"}, headers=headers
+            )
+            if resposta is None or resposta.status_code != 200:
+                break
+
+
+FUNCOES = {
+    "misto": cenario_misto,
+    "login": cenario_login,
+    "abertas": cenario_abertas,
+    "historico": cenario_historico,
+    "etapas": cenario_etapas,
+}
+
+
+async def executar(url: str, tecnicos, duracao: int, cenario: str = "misto", semente: int = 42) -> dict:
+    stats = Estatisticas()
+    limites = httpx.Limits(max_connections=len(tecnicos), max_keepalive_connections=len(tecnicos))
+    funcao = FUNCOES[cenario]
+
+    async with httpx.AsyncClient(base_url=url, limits=limites, timeout=60) as cliente:
+        fim = time.monotonic() + duracao
+        inicio = time.monotonic()
+        await asyncio.gather(*[
+            funcao(cliente, stats, tecnico, fim, random.Random(f"{semente}-{cenario}-{i}"))
+            for i, tecnico in enumerate(tecnicos)
+        ])
+        decorrido = time.monotonic() - inicio
+        stats.relatorio(decorrido)
+
+        # Estado do pool de conexões da API ao fim do cenário
+        resposta = await cliente.get(url.rsplit("/api", 1)[0] + "/health/pool")
+        if resposta.status_code == 200:
+            print(f"📊 Pool: {resposta.json()['api']}")
+
+    return stats.resumo(decorrido)
+
+
+# =================================================
+# COMPARAÇÃO COM EXECUÇÃO ANTERIOR
+# =================================================
+
+def comparar(atual: dict, base: dict, tolerancia: float) -> list:
+    """Rotas cujo p95 passou de base * (1 + tolerancia) ou que passaram a dar erro."""
+    regressoes = []
+    for cenario, resultado in atual["cenarios"].items():
+        rotas_base = base.get("cenarios", {}).get(cenario, {}).get("rotas", {})
+        for rota, r in resultado["rotas"].items():
+            b = rotas_base.get(rota)
+            if b is None:
+                continue
+
+            limite = max(b["p95"], P95_MINIMO_COMPARACAO_MS) * (1 + tolerancia)
+            if r["p95"] > limite:
+                regressoes.append(f"{cenario} {rota}: p95 {b['p95']:.1f} -> {r['p95']:.1f} ms")
+            if r["erros"] and not b["erros"]:
+                regressoes.append(f"{cenario} {rota}: {r['erros']} erros (antes nenhum)")
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga por cenário")
+    parser.add_argument("--url", default="http://127.0.0.1:8000/api")
+    parser.add_argument("--cenario", choices=CENARIOS + ["todos"], default="misto")
+    parser.add_argument("--tecnicos", type=int, default=500)
+    parser.add_argument("--duracao", type=int, default=30, help="segundos por cenário")
+    parser.add_argument("--historico", type=int, default=20, help="atendimentos por técnico")
+    parser.add_argument("--os-abertas", type=int, default=200)
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--saida", help="grava o resultado em JSON")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior")
+    parser.add_argument("--tolerancia", type=float, default=0.2, help="piora de p95 aceita (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    cenarios = CENARIOS if args.cenario == "todos" else [args.cenario]
+
+    # O cenário etapas consome OS abertas: garante estoque para a duração
+    os_abertas = args.os_abertas
+    if "etapas" in cenarios:
+        os_abertas = max(os_abertas, args.tecnicos * 10)
+
+    ids = preparar(args.tecnicos, args.historico, os_abertas)
+    tecnicos = [
+        {"id": id, "email": f"carga-{i}@teste.com", "token": create_token(id)}
+        for i, id in enumerate(ids)
+    ]
+
+    resultado = {
+        "parametros": {
+            "tecnicos": args.tecnicos,
+            "duracao": args.duracao,
+            "semente": args.semente,
+            "em": datetime.utcnow().isoformat(timespec="seconds"),
+        },
+        "cenarios": {},
+    }
+    for cenario in cenarios:
+        print(f"🚀 {cenario}: {len(tecnicos)} técnicos por {args.duracao}s contra {args.url}")
+        resultado["cenarios"][cenario] = asyncio.run(
+            executar(args.url, tecnicos, args.duracao, cenario, args.semente)
+        )
+        print()
+
+    if args.saida:
+        with open(args.saida, "w") as f:
+            json.dump(resultado, f, indent=2, ensure_ascii=False)
+        print(f"💾 Resultado em {args.saida}")
+
+    if args.comparar:
+        with open(args.comparar) as f:
+            base = json.load(f)
+        regressoes = comparar(resultado, base, args.tolerancia)
+        if regressoes:
+            print(f"❌ {len(regressoes)} regressões (tolerância {args.tolerancia:.0%}):")
+            for linha in regressoes:
+                print(f"   {linha}")
+            sys.exit(1)
+        print(f"✅ Sem regressão de p95 acima de {args.tolerancia:.0%}")
+
+
+if __name__ == "__main__":
+    main()
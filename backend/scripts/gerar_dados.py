@@ -0,0 +1,483 @@
+# scripts/gerar_dados.py
+#
+# Base sintética no tamanho de produção: técnicos, OS, atendimentos e
+# etapas com distribuições parecidas com as reais, carregados via COPY.
+#
+#   - OS concentradas em volta das capitais (peso por cidade), técnico da
+#     mesma cidade; alguns técnicos atendem muito mais que outros
+#   - atendimentos nos últimos --meses, em horário comercial, menos no
+#     fim de semana; duração de cada etapa log-normal (APROVACAO, que
+#     espera o cliente, tem cauda longa)
+#   - ~--abertas das OS em aberto e ~--andamento em atendimento (no máximo
+#     um aberto por técnico); o resto concluído com as 6 etapas
+#
+# Os técnicos são os carga-N@teste.com (senha "carga") que scripts.carga,
+# scripts.bench_login e scripts.stress_iniciar já usam: os existentes são
+# reaproveitados e ganham o histórico gerado. OS/atendimentos/etapas são
+# sempre acrescentados. Mesma --semente, mesmos dados (datas relativas ao
+# momento da geração).
+#
+# Cada lote é uma transação: ids reservados nas sequências, COPY das três
+# tabelas e a soma nos agregados de métricas (app/metricas.py). O trigger
+# os_eventos fica desligado durante o lote (um NOTIFY por linha não faz
+# sentido aqui), o que trava a tabela os: rode com a API parada ou
+# aceitando a espera.
+#
+#   cd backend && python -m scripts.gerar_dados --os 1000000 --tecnicos 2000
+#
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import text
+
+from app import geo
+from app.auth import hash_password
+from app.database import async_engine
+from app.db.models import Etapa
+from app.metricas import METRICAS_SLA_HORAS
+
+# (latitude, longitude, espalhamento em graus, peso)
+CIDADES = [
+    (-23.55, -46.63, 0.25, 0.35),   # São Paulo
+    (-22.91, -43.20, 0.20, 0.20),   # Rio de Janeiro
+    (-19.92, -43.94, 0.15, 0.10),   # Belo Horizonte
+    (-30.03, -51.23, 0.15, 0.08),   # Porto Alegre
+    (-12.97, -38.50, 0.15, 0.08),   # Salvador
+    (-3.73, -38.52, 0.12, 0.07),    # Fortaleza
+    (-15.79, -47.88, 0.15, 0.07),   # Brasília
+    (-8.05, -34.90, 0.12, 0.05),    # Recife
+]
+
+ETAPAS = list(Etapa)
+
+# Texto para a busca (GET /busca): variado o bastante para o full-text e
+# o ranqueamento terem o que separar
+TIPOS_CLIENTE = [
+    "Padaria", "Mercado", "Farmácia", "Restaurante", "Academia", "Clínica",
+    "Escola", "Hotel", "Condomínio", "Oficina", "Loja", "Escritório",
+]
+SOBRENOMES = [
+    "Silva", "Santos", "Oliveira", "Souza", "Rodrigues", "Ferreira", "Alves",
+    "Pereira", "Lima", "Gomes", "Costa", "Ribeiro", "Martins", "Carvalho",
+    "Almeida", "Lopes", "Soares", "Fernandes", "Vieira", "Barbosa",
+]
+LOGRADOUROS = [
+    "Rua Augusta", "Avenida Paulista", "Rua das Flores", "Rua XV de Novembro",
+    "Avenida Brasil", "Rua da Consolação", "Avenida Atlântica", "Rua Sete de Setembro",
+    "Rua Direita", "Avenida Getúlio Vargas", "Rua São Bento", "Rua Bahia",
+    "Avenida Afonso Pena", "Rua Voluntários da Pátria", "Rua Dom Pedro II",
+]
+EQUIPAMENTOS = [
+    "ar-condicionado", "compressor", "quadro elétrico", "bomba d'água", "câmara fria",
+    "gerador", "elevador", "portão automático", "aquecedor", "exaustor",
+]
+# Notas por etapa; {eq} é o equipamento do atendimento
+NOTAS_ETAPA = [
+    ["Início do atendimento"],
+    ["{eq} com ruído anormal", "{eq} não liga, verificando alimentação",
+     "vazamento no {eq}", "{eq} desarmando o disjuntor"],
+    ["orçamento: troca de capacitor do {eq}", "orçamento: substituição da placa do {eq}",
+     "orçamento: limpeza e recarga de gás do {eq}", "orçamento: troca de rolamento do {eq}"],
+    ["aguardando aprovação do cliente", "cliente aprovou por telefone",
+     "gerente aprovou o orçamento"],
+    ["peça substituída e {eq} testado", "serviço executado no {eq} conforme orçamento",
+     "reaperto das conexões do {eq}"],
+    ["{eq} funcionando normalmente", "cliente assinou o relatório",
+     "serviço concluído, área limpa"],
+]
+
+# Tempo em cada etapa até a seguinte, em minutos: (mediana, sigma do log)
+DURACAO_ETAPA = [
+    (20, 0.5),    # INSPECAO
+    (35, 0.6),    # DIAGNOSTICO
+    (15, 0.5),    # ORCAMENTO
+    (180, 1.1),   # APROVACAO
+    (90, 0.6),    # EXECUCAO
+]
+
+# Seg..Dom
+PESO_DIA_SEMANA = [1.0, 1.0, 1.0, 1.0, 1.0, 0.4, 0.1]
+
+STATUS_EM_ANDAMENTO = {
+    Etapa.INSPECAO: "EM_ATENDIMENTO",
+    Etapa.DIAGNOSTICO: "EM_ATENDIMENTO",
+    Etapa.ORCAMENTO: "AGUARDANDO",
+    Etapa.APROVACAO: "AGUARDANDO",
+    Etapa.EXECUCAO: "EM_CAMPO",
+}
+
+
+def _datas(base: datetime, segundos: np.ndarray) -> list:
+    """base + segundos (vetor) como lista de datetime."""
+    return (np.datetime64(base, "us") + (segundos * 1e6).astype("timedelta64[us]")).astype(object).tolist()
+
+
+async def reservar_ids(raw, tabela: str, quantidade: int) -> int:
+    """Primeiro id de um bloco de `quantidade` ids reservados na sequência."""
+    ultimo = await raw.fetchval(
+        "SELECT setval(pg_get_serial_sequence($1, 'id'), nextval(pg_get_serial_sequence($1, 'id')) + $2 - 1)",
+        tabela, quantidade
+    )
+    return ultimo - quantidade + 1
+
+
+# =================================================
+# TÉCNICOS
+# =================================================
+
+async def preparar_tecnicos(raw, gerador, quantidade: int, agora: datetime):
+    """carga-0..N-1: cria os que faltam; devolve ids, cidade e peso de cada um."""
+    existentes = dict(await raw.fetch(
+        "SELECT email, id FROM tecnico WHERE email LIKE 'carga-%@teste.com'"
+    ))
+
+    cidade = gerador.choice(len(CIDADES), quantidade, p=[c[3] for c in CIDADES])
+    # Produtividade: poucos técnicos atendem muito, a maioria na média
+    peso = gerador.lognormal(0, 0.6, quantidade)
+
+    faltando = [i for i in range(quantidade) if f"carga-{i}@teste.com" not in existentes]
+    if faltando:
+        primeiro = await reservar_ids(raw, "tecnico", len(faltando))
+        senha = hash_password("carga")
+        registros = []
+        for n, i in enumerate(faltando):
+            lat, lon, espalhamento, _ = CIDADES[cidade[i]]
+            existentes[f"carga-{i}@teste.com"] = primeiro + n
+            registros.append((
+                primeiro + n, f"Carga {i}", f"carga-{i}@teste.com", senha, True, False,
+                float(gerador.normal(lat, espalhamento)), float(gerador.normal(lon, espalhamento)),
+                agora - timedelta(minutes=float(gerador.uniform(0, 600)))
+            ))
+        await raw.copy_records_to_table(
+            "tecnico",
+            records=registros,
+            columns=["id", "nome", "email", "senha", "ativo", "admin", "latitude", "longitude", "posicao_em"]
+        )
+
+    ids = np.array([existentes[f"carga-{i}@teste.com"] for i in range(quantidade)], dtype=np.int64)
+    return ids, cidade, peso, len(faltando)
+
+
+# =================================================
+# LOTE
+# =================================================
+
+def gerar_lote(gerador, n: int, tecnicos, livres_para_andamento: list, agora: datetime, dias: int, opcoes):
+    """Linhas de um lote (sem ids): OS, atendimentos e etapas em colunas."""
+    tecnico_ids, tecnico_cidade, tecnico_peso = tecnicos
+
+    cidade = gerador.choice(len(CIDADES), n, p=[c[3] for c in CIDADES])
+    centro = np.array([(c[0], c[1], c[2]) for c in CIDADES])[cidade]
+    lat = gerador.normal(centro[:, 0], centro[:, 2])
+    lon = gerador.normal(centro[:, 1], centro[:, 2])
+
+    # 0 = aberta, 1 = em andamento, 2 = concluída
+    tipo = gerador.choice(3, n, p=[opcoes.abertas, opcoes.andamento, 1 - opcoes.abertas - opcoes.andamento])
+
+    # Em andamento: no máximo um por técnico (o app tem um "atendimento ativo")
+    andamento = np.flatnonzero(tipo == 1)
+    if len(andamento) > len(livres_para_andamento):
+        tipo[andamento[len(livres_para_andamento):]] = 2
+        andamento = andamento[:len(livres_para_andamento)]
+
+    # Técnico da mesma cidade, pela produtividade
+    tecnico = np.zeros(n, dtype=np.int64)
+    for c in range(len(CIDADES)):
+        linhas = np.flatnonzero(cidade == c)
+        candidatos = np.flatnonzero(tecnico_cidade == c)
+        if len(candidatos) == 0:
+            candidatos = np.arange(len(tecnico_ids))
+        pesos = tecnico_peso[candidatos] / tecnico_peso[candidatos].sum()
+        tecnico[linhas] = gerador.choice(candidatos, len(linhas), p=pesos)
+    for linha in andamento:
+        tecnico[linha] = livres_para_andamento.pop()
+
+    # Duração de cada etapa (s) e entrada em cada uma a partir do início
+    medianas = np.array([d[0] for d in DURACAO_ETAPA]) * 60
+    sigmas = np.array([d[1] for d in DURACAO_ETAPA])
+    duracao = medianas * gerador.lognormal(0, sigmas, (n, len(DURACAO_ETAPA)))
+    entrada = np.concatenate([np.zeros((n, 1)), np.cumsum(duracao, axis=1)], axis=1)
+
+    # Início: dia útil (peso), horário comercial; concluídas até ontem
+    # Tempos em segundos relativos a agora (negativo = passado)
+    agora_s = 0.0
+    hoje = agora.replace(hour=0, minute=0, second=0, microsecond=0)
+    dia_semana = np.array([(hoje - timedelta(days=d)).weekday() for d in range(1, dias + 1)])
+    p_dia = np.array(PESO_DIA_SEMANA)[dia_semana]
+    dia = gerador.choice(np.arange(1, dias + 1), n, p=p_dia / p_dia.sum())
+    hora = np.clip(gerador.normal(11, 2.5, n), 7, 18)
+    inicio = (hoje - agora).total_seconds() - dia * 86400.0 + hora * 3600
+
+    # Concluída que terminaria no futuro (cauda longa da APROVACAO): recua
+    passou = inicio + entrada[:, -1] - agora_s
+    inicio = np.where(passou > 0, inicio - passou - gerador.uniform(0, 3600, n), inicio)
+
+    # Em andamento: parou numa etapa antes da FINALIZACAO, agora
+    etapa_atual = np.full(n, len(ETAPAS) - 1)
+    etapa_atual[andamento] = gerador.integers(0, len(ETAPAS) - 1, len(andamento))
+    k = etapa_atual[andamento]
+    inicio[andamento] = agora_s - entrada[andamento, k] - gerador.uniform(0, 1, len(andamento)) * duracao[andamento, k]
+
+    abertas = tipo == 0
+    criado_os = np.where(
+        abertas,
+        agora_s - gerador.uniform(0, 7 * 86400, n),
+        inicio - gerador.uniform(1800, 72 * 3600, n)
+    )
+
+    return {
+        "lat": lat, "lon": lon, "tipo": tipo, "tecnico": tecnico,
+        "inicio": inicio, "entrada": entrada, "etapa_atual": etapa_atual,
+        "criado_os": criado_os,
+    }
+
+
+def nome_cliente(cliente: int) -> str:
+    # "Padaria Souza Lima": tipo + dois sobrenomes
+    cliente, tipo = divmod(cliente, len(TIPOS_CLIENTE))
+    cliente, primeiro = divmod(cliente, len(SOBRENOMES))
+    segundo = cliente % len(SOBRENOMES)
+    return f"{TIPOS_CLIENTE[tipo]} {SOBRENOMES[primeiro]} {SOBRENOMES[segundo]}"
+
+
+def nota_etapa(etapa_id: int, atendimento_id: int, etapa: int) -> str:
+    notas = NOTAS_ETAPA[etapa]
+    return notas[etapa_id % len(notas)].format(eq=EQUIPAMENTOS[atendimento_id % len(EQUIPAMENTOS)])
+
+
+def registros_lote(lote, primeiro_os: int, primeiro_atendimento: int, primeiro_etapa: int,
+                   tecnico_ids, agora: datetime, cliente_base: int):
+    tipo = lote["tipo"]
+    n = len(tipo)
+    os_ids = np.arange(primeiro_os, primeiro_os + n)
+    atendidas = np.flatnonzero(tipo != 0)
+    concluidas = tipo == 2
+
+    status = np.full(n, "CONCLUIDA", dtype=object)
+    status[tipo == 0] = "EM_ABERTO"
+    for linha in np.flatnonzero(tipo == 1):
+        status[linha] = STATUS_EM_ANDAMENTO[ETAPAS[lote["etapa_atual"][linha]]]
+
+    tecnico_os = np.where(tipo == 0, -1, tecnico_ids[lote["tecnico"]])
+    lat, lon = lote["lat"].tolist(), lote["lon"].tolist()
+    # Clientes se repetem (mesmo cliente abre várias OS)
+    clientes = (cliente_base + (os_ids * 7919) % max(n // 3, 1)).tolist()
+
+    registros_os = [
+        (
+            int(os_id), nome_cliente(cliente),
+            f"{LOGRADOUROS[os_id % len(LOGRADOUROS)]}, {os_id % 1500 + 1}",
+            st, None if t < 0 else int(t), criado, la, lo, geo.codificar(la, lo)
+        )
+        for os_id, cliente, st, t, criado, la, lo in zip(
+            os_ids.tolist(), clientes, status, tecnico_os.tolist(),
+            _datas(agora, lote["criado_os"]), lat, lon
+        )
+    ]
+
+    # Atendimentos das OS não abertas
+    m = len(atendidas)
+    atendimento_ids = np.arange(primeiro_atendimento, primeiro_atendimento + m)
+    etapa_atual = lote["etapa_atual"][atendidas]
+    entrada = lote["entrada"][atendidas]
+    inicio = lote["inicio"][atendidas]
+    etapa_em = inicio + entrada[np.arange(m), etapa_atual]
+    hora_fim = np.where(concluidas[atendidas], etapa_em, np.nan)
+
+    datas_inicio = _datas(agora, inicio)
+    datas_etapa_em = _datas(agora, etapa_em)
+    registros_atendimento = [
+        (
+            at_id, os_id, t, ini, None if np.isnan(fim_s) else fim, ETAPAS[e].value, em,
+            la, lo
+        )
+        for at_id, os_id, t, ini, fim_s, fim, e, em, la, lo in zip(
+            atendimento_ids.tolist(), os_ids[atendidas].tolist(),
+            tecnico_ids[lote["tecnico"][atendidas]].tolist(), datas_inicio,
+            hora_fim.tolist(), datas_etapa_em, etapa_atual.tolist(), datas_etapa_em,
+            lote["lat"][atendidas].tolist(), lote["lon"][atendidas].tolist()
+        )
+    ]
+
+    # Etapas: uma linha por etapa já alcançada
+    alcancada = np.arange(len(ETAPAS))[None, :] <= etapa_atual[:, None]
+    linha, coluna = np.nonzero(alcancada)
+    quando = _datas(agora, inicio[linha] + entrada[linha, coluna])
+    registros_etapa = [
+        (e_id, at_id, ETAPAS[c].value, nota_etapa(e_id, at_id, c), "", q)
+        for e_id, at_id, c, q in zip(
+            range(primeiro_etapa, primeiro_etapa + len(linha)),
+            atendimento_ids[linha].tolist(), coluna.tolist(), quando
+        )
+    ]
+
+    return registros_os, registros_atendimento, registros_etapa
+
+
+# Soma as métricas do lote nos agregados (mesmas regras de app/metricas.py)
+SQL_METRICAS = [
+    """
+    WITH entradas AS (
+        SELECT a.tecnico_id, e.etapa, e.criado_em,
+               lead(e.criado_em) OVER (PARTITION BY e.atendimento_id ORDER BY e.criado_em) AS saida
+        FROM etapa_historico e
+        JOIN atendimento a ON a.id = e.atendimento_id
+        WHERE a.id BETWEEN $1 AND $2 AND e.criado_em >= $3
+    )
+    INSERT INTO metrica_etapa_diaria AS m
+        (dia, tecnico_id, etapa, quantidade, duracao_total_s, duracao_max_s)
+    SELECT saida::date, tecnico_id, etapa, count(*),
+           sum(extract(epoch FROM saida - criado_em)),
+           max(extract(epoch FROM saida - criado_em))
+    FROM entradas
+    WHERE saida IS NOT NULL
+    GROUP BY 1, 2, 3
+    ON CONFLICT (dia, tecnico_id, etapa) DO UPDATE SET
+        quantidade = m.quantidade + excluded.quantidade,
+        duracao_total_s = m.duracao_total_s + excluded.duracao_total_s,
+        duracao_max_s = greatest(m.duracao_max_s, excluded.duracao_max_s)
+    """,
+    """
+    INSERT INTO metrica_tecnico_diaria AS m (dia, tecnico_id, iniciados)
+    SELECT hora_inicio::date, tecnico_id, count(*)
+    FROM atendimento
+    WHERE id BETWEEN $1 AND $2
+    GROUP BY 1, 2
+    ON CONFLICT (dia, tecnico_id) DO UPDATE SET
+        iniciados = m.iniciados + excluded.iniciados
+    """,
+    """
+    INSERT INTO metrica_tecnico_diaria AS m
+        (dia, tecnico_id, concluidos, dentro_sla, duracao_total_s, duracao_max_s)
+    SELECT hora_fim::date, tecnico_id, count(*),
+           count(*) FILTER (WHERE hora_fim - hora_inicio <= make_interval(secs => $3)),
+           sum(extract(epoch FROM hora_fim - hora_inicio)),
+           max(extract(epoch FROM hora_fim - hora_inicio))
+    FROM atendimento
+    WHERE id BETWEEN $1 AND $2 AND hora_fim IS NOT NULL
+    GROUP BY 1, 2
+    ON CONFLICT (dia, tecnico_id) DO UPDATE SET
+        concluidos = m.concluidos + excluded.concluidos,
+        dentro_sla = m.dentro_sla + excluded.dentro_sla,
+        duracao_total_s = m.duracao_total_s + excluded.duracao_total_s,
+        duracao_max_s = greatest(m.duracao_max_s, excluded.duracao_max_s)
+    """,
+]
+
+
+async def carregar_lote(conn, registros, primeiro_atendimento: int, inicio_minimo: datetime):
+    registros_os, registros_atendimento, registros_etapa = registros
+    raw = (await conn.get_raw_connection()).driver_connection
+
+    await raw.execute("ALTER TABLE os DISABLE TRIGGER os_eventos")
+    await raw.copy_records_to_table(
+        "os", records=registros_os,
+        columns=["id", "cliente", "endereco", "status", "tecnico_id", "criado_em", "latitude", "longitude", "geohash"]
+    )
+    await raw.copy_records_to_table(
+        "atendimento", records=registros_atendimento,
+        columns=["id", "os_id", "tecnico_id", "hora_inicio", "hora_fim", "etapa", "etapa_em",
+                 "latitude_inicio", "longitude_inicio"]
+    )
+    await raw.copy_records_to_table(
+        "etapa_historico", records=registros_etapa,
+        columns=["id", "atendimento_id", "etapa", "descricao", "foto", "criado_em"]
+    )
+    await raw.execute("ALTER TABLE os ENABLE TRIGGER os_eventos")
+
+    if registros_atendimento:
+        ultimo = primeiro_atendimento + len(registros_atendimento) - 1
+        await raw.execute(SQL_METRICAS[0], primeiro_atendimento, ultimo, inicio_minimo)
+        await raw.execute(SQL_METRICAS[1], primeiro_atendimento, ultimo)
+        await raw.execute(SQL_METRICAS[2], primeiro_atendimento, ultimo, METRICAS_SLA_HORAS * 3600)
+
+
+# =================================================
+# PRINCIPAL
+# =================================================
+
+async def main(opcoes):
+    gerador = np.random.default_rng(opcoes.semente)
+    agora = datetime.utcnow()
+    dias = max(int(opcoes.meses * 30.4), 1)
+    inicio_minimo = (agora - timedelta(days=dias + 1)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    async with async_engine.connect() as conn:
+        # O BEGIN do driver é preguiçoso: força a transação antes do COPY
+        await conn.execute(text("SELECT 1"))
+        raw = (await conn.get_raw_connection()).driver_connection
+
+        tecnico_ids, tecnico_cidade, tecnico_peso, criados = await preparar_tecnicos(
+            raw, gerador, opcoes.tecnicos, agora
+        )
+
+        # Técnicos sem atendimento aberto podem receber um "em andamento"
+        ocupados = {r[0] for r in await raw.fetch(
+            "SELECT DISTINCT tecnico_id FROM atendimento WHERE hora_fim IS NULL AND tecnico_id IS NOT NULL"
+        )}
+        livres = [i for i in gerador.permutation(len(tecnico_ids)).tolist() if int(tecnico_ids[i]) not in ocupados]
+
+        # Meses do período já com partição (senão tudo cai na padrão)
+        await raw.execute(
+            "SELECT criar_particoes_etapa_historico($1::date, $2::date)",
+            inicio_minimo.date(), agora.date()
+        )
+        await conn.commit()
+
+        print(f"👷 {opcoes.tecnicos} técnicos ({criados} criados), {opcoes.os} OS em {dias} dias")
+
+        total = {"os": 0, "atendimento": 0, "etapa": 0}
+        t0 = time.perf_counter()
+        cliente_base = int(gerador.integers(0, 1_000_000))
+
+        for feitas in range(0, opcoes.os, opcoes.lote):
+            n = min(opcoes.lote, opcoes.os - feitas)
+            lote = gerar_lote(
+                gerador, n, (tecnico_ids, tecnico_cidade, tecnico_peso), livres, agora, dias, opcoes
+            )
+            atendimentos = int((lote["tipo"] != 0).sum())
+            etapas = int((lote["etapa_atual"][lote["tipo"] != 0] + 1).sum())
+
+            await conn.execute(text("SELECT 1"))
+            raw = (await conn.get_raw_connection()).driver_connection
+            primeiro_os = await reservar_ids(raw, "os", n)
+            primeiro_atendimento = await reservar_ids(raw, "atendimento", atendimentos) if atendimentos else 0
+            primeiro_etapa = await reservar_ids(raw, "etapa_historico", etapas) if etapas else 0
+
+            registros = registros_lote(
+                lote, primeiro_os, primeiro_atendimento, primeiro_etapa, tecnico_ids, agora, cliente_base
+            )
+            await carregar_lote(conn, registros, primeiro_atendimento, inicio_minimo)
+            await conn.commit()
+
+            total["os"] += n
+            total["atendimento"] += atendimentos
+            total["etapa"] += etapas
+            decorrido = time.perf_counter() - t0
+            linhas = sum(total.values())
+            print(
+                f"  📦 {total['os']:>9} OS | {total['atendimento']:>9} atendimentos | "
+                f"{total['etapa']:>10} etapas | {linhas / decorrido:>8.0f} linhas/s"
+            )
+
+        await conn.execute(text("ANALYZE tecnico, os, atendimento, etapa_historico"))
+        await conn.commit()
+
+    print(f"✅ {sum(total.values())} linhas em {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera dados sintéticos em massa")
+    parser.add_argument("--os", type=int, default=100_000)
+    parser.add_argument("--tecnicos", type=int, default=500)
+    parser.add_argument("--meses", type=float, default=12)
+    parser.add_argument("--abertas", type=float, default=0.03, help="fração de OS em aberto")
+    parser.add_argument("--andamento", type=float, default=0.01, help="fração em atendimento")
+    parser.add_argument("--lote", type=int, default=50_000)
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+
+    asyncio.run(main(args))
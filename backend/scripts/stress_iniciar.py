@@ -0,0 +1,119 @@
+# scripts/stress_iniciar.py
+#
+# Teste de concorrência do POST /os/{id}/iniciar: N técnicos tentam pegar
+# a MESMA OS ao mesmo tempo, em várias rodadas. Em cada rodada exatamente
+# um deve receber 200 e todos os outros 409; no banco deve sobrar um único
+# atendimento aberto, com uma única etapa inicial.
+#
+# Usa os técnicos carga-N@teste.com do scripts.carga (cria se faltarem) e
+# uma API já rodando.
+#
+#   cd backend && uvicorn app.main:app &
+#   python -m scripts.stress_iniciar --tecnicos 300 --rodadas 5
+#
+# A mesma disputa, menor e sem servidor, roda no pytest
+# (tests/test_iniciar_concorrente.py, com DATABASE_URL).
+#
+import argparse
+import asyncio
+import time
+from collections import Counter
+
+import httpx
+from sqlalchemy import func, select
+
+from app.auth import create_token
+from app.database import SessionLocal
+from app.db.models import OS, Atendimento, EtapaHistorico
+from scripts.carga import preparar
+
+
+def nova_os(rodada: int) -> int:
+    with SessionLocal() as db:
+        os = OS(cliente=f"Disputa {rodada}", endereco=f"Rua da Disputa, {rodada}")
+        db.add(os)
+        db.commit()
+        return os.id
+
+
+def conferir(os_id: int):
+    with SessionLocal() as db:
+        abertos = db.execute(
+            select(Atendimento.id).where(Atendimento.os_id == os_id, Atendimento.hora_fim.is_(None))
+        ).scalars().all()
+        etapas = db.execute(
+            select(func.count(EtapaHistorico.id)).where(EtapaHistorico.atendimento_id.in_(abertos))
+        ).scalar() if abertos else 0
+        return len(abertos), etapas
+
+
+async def rodada(cliente: httpx.AsyncClient, tokens, os_id: int):
+    largada = asyncio.Event()
+
+    async def tentar(token):
+        await largada.wait()
+        inicio = time.perf_counter()
+        try:
+            resposta = await cliente.post(
+                f"/os/{os_id}/iniciar",
+                json={"latitude": 0, "longitude": 0},
+                headers={"Authorization": f"Bearer {token}"}
+            )
+            status = resposta.status_code
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        return status, time.perf_counter() - inicio
+
+    tarefas = [asyncio.create_task(tentar(token)) for token in tokens]
+    await asyncio.sleep(0.2)
+    largada.set()
+    return await asyncio.gather(*tarefas)
+
+
+async def executar(url: str, tokens, rodadas: int):
+    limites = httpx.Limits(max_connections=len(tokens), max_keepalive_connections=len(tokens))
+    falhas = 0
+
+    async with httpx.AsyncClient(base_url=url, limits=limites, timeout=60) as cliente:
+        for n in range(1, rodadas + 1):
+            os_id = nova_os(n)
+            resultados = await rodada(cliente, tokens, os_id)
+
+            status = Counter(s for s, _ in resultados)
+            latencias = sorted(t for _, t in resultados)
+            abertos, etapas = conferir(os_id)
+
+            # Erro de transporte (conexão resetada etc.) não é disputa perdida,
+            # mas aparece no status para ser notado
+            respostas = {s: q for s, q in status.items() if isinstance(s, int)}
+            ok = (
+                respostas.get(200) == 1
+                and set(respostas) <= {200, 409}
+                and abertos == 1 and etapas == 1
+            )
+            falhas += not ok
+            print(
+                f"{'✅' if ok else '❌'} Rodada {n}: OS {os_id} | status {dict(status)} | "
+                f"abertos {abertos} | etapas {etapas} | "
+                f"p50 {latencias[len(latencias) // 2] * 1000:.0f} ms | máx {latencias[-1] * 1000:.0f} ms"
+            )
+
+    print(f"📊 {rodadas - falhas}/{rodadas} rodadas sem disputa perdida")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Disputa simultânea pela mesma OS")
+    parser.add_argument("--url", default="http://127.0.0.1:8000/api")
+    parser.add_argument("--tecnicos", type=int, default=300)
+    parser.add_argument("--rodadas", type=int, default=5)
+    args = parser.parse_args()
+
+    ids = preparar(args.tecnicos, atendimentos_por_tecnico=0, os_abertas=0)
+    tokens = [create_token(id) for id in ids]
+
+    print(f"🚀 {len(tokens)} técnicos disputando a mesma OS, {args.rodadas} rodadas")
+    asyncio.run(executar(args.url, tokens, args.rodadas))
+
+
+if __name__ == "__main__":
+    main()
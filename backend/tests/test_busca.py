@@ -0,0 +1,71 @@
+import base64
+
+import pytest
+from fastapi import HTTPException
+
+from app import busca
+from app.busca import codificar_cursor, decodificar_cursor, montar_tsquery, padrao_trecho
+
+
+# =================================================
+# TSQUERY
+# =================================================
+
+def test_tsquery_prefixo_em_todas_as_palavras():
+    assert montar_tsquery("Rua Augus") == "rua:* & augus:*"
+
+
+def test_tsquery_so_letras_e_digitos():
+    # Operadores e aspas do to_tsquery não passam
+    assert montar_tsquery("bomba & (d'água) | !vazamento 220v") == (
+        "bomba:* & d:* & água:* & vazamento:* & 220v:*"
+    )
+
+
+def test_tsquery_sublinhado_separa_palavras():
+    assert montar_tsquery("ar_condicionado") == "ar:* & condicionado:*"
+
+
+def test_tsquery_sem_palavras():
+    assert montar_tsquery("  -- !! ") == ""
+
+
+def test_tsquery_limite_de_palavras(monkeypatch):
+    monkeypatch.setattr(busca, "BUSCA_MAX_PALAVRAS", 2)
+    assert montar_tsquery("a b c d") == "a:* & b:*"
+
+
+# =================================================
+# TRECHO (ILIKE)
+# =================================================
+
+def test_trecho_escapa_curingas():
+    assert padrao_trecho(" 100%_ok\\ ") == "%100\\%\\_ok\\\\%"
+
+
+# =================================================
+# CURSOR
+# =================================================
+
+@pytest.mark.parametrize("deslocamento", [0, 20, 123456])
+def test_cursor_ida_e_volta(deslocamento):
+    assert decodificar_cursor(codificar_cursor(deslocamento)) == deslocamento
+
+
+@pytest.mark.parametrize("cursor", [None, ""])
+def test_cursor_ausente_e_inicio(cursor):
+    assert decodificar_cursor(cursor) == 0
+
+
+@pytest.mark.parametrize("conteudo", [b"outro|20", b"busca|-1", b"busca|x", b"busca|1|2", "busca|ç".encode("latin-1")])
+def test_cursor_invalido(conteudo):
+    cursor = base64.urlsafe_b64encode(conteudo).decode()
+    with pytest.raises(HTTPException) as erro:
+        decodificar_cursor(cursor)
+    assert erro.value.status_code == 400
+
+
+def test_cursor_que_nao_e_base64():
+    with pytest.raises(HTTPException) as erro:
+        decodificar_cursor("não é base64")
+    assert erro.value.status_code == 400
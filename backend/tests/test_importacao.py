@@ -0,0 +1,139 @@
+import io
+
+import pytest
+
+from app import geo
+from app.importacao import ArquivoInvalido, _linhas_csv, _linhas_ndjson, formato_pelo_nome, validar
+
+
+def _csv(texto: str, codificacao: str = "utf-8"):
+    return list(_linhas_csv(io.BytesIO(texto.encode(codificacao))))
+
+
+# =================================================
+# FORMATO
+# =================================================
+
+@pytest.mark.parametrize("nome, formato", [
+    ("os.csv", "csv"),
+    ("OS.CSV", "csv"),
+    ("os.ndjson", "ndjson"),
+    ("export.2024.jsonl", "ndjson"),
+    ("os.xlsx", None),
+    ("csv", "csv"),
+    ("", None),
+    (None, None),
+])
+def test_formato_pelo_nome(nome, formato):
+    assert formato_pelo_nome(nome) == formato
+
+
+# =================================================
+# CSV
+# =================================================
+
+def test_csv_virgula():
+    assert _csv("referencia_externa,cliente,endereco\nA1,Maria,Rua 1\n") == [
+        (2, {"referencia_externa": "A1", "cliente": "Maria", "endereco": "Rua 1"})
+    ]
+
+
+def test_csv_ponto_e_virgula_com_bom_e_cabecalho_em_maiusculas():
+    linhas = _csv("\ufeffReferencia_Externa;Cliente;Endereco;Latitude\nA1;Maria;Rua 1, 10;-23,5\n")
+    assert linhas == [
+        (2, {"referencia_externa": "A1", "cliente": "Maria", "endereco": "Rua 1, 10", "latitude": "-23,5"})
+    ]
+
+
+def test_csv_latin1_falha_no_decode():
+    with pytest.raises(UnicodeDecodeError):
+        _csv("referencia_externa,cliente,endereco\nA1,João,Rua 1\n", "latin-1")
+
+
+def test_csv_pula_linhas_em_branco_e_numera_pelo_arquivo():
+    linhas = _csv("referencia_externa,cliente,endereco\n\nA1,Maria,Rua 1\n , ,\nA2,José,Rua 2\n")
+    assert [numero for numero, _ in linhas] == [3, 5]
+
+
+def test_csv_numero_de_colunas_errado():
+    linhas = _csv("referencia_externa,cliente,endereco\nA1,Maria\nA2,José,Rua 2\n")
+    assert linhas[0] == (2, "Esperadas 3 colunas, encontradas 2")
+    assert linhas[1][0] == 3
+
+
+def test_csv_campo_com_quebra_de_linha():
+    linhas = _csv('referencia_externa,cliente,endereco\nA1,Maria,"Rua 1\nfundos"\nA2,José,Rua 2\n')
+    assert linhas[0] == (3, {"referencia_externa": "A1", "cliente": "Maria", "endereco": "Rua 1\nfundos"})
+    assert linhas[1][0] == 4
+
+
+def test_csv_vazio():
+    with pytest.raises(ArquivoInvalido, match="Arquivo vazio"):
+        _csv("")
+
+
+def test_csv_colunas_obrigatorias_ausentes():
+    with pytest.raises(ArquivoInvalido, match="Colunas obrigatórias ausentes: cliente, endereco"):
+        _csv("referencia_externa,nome\nA1,Maria\n")
+
+
+def test_csv_nao_fecha_o_arquivo():
+    arquivo = io.BytesIO(b"referencia_externa,cliente,endereco\nA1,Maria,Rua 1\n")
+    list(_linhas_csv(arquivo))
+    assert not arquivo.closed
+
+
+# =================================================
+# NDJSON
+# =================================================
+
+def test_ndjson():
+    arquivo = io.BytesIO(b'{"referencia_externa": 1}\n\n[1, 2]\n{quebrado\n{"cliente": "Maria"}\n')
+    assert list(_linhas_ndjson(arquivo)) == [
+        (1, {"referencia_externa": 1}),
+        (3, "Esperado um objeto JSON"),
+        (4, "JSON inválido"),
+        (5, {"cliente": "Maria"}),
+    ]
+
+
+# =================================================
+# VALIDAÇÃO
+# =================================================
+
+BASE = {"referencia_externa": " A1 ", "cliente": "Maria", "endereco": "Rua 1"}
+
+
+def test_validar_sem_coordenadas():
+    assert validar(BASE) == ("A1", "Maria", "Rua 1", None, None, None)
+
+
+def test_validar_coordenadas_com_virgula_decimal():
+    registro = {**BASE, "latitude": "-23,55", "longitude": " -46.63 "}
+    assert validar(registro) == (
+        "A1", "Maria", "Rua 1", -23.55, -46.63, geo.codificar(-23.55, -46.63)
+    )
+
+
+def test_validar_referencia_numerica():
+    assert validar({**BASE, "referencia_externa": 123})[0] == "123"
+
+
+@pytest.mark.parametrize("registro, motivo", [
+    ({"cliente": "Maria", "endereco": "Rua 1"}, "referencia_externa obrigatório"),
+    ({**BASE, "cliente": "  "}, "cliente obrigatório"),
+    ({**BASE, "endereco": ["Rua 1"]}, "endereco obrigatório"),
+    ({**BASE, "referencia_externa": True}, "referencia_externa obrigatório"),
+    ({**BASE, "cliente": "Ma\x00ria"}, "cliente com caractere inválido"),
+    ({**BASE, "referencia_externa": "x" * 65}, "referencia_externa com mais de 64 caracteres"),
+    ({**BASE, "latitude": "abc", "longitude": "1"}, "Latitude/longitude não numérica"),
+    ({**BASE, "latitude": True, "longitude": 1}, "Latitude/longitude não numérica"),
+    ({**BASE, "latitude": [1], "longitude": 1}, "Latitude/longitude não numérica"),
+    ({**BASE, "latitude": "-23.5"}, "Latitude/longitude inválida"),
+    ({**BASE, "latitude": 91, "longitude": 0}, "Latitude/longitude inválida"),
+    ({**BASE, "latitude": 0, "longitude": 0}, "Latitude/longitude inválida"),
+])
+def test_validar_recusa(registro, motivo):
+    with pytest.raises(ValueError) as erro:
+        validar(registro)
+    assert str(erro.value) == motivo
@@ -0,0 +1,84 @@
+# Versão automatizada do scripts/stress_iniciar.py: N técnicos disputam a
+# mesma OS; exatamente um recebe 200, todos os outros 409, e no banco fica
+# um único atendimento aberto com uma única etapa.
+import asyncio
+from collections import Counter
+
+from sqlalchemy import func, select
+
+from app.database import SessionLocal
+from app.db.models import OS, Atendimento, EtapaHistorico, StatusOS
+
+TECNICOS = 12
+RODADAS = 3
+
+
+async def _disputar(cliente, headers, os_id):
+    largada = asyncio.Event()
+
+    async def tentar(h):
+        await largada.wait()
+        resposta = await cliente.post(f"/os/{os_id}/iniciar", json={"latitude": 0, "longitude": 0}, headers=h)
+        return resposta.status_code
+
+    tarefas = [asyncio.create_task(tentar(h)) for h in headers]
+    await asyncio.sleep(0.05)
+    largada.set()
+    return await asyncio.gather(*tarefas)
+
+
+def test_um_tecnico_leva_a_os(rodar, cliente_api, novo_tecnico, nova_os):
+    tecnicos = [novo_tecnico() for _ in range(TECNICOS)]
+    headers = [h for _, h in tecnicos]
+
+    async def rodadas():
+        async with cliente_api(timeout=60) as cliente:
+            resultados = []
+            for _ in range(RODADAS):
+                os_id = nova_os()
+                resultados.append((os_id, await _disputar(cliente, headers, os_id)))
+            return resultados
+
+    for os_id, status in rodar(rodadas()):
+        assert Counter(status) == {200: 1, 409: TECNICOS - 1}
+
+        vencedor = tecnicos[status.index(200)][0]
+        with SessionLocal() as db:
+            abertos = db.execute(
+                select(Atendimento).where(Atendimento.os_id == os_id, Atendimento.hora_fim.is_(None))
+            ).scalars().all()
+            assert [a.tecnico_id for a in abertos] == [vencedor]
+
+            etapas = db.execute(
+                select(func.count(EtapaHistorico.id)).where(EtapaHistorico.atendimento_id == abertos[0].id)
+            ).scalar()
+            assert etapas == 1
+
+            os_ = db.get(OS, os_id)
+            assert os_.status == StatusOS.EM_ATENDIMENTO
+            assert os_.tecnico_id == vencedor
+
+
+def test_mesmo_tecnico_de_novo_nao_duplica(rodar, cliente_api, novo_tecnico, nova_os):
+    _, headers = novo_tecnico()
+    os_id = nova_os()
+
+    async def duas_vezes():
+        async with cliente_api() as cliente:
+            primeira = await cliente.post(f"/os/{os_id}/iniciar", json={}, headers=headers)
+            segunda = await cliente.post(f"/os/{os_id}/iniciar", json={}, headers=headers)
+            return primeira, segunda
+
+    primeira, segunda = rodar(duas_vezes())
+    assert primeira.status_code == segunda.status_code == 200
+    assert segunda.json() == {"id": primeira.json()["id"], "mensagem": "Atendimento já existe"}
+
+
+def test_os_inexistente(rodar, cliente_api, novo_tecnico):
+    _, headers = novo_tecnico()
+
+    async def iniciar():
+        async with cliente_api() as cliente:
+            return await cliente.post("/os/0/iniciar", json={}, headers=headers)
+
+    assert rodar(iniciar()).status_code == 404
@@ -0,0 +1,63 @@
+# Agregados incrementais (metrica_etapa_diaria) batem com o etapa_historico
+# mesmo com avanços concorrentes no mesmo atendimento: cada transição é
+# contada uma vez.
+import asyncio
+import uuid
+from datetime import datetime
+
+from sqlalchemy import func, select
+
+from app.database import SessionLocal
+from app.db.models import Etapa, EtapaHistorico, MetricaEtapaDiaria
+
+
+def _transicoes_contadas(tecnico_id):
+    with SessionLocal() as db:
+        return dict(db.execute(
+            select(MetricaEtapaDiaria.etapa, func.sum(MetricaEtapaDiaria.quantidade))
+            .where(MetricaEtapaDiaria.tecnico_id == tecnico_id)
+            .group_by(MetricaEtapaDiaria.etapa)
+        ).all())
+
+
+def test_avancos_concorrentes_contam_uma_transicao(rodar, cliente_api, novo_tecnico, nova_os):
+    tecnico_id, headers = novo_tecnico()
+    os_id = nova_os()
+
+    async def avancar():
+        async with cliente_api(timeout=60) as cliente:
+            atendimento_id = (await cliente.post(f"/os/{os_id}/iniciar", json={}, headers=headers)).json()["id"]
+            online = [
+                cliente.post(f"/atendimento/{atendimento_id}/etapa", json={"etapa": "DIAGNOSTICO"}, headers=headers)
+                for _ in range(6)
+            ]
+            lote = {"eventos": [
+                {
+                    "chave": uuid.uuid4().hex,
+                    "atendimento_id": atendimento_id,
+                    "etapa": etapa,
+                    "criado_em": datetime.utcnow().isoformat(),
+                }
+                for etapa in ("DIAGNOSTICO", "ORCAMENTO")
+            ]}
+            sync = cliente.post("/sync/etapas", json=lote, headers=headers)
+            return atendimento_id, await asyncio.gather(sync, *online)
+
+    atendimento_id, respostas = rodar(avancar())
+    assert respostas[0].status_code == 200
+
+    with SessionLocal() as db:
+        historico = db.execute(
+            select(EtapaHistorico.etapa)
+            .where(EtapaHistorico.atendimento_id == atendimento_id)
+            .order_by(EtapaHistorico.criado_em, EtapaHistorico.id)
+        ).scalars().all()
+
+    # Transições de fato no histórico (repetir a etapa atual não é transição)
+    esperado = {}
+    for anterior, atual in zip(historico, historico[1:]):
+        if atual != anterior:
+            esperado[anterior] = esperado.get(anterior, 0) + 1
+
+    assert esperado == {Etapa.INSPECAO: 1, Etapa.DIAGNOSTICO: 1}
+    assert _transicoes_contadas(tecnico_id) == esperado
@@ -0,0 +1,38 @@
+from types import SimpleNamespace
+
+from app.replicas import REPLICA_FOLGA_WAL_BYTES, RoteadorLeitura, lsn_para_int
+
+PRIMARIO = lsn_para_int("16/B374D848")
+
+
+def _estado(desde_replay=None, recebendo=True, aplicou_recebido=True):
+    return SimpleNamespace(desde_replay=desde_replay, recebendo=recebendo, aplicou_recebido=aplicou_recebido)
+
+
+def test_lsn_para_int():
+    assert lsn_para_int("16/B374D848") == (0x16 << 32) + 0xB374D848
+    assert lsn_para_int(None) == 0
+    assert lsn_para_int("0/0") == 0
+
+
+def test_atraso_zero_com_tudo_aplicado():
+    assert RoteadorLeitura([])._atraso(_estado(3600), PRIMARIO, PRIMARIO) == 0.0
+
+
+def test_atraso_zero_dentro_da_folga_com_primario_parado():
+    # Checkpoint no primário parado: LSN anda, última transação fica velha
+    atraso = RoteadorLeitura([])._atraso(_estado(3600), PRIMARIO - 200, PRIMARIO)
+    assert atraso == 0.0
+
+
+def test_atraso_pelo_horario_fora_da_folga():
+    lsn = PRIMARIO - REPLICA_FOLGA_WAL_BYTES - 1
+    assert RoteadorLeitura([])._atraso(_estado(7.5), lsn, PRIMARIO) == 7.5
+    assert RoteadorLeitura([])._atraso(_estado(None), lsn, PRIMARIO) is None
+
+
+def test_atraso_sem_primario_exige_streaming():
+    roteador = RoteadorLeitura([])
+    assert roteador._atraso(_estado(3600), PRIMARIO, None) == 0.0
+    assert roteador._atraso(_estado(3600, recebendo=False), PRIMARIO, None) == 3600.0
+    assert roteador._atraso(_estado(2, aplicou_recebido=False), PRIMARIO, None) == 2.0
@@ -0,0 +1,25 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+from app.schemas import AtendimentoHistorico, MeuAtendimento
+
+
+def _sem_os(**campos):
+    # Atendimento.os_id é nullable: OS apagada ou nunca vinculada
+    return SimpleNamespace(
+        id=1, os_id=None, os=None, etapa=None, hora_inicio=datetime(2024, 1, 1), hora_fim=None, **campos
+    )
+
+
+def test_historico_sem_os():
+    item = AtendimentoHistorico.model_validate(_sem_os(etapas=[]))
+    assert item.os_id is None
+    assert item.cliente == "Cliente não encontrado"
+    assert item.endereco == "Endereço não encontrado"
+
+
+def test_meu_atendimento_sem_os():
+    item = MeuAtendimento.model_validate(_sem_os())
+    assert item.os_id is None
+    assert item.cliente is None
+    assert item.status_os is None
@@ -0,0 +1,173 @@
+# /sync/etapas: reenvio do mesmo lote não duplica histórico, evento recusado
+# não consome a chave, chave repetida no lote recusa o lote inteiro, lote e
+# avanço online no mesmo atendimento não se atropelam.
+import asyncio
+import uuid
+from datetime import datetime
+
+from sqlalchemy import func, select
+
+from app.database import SessionLocal
+from app.db.models import Atendimento, EtapaHistorico, SyncIdempotencia
+
+
+def _evento(atendimento_id, etapa, chave=None):
+    return {
+        "chave": chave or uuid.uuid4().hex,
+        "atendimento_id": atendimento_id,
+        "etapa": etapa,
+        "descricao": f"{etapa} offline",
+        "criado_em": datetime.utcnow().isoformat(),
+    }
+
+
+def _etapas(atendimento_id):
+    with SessionLocal() as db:
+        return db.execute(
+            select(func.count(EtapaHistorico.id)).where(EtapaHistorico.atendimento_id == atendimento_id)
+        ).scalar()
+
+
+def _chaves(tecnico_id, chaves):
+    with SessionLocal() as db:
+        return set(db.execute(
+            select(SyncIdempotencia.chave).where(
+                SyncIdempotencia.tecnico_id == tecnico_id, SyncIdempotencia.chave.in_(chaves)
+            )
+        ).scalars())
+
+
+def _sincronizar(rodar, cliente_api, headers, *lotes):
+    async def enviar():
+        async with cliente_api() as cliente:
+            return [
+                await cliente.post("/sync/etapas", json={"eventos": eventos}, headers=headers)
+                for eventos in lotes
+            ]
+
+    return rodar(enviar())
+
+
+def _atendimento(rodar, cliente_api, headers, os_id):
+    async def iniciar():
+        async with cliente_api() as cliente:
+            return await cliente.post(f"/os/{os_id}/iniciar", json={}, headers=headers)
+
+    resposta = rodar(iniciar())
+    assert resposta.status_code == 200
+    return resposta.json()["id"]
+
+
+def test_reenvio_do_lote_e_duplicado(rodar, cliente_api, novo_tecnico, nova_os):
+    _, headers = novo_tecnico()
+    atendimento_id = _atendimento(rodar, cliente_api, headers, nova_os())
+    lote = [_evento(atendimento_id, "DIAGNOSTICO"), _evento(atendimento_id, "ORCAMENTO")]
+
+    primeiro, reenvio = _sincronizar(rodar, cliente_api, headers, lote, lote)
+
+    assert primeiro.status_code == 200
+    aplicado = primeiro.json()
+    assert aplicado["aplicados"] == 2
+    assert [r["status"] for r in aplicado["resultados"]] == ["aplicado", "aplicado"]
+
+    assert reenvio.status_code == 200
+    duplicado = reenvio.json()
+    assert duplicado["aplicados"] == 0
+    assert [r["status"] for r in duplicado["resultados"]] == ["duplicado", "duplicado"]
+    assert [r["etapa_historico_id"] for r in duplicado["resultados"]] == [
+        r["etapa_historico_id"] for r in aplicado["resultados"]
+    ]
+
+    # Início + as duas do lote, uma vez só
+    assert _etapas(atendimento_id) == 3
+    with SessionLocal() as db:
+        assert db.get(Atendimento, atendimento_id).etapa.value == "ORCAMENTO"
+
+
+def test_evento_recusado_nao_consome_a_chave(rodar, cliente_api, novo_tecnico, nova_os):
+    tecnico_id, headers = novo_tecnico()
+    atendimento_id = _atendimento(rodar, cliente_api, headers, nova_os())
+    valido = _evento(atendimento_id, "DIAGNOSTICO")
+    invalido = _evento(atendimento_id, "CONSERTO")
+    de_outro = _evento(0, "DIAGNOSTICO")
+
+    resposta, = _sincronizar(rodar, cliente_api, headers, [valido, invalido, de_outro])
+
+    assert resposta.status_code == 200
+    resultados = resposta.json()["resultados"]
+    assert resposta.json()["aplicados"] == 1
+    assert resultados[0]["status"] == "aplicado"
+    assert (resultados[1]["status"], resultados[1]["codigo"]) == ("erro", 400)
+    assert resultados[1]["erro"] == "Etapa inválida: CONSERTO"
+    assert (resultados[2]["status"], resultados[2]["codigo"]) == ("erro", 404)
+
+    assert _chaves(tecnico_id, [valido["chave"], invalido["chave"], de_outro["chave"]]) == {valido["chave"]}
+
+    # Corrigido, o mesmo evento (mesma chave) entra
+    corrigido = {**invalido, "etapa": "ORCAMENTO"}
+    reenvio, = _sincronizar(rodar, cliente_api, headers, [corrigido])
+    assert reenvio.json()["resultados"][0]["status"] == "aplicado"
+    assert _etapas(atendimento_id) == 3
+
+
+def test_etapa_para_tras_e_atendimento_de_outro_tecnico(rodar, cliente_api, novo_tecnico, nova_os):
+    _, headers = novo_tecnico()
+    _, headers_outro = novo_tecnico()
+    atendimento_id = _atendimento(rodar, cliente_api, headers, nova_os())
+
+    _sincronizar(rodar, cliente_api, headers, [_evento(atendimento_id, "ORCAMENTO")])
+    para_tras, = _sincronizar(rodar, cliente_api, headers, [_evento(atendimento_id, "DIAGNOSTICO")])
+    de_outro, = _sincronizar(rodar, cliente_api, headers_outro, [_evento(atendimento_id, "EXECUCAO")])
+
+    assert para_tras.json()["resultados"][0]["codigo"] == 400
+    assert de_outro.json()["resultados"][0]["codigo"] == 403
+    assert _etapas(atendimento_id) == 2
+
+
+def test_chave_repetida_no_lote(rodar, cliente_api, novo_tecnico, nova_os):
+    tecnico_id, headers = novo_tecnico()
+    atendimento_id = _atendimento(rodar, cliente_api, headers, nova_os())
+    chave = uuid.uuid4().hex
+
+    resposta, = _sincronizar(rodar, cliente_api, headers, [
+        _evento(atendimento_id, "DIAGNOSTICO", chave),
+        _evento(atendimento_id, "ORCAMENTO", chave),
+    ])
+
+    assert resposta.status_code == 400
+    assert _chaves(tecnico_id, [chave]) == set()
+    assert _etapas(atendimento_id) == 1
+
+
+def test_lote_e_avanco_online_ao_mesmo_tempo(rodar, cliente_api, novo_tecnico, nova_os):
+    # Os dois caminhos travam o atendimento: o avanço online ou entra antes
+    # do lote (e o lote segue dali) ou depois (e é recusado). Nunca volta a
+    # etapa que o lote gravou
+    _, headers = novo_tecnico()
+    atendimentos = [_atendimento(rodar, cliente_api, headers, nova_os()) for _ in range(8)]
+
+    async def disputar(cliente, atendimento_id):
+        lote = [_evento(atendimento_id, e) for e in ("DIAGNOSTICO", "ORCAMENTO", "APROVACAO")]
+        return await asyncio.gather(
+            cliente.post("/sync/etapas", json={"eventos": lote}, headers=headers),
+            cliente.post(f"/atendimento/{atendimento_id}/etapa", json={"etapa": "DIAGNOSTICO"}, headers=headers),
+        )
+
+    async def todos():
+        async with cliente_api(timeout=60) as cliente:
+            return await asyncio.gather(*(disputar(cliente, a) for a in atendimentos))
+
+    for atendimento_id, (lote, online) in zip(atendimentos, rodar(todos())):
+        assert lote.status_code == 200
+        assert [r["status"] for r in lote.json()["resultados"]] == ["aplicado"] * 3
+        assert online.status_code in (200, 400)
+
+        with SessionLocal() as db:
+            assert db.get(Atendimento, atendimento_id).etapa.value == "APROVACAO"
+            ultima = db.execute(
+                select(EtapaHistorico.etapa)
+                .where(EtapaHistorico.atendimento_id == atendimento_id)
+                .order_by(EtapaHistorico.criado_em.desc(), EtapaHistorico.id.desc())
+                .limit(1)
+            ).scalar()
+            assert ultima.value == "APROVACAO"
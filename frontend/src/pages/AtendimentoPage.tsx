@@ -5,6 +5,8 @@ import {
   getAtendimentoAtivo,
   salvarEtapa,
   getEtapas,
+  uploadFoto,
+  urlFoto,
 } from "../services/api";
 
 const etapas = [
@@ -23,6 +25,7 @@ export default function AtendimentoPage() {
   const [etapaAtual, setEtapaAtual] = useState("");
   const [descricao, setDescricao] = useState("");
   const [foto, setFoto] = useState("");
+  const [enviandoFoto, setEnviandoFoto] = useState(false);
   const [historico, setHistorico] = useState<any[]>([]);
   const [loading, setLoading] = useState(true);
 
@@ -69,20 +72,24 @@ export default function AtendimentoPage() {
   }
 
   // =========================
-  // FOTO → BASE64
+  // FOTO → UPLOAD
   // =========================
 
-  function handleFoto(e: any) {
+  async function handleFoto(e: any) {
     const file = e.target.files[0];
     if (!file) return;
 
-    const reader = new FileReader();
+    setEnviandoFoto(true);
 
-    reader.onload = () => {
-      setFoto(reader.result as string);
-    };
-
-    reader.readAsDataURL(file);
+    try {
+      const enviada = await uploadFoto(file);
+      setFoto(enviada.url);
+    } catch (error: any) {
+      alert(error.message || "Erro ao enviar foto");
+      setFoto("");
+    } finally {
+      setEnviandoFoto(false);
+    }
   }
 
   // =========================
@@ -172,8 +179,8 @@ export default function AtendimentoPage() {
 
       <br /><br />
 
-      <button onClick={salvar}>
-        💾 Salvar etapa
+      <button onClick={salvar} disabled={enviandoFoto}>
+        {enviandoFoto ? "Enviando foto..." : "💾 Salvar etapa"}
       </button>
 
       <button
@@ -202,11 +209,14 @@ export default function AtendimentoPage() {
           <p>{r.descricao}</p>
 
           {r.foto && (
-            <img
-              src={r.foto}
-              width={200}
-              alt="foto"
-            />
+            <a href={urlFoto(r.foto)} target="_blank" rel="noreferrer">
+              <img
+                src={urlFoto(r.miniatura || r.foto)}
+                width={200}
+                loading="lazy"
+                alt="foto"
+              />
+            </a>
           )}
         </div>
       ))}
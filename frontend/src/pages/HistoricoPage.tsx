@@ -1,6 +1,6 @@
 // HistoricoPage.tsx
 import { useEffect, useState } from "react";
-import { getHistorico, AtendimentoHistorico } from "../services/api";
+import { getHistorico, urlFoto, AtendimentoHistorico } from "../services/api";
 import { useNavigate } from "react-router-dom";
 
 export default function HistoricoPage() {
@@ -8,6 +8,8 @@ export default function HistoricoPage() {
   const [carregando, setCarregando] = useState(true);
   const [erro, setErro] = useState<string | null>(null);
   const [expandido, setExpandido] = useState<number | null>(null);
+  const [proximoCursor, setProximoCursor] = useState<string | null>(null);
+  const [carregandoMais, setCarregandoMais] = useState(false);
   
   const navigate = useNavigate();
 
@@ -22,20 +24,40 @@ export default function HistoricoPage() {
     try {
       console.log("📊 Carregando histórico...");
       
-      const dados = await getHistorico();
-      console.log("📦 Dados recebidos:", dados);
+      const pagina = await getHistorico();
+      console.log("📦 Dados recebidos:", pagina);
       
-      setHistorico(dados);
+      setHistorico(pagina.itens);
+      setProximoCursor(pagina.proximo_cursor);
       
     } catch (error: any) {
       console.error("❌ Erro ao carregar histórico:", error);
       setErro(error.message || "Erro ao carregar histórico");
       setHistorico([]);
+      setProximoCursor(null);
     } finally {
       setCarregando(false);
     }
   }
 
+  async function carregarMais() {
+    if (!proximoCursor) return;
+
+    setCarregandoMais(true);
+
+    try {
+      const pagina = await getHistorico({ cursor: proximoCursor });
+
+      setHistorico((atual) => [...atual, ...pagina.itens]);
+      setProximoCursor(pagina.proximo_cursor);
+    } catch (error: any) {
+      console.error("❌ Erro ao carregar mais histórico:", error);
+      setErro(error.message || "Erro ao carregar histórico");
+    } finally {
+      setCarregandoMais(false);
+    }
+  }
+
   function formatarData(dataStr: string | null | undefined): string {
     if (!dataStr) return "Data não disponível";
     
@@ -130,7 +152,7 @@ export default function HistoricoPage() {
             📜 Histórico de Atendimentos
           </h1>
           <p style={{ color: "#7f8c8d", marginTop: 5 }}>
-            {historico.length} {historico.length === 1 ? "atendimento encontrado" : "atendimentos encontrados"}
+            {historico.length}{proximoCursor ? "+" : ""} {historico.length === 1 ? "atendimento encontrado" : "atendimentos encontrados"}
           </p>
         </div>
         
@@ -345,6 +367,16 @@ export default function HistoricoPage() {
                                 {formatarData(etapa.criado_em)}
                               </small>
                             </div>
+                            {etapa.foto && (
+                              <a href={urlFoto(etapa.foto)} target="_blank" rel="noreferrer">
+                                <img
+                                  src={urlFoto(etapa.miniatura || etapa.foto)}
+                                  alt="foto da etapa"
+                                  loading="lazy"
+                                  style={{ width: 80, height: 60, objectFit: "cover", borderRadius: 4 }}
+                                />
+                              </a>
+                            )}
                           </div>
                         ))}
                       </div>
@@ -420,6 +452,25 @@ export default function HistoricoPage() {
               )}
             </div>
           ))}
+
+          {proximoCursor && (
+            <button
+              onClick={carregarMais}
+              disabled={carregandoMais}
+              style={{
+                padding: "12px 24px",
+                backgroundColor: "#3498db",
+                color: "white",
+                border: "none",
+                borderRadius: "8px",
+                cursor: carregandoMais ? "wait" : "pointer",
+                fontWeight: "bold",
+                alignSelf: "center"
+              }}
+            >
+              {carregandoMais ? "Carregando..." : "Carregar mais"}
+            </button>
+          )}
         </div>
       )}
     </div>
@@ -1,12 +1,15 @@
 import { useEffect, useState } from "react";
 import {
   getOS,
+  getOSProximas,
   iniciarAtendimentoComGPS,
   getAtendimentoAtivo,
   debugAtendimentoAtivo,
   obterLocalizacao,
   iniciarAtendimento,
+  assinarEventosOS,
   Atendimento,
+  EventoOS,
   OS
 } from "../services/api";
 import { useNavigate } from "react-router-dom";
@@ -24,6 +27,28 @@ export default function TecnicoPage() {
     carregar();
   }, []);
 
+  // Atualizações das OS empurradas pelo servidor (sem recarregar a lista)
+  useEffect(() => {
+    return assinarEventosOS(aplicarEvento, () => {
+      getOS().then(setOS).catch(() => {});
+    });
+  }, []);
+
+  function aplicarEvento(evento: EventoOS) {
+    const os: OS = evento.os;
+
+    setOS(lista => {
+      const semEla = lista.filter(o => o.id !== os.id);
+      if (evento.acao === "remover") {
+        return semEla;
+      }
+      const existente = lista.find(o => o.id === os.id);
+      return existente
+        ? lista.map(o => (o.id === os.id ? { ...o, ...os } : o))
+        : [...semEla, os];
+    });
+  }
+
   async function carregar() {
     setCarregando(true);
     try {
@@ -156,6 +181,19 @@ export default function TecnicoPage() {
     carregar();
   }
 
+  async function ordenarPorProximidade() {
+    setObtendoGPS(true);
+    try {
+      const posicao = await obterLocalizacao();
+      setOS(await getOSProximas(posicao.latitude, posicao.longitude));
+      setErro("");
+    } catch (error: any) {
+      setErro("⚠ Não foi possível buscar as OS próximas: " + error.message);
+    } finally {
+      setObtendoGPS(false);
+    }
+  }
+
   // Função para filtrar OS baseado nas regras de negócio
   function getOSFiltradas() {
     if (!ativo) {
@@ -263,6 +301,26 @@ export default function TecnicoPage() {
             <span>🔄</span>
             Atualizar
           </button>
+
+          <button 
+            onClick={ordenarPorProximidade}
+            disabled={obtendoGPS}
+            style={{
+              padding: "10px 20px",
+              backgroundColor: "#9b59b6",
+              color: "white",
+              border: "none",
+              borderRadius: "8px",
+              cursor: obtendoGPS ? "wait" : "pointer",
+              fontWeight: "bold",
+              display: "flex",
+              alignItems: "center",
+              gap: "8px"
+            }}
+          >
+            <span>📍</span>
+            Mais próximas
+          </button>
         </div>
       </div>
 
@@ -647,6 +705,11 @@ export default function TecnicoPage() {
                     fontSize: "15px"
                   }}>
                     {os.endereco}
+                    {os.distancia_km != null && (
+                      <span style={{ color: "#7f8c8d", marginLeft: "8px" }}>
+                        ({os.distancia_km.toFixed(1)} km)
+                      </span>
+                    )}
                   </p>
                 </div>
                 
@@ -13,6 +13,9 @@ export interface OS {
   tecnico_id?: number;
   observacao?: string;
   telefone?: string;
+  latitude?: number | null;
+  longitude?: number | null;
+  distancia_km?: number | null;
 }
 
 export interface Atendimento {
@@ -31,12 +34,14 @@ export interface EtapaHistorico {
   etapa: string;
   descricao: string;
   foto: string;
+  // null: foto antiga (base64) sem prévia, use `foto`
+  miniatura?: string | null;
   criado_em: string;
 }
 
 export interface AtendimentoHistorico {
   id: number;
-  os_id: number;
+  os_id: number | null;
   cliente: string;
   endereco: string;
   etapa_atual: string;
@@ -46,6 +51,24 @@ export interface AtendimentoHistorico {
   etapas: EtapaHistorico[];
 }
 
+export interface Pagina<T> {
+  itens: T[];
+  proximo_cursor: string | null;
+}
+
+export interface FiltrosHistorico {
+  cursor?: string | null;
+  limite?: number;
+  inicio?: string;
+  fim?: string;
+  status?: string;
+}
+
+export interface EventoOS {
+  acao: "atualizar" | "remover";
+  os: OS & { tipo?: string };
+}
+
 export interface LoginResponse {
   token: string;
 }
@@ -110,6 +133,62 @@ export async function getOS(): Promise<OS[]> {
   return res.json();
 }
 
+// As K OS abertas mais próximas da posição, da mais perto à mais longe
+export async function getOSProximas(
+  latitude: number,
+  longitude: number,
+  k: number = 20
+): Promise<OS[]> {
+  const params = new URLSearchParams({
+    latitude: String(latitude),
+    longitude: String(longitude),
+    k: String(k),
+  });
+  const res = await fetch(`${API}/os/abertas?${params}`, {
+    headers: getAuthHeader(),
+  });
+
+  if (!res.ok) {
+    if (res.status === 401) {
+      logout();
+      throw new Error("Sessão expirada");
+    }
+    throw new Error("Erro ao buscar OS próximas");
+  }
+
+  return res.json();
+}
+
+// =====================
+// EVENTOS DE OS (SSE)
+// =====================
+
+// Recebe criação/atribuição/mudança de status das OS em tempo real.
+// onResync: eventos podem ter sido perdidos, recarregar a lista inteira.
+// Retorna a função que fecha a conexão.
+export function assinarEventosOS(
+  onEvento: (evento: EventoOS) => void,
+  onResync: () => void
+): () => void {
+  const token = localStorage.getItem("token") || "";
+  const fonte = new EventSource(`${API}/eventos/os?token=${encodeURIComponent(token)}`);
+  let conectouAntes = false;
+
+  fonte.addEventListener("os", (e) => {
+    onEvento(JSON.parse((e as MessageEvent).data));
+  });
+
+  fonte.addEventListener("resync", () => onResync());
+
+  // Reconexão automática do EventSource: o que chegou no intervalo se perdeu
+  fonte.onopen = () => {
+    if (conectouAntes) onResync();
+    conectouAntes = true;
+  };
+
+  return () => fonte.close();
+}
+
 // =====================
 // INICIAR ATENDIMENTO
 // =====================
@@ -181,13 +260,28 @@ export async function avancarEtapa(
   descricao: string = "",
   foto: string = ""
 ) {
+  // Com etapas esperando sincronização, a nova entra atrás delas na fila
+  // para o servidor receber tudo na ordem em que foi feito
+  if (lerFilaEtapas().length > 0) {
+    enfileirarEtapa(id, etapa, descricao, foto);
+    sincronizarEtapas();
+    return etapaOffline(etapa);
+  }
+
   console.log(`📤 Enviando requisição para /atendimento/${id}/etapa`, { etapa, descricao });
   
-  const res = await fetch(`${API}/atendimento/${id}/etapa`, {
-    method: "POST",
-    headers: getAuthHeader(),
-    body: JSON.stringify({ etapa, descricao, foto }),
-  });
+  let res: Response;
+  try {
+    res = await fetch(`${API}/atendimento/${id}/etapa`, {
+      method: "POST",
+      headers: getAuthHeader(),
+      body: JSON.stringify({ etapa, descricao, foto }),
+    });
+  } catch (e) {
+    // Sem rede: guarda para enviar quando a conexão voltar
+    enfileirarEtapa(id, etapa, descricao, foto);
+    return etapaOffline(etapa);
+  }
 
   if (!res.ok) {
     let errorMessage = "Erro ao avançar etapa";
@@ -202,6 +296,127 @@ export async function avancarEtapa(
   return res.json();
 }
 
+// =====================
+// FILA OFFLINE DE ETAPAS
+// =====================
+
+const FILA_ETAPAS = "fila_etapas";
+
+export interface EventoEtapaPendente {
+  chave: string;
+  atendimento_id: number;
+  etapa: string;
+  descricao: string;
+  foto: string;
+  criado_em: string;
+}
+
+export interface ResultadoSync {
+  chave: string;
+  status: "aplicado" | "duplicado" | "erro";
+  etapa_historico_id?: number | null;
+  codigo?: number;
+  erro?: string;
+}
+
+function etapaOffline(etapa: string) {
+  return {
+    etapa,
+    mensagem: "Sem conexão: etapa salva no aparelho e será enviada ao reconectar",
+    offline: true
+  };
+}
+
+function novaChave(): string {
+  if (typeof crypto !== "undefined" && "randomUUID" in crypto) {
+    return crypto.randomUUID();
+  }
+  return `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+}
+
+export function lerFilaEtapas(): EventoEtapaPendente[] {
+  try {
+    return JSON.parse(localStorage.getItem(FILA_ETAPAS) || "[]");
+  } catch (e) {
+    return [];
+  }
+}
+
+function gravarFilaEtapas(fila: EventoEtapaPendente[]) {
+  if (fila.length === 0) {
+    localStorage.removeItem(FILA_ETAPAS);
+  } else {
+    localStorage.setItem(FILA_ETAPAS, JSON.stringify(fila));
+  }
+}
+
+function enfileirarEtapa(id: number, etapa: string, descricao: string, foto: string) {
+  const fila = lerFilaEtapas();
+  fila.push({
+    chave: novaChave(),
+    atendimento_id: id,
+    etapa,
+    descricao,
+    foto,
+    criado_em: new Date().toISOString()
+  });
+  gravarFilaEtapas(fila);
+  console.log(`💾 Etapa ${etapa} guardada offline (${fila.length} na fila)`);
+}
+
+let sincronizando: Promise<ResultadoSync[]> | null = null;
+
+// Envia a fila inteira numa requisição. Reenviar é seguro: cada evento tem
+// chave de idempotência e o servidor ignora os que já aplicou.
+export function sincronizarEtapas(): Promise<ResultadoSync[]> {
+  if (!sincronizando) {
+    sincronizando = enviarFilaEtapas().finally(() => {
+      sincronizando = null;
+    });
+  }
+  return sincronizando;
+}
+
+async function enviarFilaEtapas(): Promise<ResultadoSync[]> {
+  const fila = lerFilaEtapas();
+  if (fila.length === 0 || !localStorage.getItem("token")) return [];
+
+  let res: Response;
+  try {
+    res = await fetch(`${API}/sync/etapas`, {
+      method: "POST",
+      headers: getAuthHeader(),
+      body: JSON.stringify({ eventos: fila }),
+    });
+  } catch (e) {
+    return [];
+  }
+  if (!res.ok) {
+    console.error("Erro ao sincronizar etapas:", res.status);
+    return [];
+  }
+
+  const { resultados } = (await res.json()) as { resultados: ResultadoSync[] };
+  resultados
+    .filter((r) => r.status === "erro")
+    .forEach((r) => console.error(`❌ Etapa ${r.chave} recusada: ${r.erro}`));
+
+  // Tira só o que foi enviado; etapas feitas durante o envio continuam
+  const enviadas = new Set(fila.map((e) => e.chave));
+  gravarFilaEtapas(lerFilaEtapas().filter((e) => !enviadas.has(e.chave)));
+  console.log(`🔄 ${resultados.length} etapas sincronizadas`);
+  return resultados;
+}
+
+if (typeof window !== "undefined") {
+  window.addEventListener("online", () => {
+    sincronizarEtapas();
+  });
+  if (navigator.onLine) {
+    sincronizarEtapas();
+  }
+}
+
 // =====================
 // ATENDIMENTO ATIVO
 // =====================
@@ -230,17 +445,32 @@ export async function getAtendimentoAtivo(): Promise<Atendimento | null> {
 }
 
 // =====================
-// HISTÓRICO COMPLETO (CORRIGIDO)
+// HISTÓRICO COMPLETO (PAGINADO)
 // =====================
 
-export async function getHistorico(): Promise<AtendimentoHistorico[]> {
+function montarQuery(filtros: FiltrosHistorico): string {
+  const params = new URLSearchParams();
+
+  Object.entries(filtros).forEach(([chave, valor]) => {
+    if (valor !== undefined && valor !== null && valor !== "") {
+      params.set(chave, String(valor));
+    }
+  });
+
+  const query = params.toString();
+  return query ? `?${query}` : "";
+}
+
+export async function getHistorico(
+  filtros: FiltrosHistorico = {}
+): Promise<Pagina<AtendimentoHistorico>> {
   try {
-    const res = await fetch(`${API}/atendimentos/historico`, {
+    const res = await fetch(`${API}/atendimentos/historico${montarQuery(filtros)}`, {
       headers: getAuthHeader(),
     });
 
     if (res.status === 404) {
-      return [];
+      return { itens: [], proximo_cursor: null };
     }
 
     if (!res.ok) {
@@ -250,11 +480,14 @@ export async function getHistorico(): Promise<AtendimentoHistorico[]> {
     const data = await res.json();
     console.log("📦 Histórico recebido:", data);
     
-    return Array.isArray(data) ? data : [];
+    return {
+      itens: Array.isArray(data?.itens) ? data.itens : [],
+      proximo_cursor: data?.proximo_cursor ?? null,
+    };
     
   } catch (error) {
     console.error("❌ Erro em getHistorico:", error);
-    return [];
+    return { itens: [], proximo_cursor: null };
   }
 }
 
@@ -289,14 +522,16 @@ export async function getEtapas(id: number): Promise<EtapaHistorico[]> {
 // MEUS ATENDIMENTOS
 // =====================
 
-export async function getMeusAtendimentos(): Promise<any[]> {
+export async function getMeusAtendimentos(
+  filtros: FiltrosHistorico = {}
+): Promise<Pagina<any>> {
   try {
-    const res = await fetch(`${API}/tecnicos/meus-atendimentos`, {
+    const res = await fetch(`${API}/tecnicos/meus-atendimentos${montarQuery(filtros)}`, {
       headers: getAuthHeader(),
     });
 
     if (res.status === 404) {
-      return [];
+      return { itens: [], proximo_cursor: null };
     }
 
     if (!res.ok) {
@@ -304,11 +539,14 @@ export async function getMeusAtendimentos(): Promise<any[]> {
     }
 
     const data = await res.json();
-    return Array.isArray(data) ? data : [];
+    return {
+      itens: Array.isArray(data?.itens) ? data.itens : [],
+      proximo_cursor: data?.proximo_cursor ?? null,
+    };
     
   } catch (error) {
     console.error("Erro em getMeusAtendimentos:", error);
-    return [];
+    return { itens: [], proximo_cursor: null };
   }
 }
 
@@ -440,6 +678,49 @@ export async function debugAtendimentoAtivo() {
   }
 }
 
+// =====================
+// FOTOS
+// =====================
+
+export interface FotoUpload {
+  hash: string;
+  url: string;
+  miniatura: string;
+  tamanho: number;
+}
+
+export async function uploadFoto(arquivo: File): Promise<FotoUpload> {
+  const token = localStorage.getItem("token");
+  const form = new FormData();
+  form.append("arquivo", arquivo);
+
+  // Sem Content-Type manual: o navegador define o boundary do multipart
+  const res = await fetch(`${API}/fotos`, {
+    method: "POST",
+    headers: { Authorization: `Bearer ${token}` },
+    body: form,
+  });
+
+  if (!res.ok) {
+    let errorMessage = "Erro ao enviar foto";
+    try {
+      const errorData = await res.json();
+      errorMessage = errorData.detail || errorMessage;
+    } catch (e) {}
+    throw new Error(errorMessage);
+  }
+
+  return res.json();
+}
+
+// Fotos novas vêm como caminho (/api/fotos/<hash>); antigas, como data URL
+export function urlFoto(foto: string): string {
+  if (!foto || foto.startsWith("data:") || foto.startsWith("http")) {
+    return foto;
+  }
+  return new URL(foto, API).toString();
+}
+
 // =====================
 // SALVAR ETAPA (COMPATIBILIDADE)
 // =====================